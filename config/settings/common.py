@@ -51,6 +51,7 @@ LOCAL_APPS = (
     # Your stuff: custom apps go here
     'tuticfruti_blog.core',
     'tuticfruti_blog.posts',
+    'tuticfruti_blog.taskapp.celery.CeleryConfig',
 )
 
 # See: https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
@@ -61,6 +62,8 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 MIDDLEWARE_CLASSES = (
     # Make sure djangosecure.middleware.SecurityMiddleware is listed first
     # 'django.middleware.cache.UpdateCacheMiddleware',
+    'tuticfruti_blog.core.middleware.MetricsMiddleware',
+    'tuticfruti_blog.core.middleware.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -110,7 +113,19 @@ DATABASES = {
     # Raises ImproperlyConfigured exception if DATABASE_URL not in os.environ
     'default': env.db("DATABASE_URL", default="postgres:///tuticfruti_blog"),
 }
-DATABASES['default']['ATOMIC_REQUESTS'] = True
+# Read only views run in autocommit, write paths open their own transactions. See: tuticfruti_blog.core.transactions
+DATABASES['default']['ATOMIC_REQUESTS'] = False
+if env('DATABASE_REPLICA_URL', default=''):
+    DATABASES['replica'] = env.db('DATABASE_REPLICA_URL')
+
+# Read replicas. See: tuticfruti_blog.core.routers
+DATABASE_ROUTERS = ['tuticfruti_blog.core.routers.ReplicaRouter']
+# Aliases of the replicas, reads are sent to the primary when empty
+DATABASE_REPLICAS = env.list('DJANGO_DATABASE_REPLICAS', default=['replica'] if 'replica' in DATABASES else [])
+# Url names and namespaces of the views whose GET requests read from a replica
+DATABASE_REPLICA_VIEWS = ('home', 'posts', 'users', )
+# Seconds a client reads from the primary after a write, the replication lag tolerated
+DATABASE_REPLICA_LAG = env.int('DJANGO_DATABASE_REPLICA_LAG', default=5)
 
 
 # GENERAL CONFIGURATION
@@ -167,7 +182,8 @@ TEMPLATES = [
                 'django.template.context_processors.tz',
                 'django.contrib.messages.context_processors.messages',
                 # Your stuff: custom template context processors go here
-                'tuticfruti_blog.core.context_processors.ckeditor'
+                'tuticfruti_blog.core.context_processors.ckeditor',
+                'tuticfruti_blog.core.context_processors.posts',
             ],
         },
     },
@@ -290,3 +306,51 @@ CKEDITOR_CONFIGS = {
             ]),
     },
 }
+
+# Page cache of anonymous post views, invalidated by dependency tags. See: tuticfruti_blog.core.cache
+PAGE_CACHE_ENABLED = env.bool('DJANGO_PAGE_CACHE_ENABLED', default=True)
+PAGE_CACHE_TIMEOUT = env.int('DJANGO_PAGE_CACHE_TIMEOUT', default=60 * 60 * 24)
+# Seconds a page is served without rendering it again, stale pages are served while a single request renders them
+PAGE_CACHE_SOFT_TIMEOUT = env.int('DJANGO_PAGE_CACHE_SOFT_TIMEOUT', default=60 * 5)
+# Seconds a request may hold the rendering of a page
+PAGE_CACHE_LOCK_TIMEOUT = env.int('DJANGO_PAGE_CACHE_LOCK_TIMEOUT', default=10)
+
+# Rendered posts fragment cache, keyed on the post version
+POSTS_FRAGMENT_CACHE_TIMEOUT = env.int('DJANGO_POSTS_FRAGMENT_CACHE_TIMEOUT', default=60 * 60 * 24)
+
+# Posts full text search
+# Backend is chosen by database vendor when empty. See: tuticfruti_blog.posts.search
+POSTS_SEARCH_BACKEND = env('DJANGO_POSTS_SEARCH_BACKEND', default='')
+# PostgreSQL text search configuration
+POSTS_SEARCH_CONFIG = env('DJANGO_POSTS_SEARCH_CONFIG', default='simple')
+# Seconds the ordered results of a search are cached, until the next change of the index at most
+POSTS_SEARCH_RESULTS_TIMEOUT = env.int('DJANGO_POSTS_SEARCH_RESULTS_TIMEOUT', default=300)
+
+# Posts pagination: 'cursor' (keyset on created and id) or 'page' (numbered pages)
+POSTS_PAGINATION_MODE = env('DJANGO_POSTS_PAGINATION_MODE', default='page')
+
+# Faceted browsing by categories and tags. See: tuticfruti_blog.posts.facets
+# Seconds the posting lists of a worker are kept before being rebuilt
+POSTS_FACETS_INDEX_TIMEOUT = env.int('DJANGO_POSTS_FACETS_INDEX_TIMEOUT', default=300)
+# Most frequent tags offered as facets
+POSTS_FACETS_TAG_LIMIT = env.int('DJANGO_POSTS_FACETS_TAG_LIMIT', default=20)
+
+# Per view request metrics, exposed to staff in the Prometheus text format. See: tuticfruti_blog.core.metrics
+METRICS_ENABLED = env.bool('DJANGO_METRICS_ENABLED', default=True)
+
+# CELERY
+# ------------------------------------------------------------------------------
+# See: http://docs.celeryproject.org/en/3.1/configuration.html
+BROKER_URL = env('CELERY_BROKER_URL', default='memory://')
+# Tasks run in the calling process, so no broker nor worker is needed locally
+CELERY_ALWAYS_EAGER = env.bool('CELERY_ALWAYS_EAGER', default=True)
+CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_IGNORE_RESULT = True
+
+# Comments checks and notifications. See: tuticfruti_blog.posts.spam
+POSTS_COMMENT_MAX_LINKS = env.int('DJANGO_POSTS_COMMENT_MAX_LINKS', default=2)
+POSTS_COMMENT_BLOCKED_TERMS = env.list('DJANGO_POSTS_COMMENT_BLOCKED_TERMS', default=[])
+# Managers are mailed every comment waiting for moderation
+POSTS_COMMENT_NOTIFICATIONS_ENABLED = env.bool('DJANGO_POSTS_COMMENT_NOTIFICATIONS_ENABLED', default=True)
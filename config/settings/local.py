@@ -36,6 +36,8 @@ CACHES = {
         'LOCATION': ''
     }
 }
+PAGE_CACHE_ENABLED = env.bool('DJANGO_PAGE_CACHE_ENABLED', default=False)
+POSTS_FRAGMENT_CACHE_TIMEOUT = env.int('DJANGO_POSTS_FRAGMENT_CACHE_TIMEOUT', default=0)
 
 # django-debug-toolbar
 # ------------------------------------------------------------------------------
@@ -64,5 +66,11 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': 'mydatabase',
-    }
+    },
+    # Stand-in replica, the primary itself. Tests get a database of their own
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': 'mydatabase',
+    },
 }
+DATABASE_REPLICAS = env.list('DJANGO_DATABASE_REPLICAS', default=[])
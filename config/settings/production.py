@@ -130,17 +130,42 @@ DATABASES['default'] = env.db("DATABASE_URL")
 # CACHING
 # ------------------------------------------------------------------------------
 # Heroku URL does not pass the DB number, so we parse it in
+# Hot keys are served from a per worker LRU in front of Redis. See: tuticfruti_blog.core.cache_backends
 CACHES = {
     "default": {
+        "BACKEND": "tuticfruti_blog.core.cache_backends.TwoTierCache",
+        "LOCATION": "redis",
+        "OPTIONS": {
+            "LOCAL_MAX_ENTRIES": env.int('DJANGO_CACHE_LOCAL_MAX_ENTRIES', default=1000),
+            # Seconds a local entry is trusted without asking Redis
+            "LOCAL_TIMEOUT": env.int('DJANGO_CACHE_LOCAL_TIMEOUT', default=5),
+            # Seconds between checks of the writes of other workers
+            "GENERATION_INTERVAL": env.float('DJANGO_CACHE_GENERATION_INTERVAL', default=1),
+            # Keys whose writes reach the local tier of other workers within GENERATION_INTERVAL
+            "INVALIDATION_PREFIXES": ('tag:', 'generation:'),
+        }
+    },
+    "redis": {
         "BACKEND": "django_redis.cache.RedisCache",
         "LOCATION": "{0}/{1}".format(env.cache_url('REDIS_URL', default="redis://127.0.0.1:6379"), 0),
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
-            "IGNORE_EXCEPTIONS": True,  # mimics memcache behavior.
-                                        # http://niwinz.github.io/django-redis/latest/#_memcached_exceptions_behavior
+            # Errors are handled by the two tier cache, which falls back to its local tier
+            "IGNORE_EXCEPTIONS": False,
         }
     }
 }
 
+# CELERY
+# ------------------------------------------------------------------------------
+# Comments are ingested by a worker. See: tuticfruti_blog.posts.tasks
+BROKER_URL = env('CELERY_BROKER_URL', default='redis://127.0.0.1:6379/1')
+CELERY_ALWAYS_EAGER = env.bool('CELERY_ALWAYS_EAGER', default=False)
+
+
+# POSTS
+# ------------------------------------------------------------------------------
+# Keyset pagination keeps deep pages as cheap as the first one
+POSTS_PAGINATION_MODE = env('DJANGO_POSTS_PAGINATION_MODE', default='cursor')
 
 # Your production stuff: Below this line define 3rd party library settings
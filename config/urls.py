@@ -8,6 +8,10 @@ from django.conf.urls import include, url
 from django.conf.urls.static import static
 from django.contrib import admin
 
+from allauth import urls as allauth_urls
+
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.core import views as core_views
 from tuticfruti_blog.posts import views
 
 urlpatterns = [
@@ -16,6 +20,9 @@ urlpatterns = [
     # Django Admin
     url(r'^admin/', include(admin.site.urls)),
 
+    # Prometheus metrics of this process
+    url(r'^metrics/$', core_views.metrics, name='metrics'),
+
     # Your stuff: custom urls includes go here
     #CKEditor
     url(r'^ckeditor/', include('ckeditor_uploader.urls')),
@@ -25,7 +32,7 @@ urlpatterns = [
 urlpatterns += i18n_patterns(
     # User management
     url(_(r'^users/'), include("tuticfruti_blog.users.urls", namespace="users")),
-    url(_(r'^accounts/'), include('allauth.urls')),
+    url(_(r'^accounts/'), include(transactions.atomic_writes_patterns(allauth_urls.urlpatterns))),
 
     # Your stuff: custom urls includes go here
     url(_(r'^posts/'), include('tuticfruti_blog.posts.urls', namespace='posts')), )
@@ -108,9 +108,9 @@ class TestPostDetailPage(functional_test.FunctionalTest):
     def test_tag_link(self):
         self.page.click_on_tag_by_text(self.python_tag.term)
         self.assertIn(
-            '{}{}'.format(
-                reverse('posts:search'),
-                '?search_terms={}'.format(self.python_tag.term)),
+            reverse(
+                'posts:list_by_tag',
+                kwargs=dict(pk=self.python_tag.pk)),
             self.page.current_driver_url)
 
     def test_category_link(self):
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Latency and query count benchmarks of the public views.
+
+Every scenario is a request replayed through the test client, recording the wall clock
+latency, the number of queries and the size of the rendered response of each run.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from tuticfruti_blog.posts import models
+from tuticfruti_blog.posts import pagination
+
+
+class Scenario:
+    def __init__(self, name, path, method='get', data=None, status_code=200):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data or {}
+        self.status_code = status_code
+
+    def request(self, client):
+        return getattr(client, self.method)(self.path, self.data)
+
+
+def get_last_page_data():
+    """Returns the query string of the last page of the home list, a cursor past the previous posts in cursor mode."""
+    num_posts = models.Post.objects.all_published().count()
+    if getattr(settings, 'POSTS_PAGINATION_MODE', pagination.MODE_PAGE) != pagination.MODE_CURSOR:
+        return dict(page=max(num_posts // models.Post.PAGINATE_BY, 1))
+
+    # Cursor pages keep no orphans, the last one holds the remaining 1 to PAGINATE_BY posts
+    num_previous = (num_posts - 1) // models.Post.PAGINATE_BY * models.Post.PAGINATE_BY
+    if num_previous <= 0:
+        return {}
+
+    posts = models.Post.objects.all_published().order_by(*pagination.CursorPaginator.ordering)
+
+    return dict(page=pagination.encode_cursor(pagination.DIRECTION_NEXT, posts[num_previous - 1]))
+
+
+def get_scenarios():
+    """Builds the scenarios of the public views on top of the data currently in the database."""
+    category = models.Category.objects.all_enabled().first()
+    tag = models.Tag.objects.first()
+    post = models.Post.objects.all_published().order_by('-published_comment_count').first()
+    comment = dict(author='benchmark', email='benchmark@example.com', content='Benchmark comment')
+
+    return [
+        Scenario('list', reverse('home')),
+        Scenario('list_last_page', reverse('home'), data=get_last_page_data()),
+        Scenario('list_by_category', reverse('posts:list_by_category', kwargs=dict(slug=category.slug))),
+        Scenario('list_by_tag', reverse('posts:list_by_tag', kwargs=dict(pk=tag.pk))),
+        Scenario('browse', reverse('posts:browse'), data=dict(category=category.slug, tag=tag.term)),
+        Scenario('search', reverse('posts:search'), data=dict(search_terms='lorem ipsum')),
+        Scenario('detail', reverse('posts:detail', kwargs=dict(slug=post.slug))),
+        Scenario(
+            'detail_comment',
+            reverse('posts:detail', kwargs=dict(slug=post.slug)),
+            method='post',
+            data=comment,
+            status_code=302),
+    ]
+
+
+def percentile(values, percent):
+    """Nearest rank percentile."""
+    values = sorted(values)
+
+    return values[max(int(math.ceil(len(values) * percent / 100)) - 1, 0)]
+
+
+def run_scenario(client, scenario, requests, warmup=1):
+    latencies, num_queries, num_bytes = [], [], []
+    for run in range(warmup + requests):
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            response = scenario.request(client)
+            elapsed = time.perf_counter() - start
+
+        if response.status_code != scenario.status_code:
+            raise AssertionError('{} answered {} instead of {}'.format(
+                scenario.name, response.status_code, scenario.status_code))
+        if run >= warmup:
+            latencies.append(elapsed * 1000)
+            num_queries.append(len(queries))
+            num_bytes.append(len(response.content))
+
+    return dict(
+        path=scenario.path,
+        method=scenario.method.upper(),
+        data=scenario.data,
+        requests=requests,
+        p50_ms=round(percentile(latencies, 50), 3),
+        p95_ms=round(percentile(latencies, 95), 3),
+        queries=max(num_queries),
+        bytes=max(num_bytes))
+
+
+def run(client, scenarios, requests, warmup=1):
+    return {scenario.name: run_scenario(client, scenario, requests, warmup) for scenario in scenarios}
@@ -0,0 +1,333 @@
+# -*- coding: utf-8 -*-
+"""
+Cache entries invalidated by dependency tags.
+
+Every tag has a random version stored in the cache. Entries remember the versions of
+their tags when stored and are considered stale as soon as any of them changes, so
+invalidating a tag is a single write no matter how many entries depend on it. Versions
+also hold the time of the invalidation, so values computed while one of their tags was
+being invalidated are not stored under the new version. Neither are values read from a
+replica within DATABASE_REPLICA_LAG seconds of an invalidation, the replica may not have
+the change yet. Tags invalidated within a transaction are invalidated again once it exits,
+as values computed before the commit would otherwise be stored under the new versions.
+"""
+import hashlib
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, DatabaseError
+from django.http import HttpResponse, HttpResponseNotModified
+from django.middleware.csrf import get_token
+from django.utils.http import parse_etags, parse_http_date_safe
+from django.views.decorators.http import condition
+
+from . import metrics
+from . import routers
+from . import transactions
+
+logger = logging.getLogger(__name__)
+
+TAG_KEY_PREFIX = 'tag:'
+LOCK_KEY_PREFIX = 'lock:'
+LOCK_TIMEOUT = 10
+LOCK_POLL_INTERVAL = 0.05
+CSRF_TOKEN_PLACEHOLDER = '__csrf_token_placeholder__'
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def _tag_keys(tags):
+    return {'{}{}'.format(TAG_KEY_PREFIX, tag): tag for tag in tags}
+
+
+def _new_version(invalidated_at=0):
+    return '{!r}:{}'.format(float(invalidated_at), uuid.uuid4().hex)
+
+
+def _invalidated_at(version):
+    try:
+        return float(version.split(':', 1)[0])
+    except ValueError:
+        return 0
+
+
+def _invalidated_since(versions, since):
+    return any(_invalidated_at(version) > since for version in versions.values())
+
+
+def _cacheable_since(started):
+    """Returns the time after which invalidations make a value computed from started on unfit for the cache."""
+    if routers.get_replica() is not None:
+        return started - getattr(settings, 'DATABASE_REPLICA_LAG', 0)
+
+    return started
+
+
+def get_tag_versions(tags):
+    keys = _tag_keys(tags)
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+
+    return {keys[key]: version for key, version in versions.items()}
+
+
+_local = threading.local()
+
+
+def _set_new_versions(tags):
+    keys = _tag_keys(tags)
+    if keys:
+        invalidated_at = time.time()
+        cache.set_many({key: _new_version(invalidated_at) for key in keys}, None)
+
+
+def _invalidate_committed_tags():
+    tags, _local.tags = getattr(_local, 'tags', set()), set()
+    _set_new_versions(tags)
+
+
+def invalidate_tags(tags):
+    tags = set(tags)
+    _set_new_versions(tags)
+    if tags and connection.in_atomic_block:
+        _local.tags = getattr(_local, 'tags', set()) | tags
+        transactions.after_commit(_invalidate_committed_tags)
+
+
+def _tags_changed(versions):
+    keys = _tag_keys(versions)
+    current_versions = cache.get_many(keys)
+
+    return any(current_versions.get(key) != versions[tag] for key, tag in keys.items())
+
+
+def get_tagged(key, default=None):
+    entry = cache.get(key)
+    if entry is None:
+        return default
+
+    versions, value = entry
+    if _tags_changed(versions):
+        return default
+
+    return value
+
+
+def set_tagged(key, value, tags=(), timeout=None, versions=None):
+    """
+    Stores value under the versions of its tags. Callers computing value pass the versions read with
+    get_tag_versions before computing it, so an invalidation landing meanwhile makes the entry stale.
+    """
+    if versions is None:
+        versions = get_tag_versions(tags)
+    if not _invalidated_since(versions, _cacheable_since(time.time())):
+        cache.set(key, (versions, value), timeout)
+
+
+def _compute_and_set(key, compute, soft_timeout, hard_timeout):
+    started = time.time()
+    value, tags = compute()
+    if value is not None:
+        versions = get_tag_versions(tags)
+        if _invalidated_since(versions, _cacheable_since(started)):
+            logger.debug('Not caching %s, invalidated while being computed or replicated', key)
+            return value
+
+        fresh_until = time.time() + soft_timeout if soft_timeout is not None else None
+        cache.set(key, (versions, value, fresh_until), hard_timeout)
+
+    return value
+
+
+def get_or_compute(key, compute, soft_timeout=None, hard_timeout=None, lock_timeout=LOCK_TIMEOUT):
+    """
+    Returns the value cached under key, computing and caching it when missing or stale.
+
+    compute returns the value, None meaning not to cache it, and its dependency tags. A value is
+    fresh for soft_timeout seconds as long as its tags are unchanged, and kept for hard_timeout
+    seconds. A single caller holding a short lock recomputes a stale value while the others are
+    served the stale one, which is also served when recomputing fails with a database error.
+    On a miss the others wait for the lock holder, computing themselves after lock_timeout seconds.
+    Values whose tags are invalidated while being computed, or shortly before when read from a
+    replica, are returned without being cached.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        versions, stale_value, fresh_until = entry
+        if not (_tags_changed(versions) or (fresh_until is not None and time.time() >= fresh_until)):
+            return stale_value
+
+    lock_key = '{}{}'.format(LOCK_KEY_PREFIX, key)
+    token = _new_version()
+    if not cache.add(lock_key, token, lock_timeout):
+        if entry is not None:
+            return stale_value
+
+        deadline = time.time() + lock_timeout
+        while time.time() < deadline:
+            time.sleep(LOCK_POLL_INTERVAL)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[1]
+            if cache.get(lock_key) is None:
+                break
+
+        return _compute_and_set(key, compute, soft_timeout, hard_timeout)
+
+    try:
+        return _compute_and_set(key, compute, soft_timeout, hard_timeout)
+    except DatabaseError:
+        if entry is None:
+            raise
+        logger.warning('Serving stale %s after a database error', key, exc_info=True)
+        return stale_value
+    finally:
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+
+def make_etag(*values):
+    return hashlib.md5(':'.join(str(value) for value in values).encode()).hexdigest()
+
+
+def is_not_modified(request, response):
+    """Tells whether the validators of a response match the conditional headers of a GET request."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        if not response.has_header('ETag'):
+            return False
+        try:
+            etags = parse_etags(if_none_match)
+        except ValueError:
+            return False
+        return '*' in etags or parse_etags(response['ETag'])[0] in etags
+
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+
+    return bool(if_modified_since and last_modified and last_modified <= if_modified_since)
+
+
+class ConditionalGetMixin:
+    """
+    Answers conditional GET and HEAD requests with 304 Not Modified before the view does any work.
+
+    Views compute cheap validators in get_etag and get_last_modified, None meaning no validator.
+    """
+
+    def get_etag(self):
+        return None
+
+    def get_last_modified(self):
+        return None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        view = condition(
+            etag_func=lambda request, *args, **kwargs: self.get_etag(),
+            last_modified_func=lambda request, *args, **kwargs: self.get_last_modified())(super().dispatch)
+
+        return view(request, *args, **kwargs)
+
+
+class PageCacheMixin:
+    """
+    Caches the rendered GET responses of anonymous users, keyed on language, path and query string.
+
+    Views define the dependency tags of a response in get_cache_tags, which is called once the
+    response has been built. CSRF tokens are swapped out of the cached content and put back per request.
+    Cached ETag and Last-Modified headers are replayed, answering conditional requests without queries.
+    A single request renders a stale response while the others are served the stale one, see get_or_compute.
+    Disabled by the PAGE_CACHE_ENABLED setting, responses are fresh for PAGE_CACHE_SOFT_TIMEOUT seconds
+    and expire after PAGE_CACHE_TIMEOUT seconds.
+    """
+    page_cache_enabled = True
+    page_cache_timeout = None
+    page_cache_soft_timeout = None
+    page_cache_key_prefix = 'page:'
+
+    def get_cache_tags(self):
+        return []
+
+    def get_page_cache_key(self):
+        request = self.request
+        url = '{}:{}'.format(getattr(request, 'LANGUAGE_CODE', ''), request.get_full_path())
+
+        return '{}{}'.format(self.page_cache_key_prefix, hashlib.md5(url.encode()).hexdigest())
+
+    def get_page_cache_timeout(self):
+        if self.page_cache_timeout is not None:
+            return self.page_cache_timeout
+
+        return getattr(settings, 'PAGE_CACHE_TIMEOUT', None)
+
+    def get_page_cache_soft_timeout(self):
+        if self.page_cache_soft_timeout is not None:
+            return self.page_cache_soft_timeout
+
+        return getattr(settings, 'PAGE_CACHE_SOFT_TIMEOUT', None)
+
+    def is_page_cacheable(self, request):
+        return (
+            self.page_cache_enabled and
+            getattr(settings, 'PAGE_CACHE_ENABLED', True) and
+            request.method in ('GET', 'HEAD') and
+            not request.user.is_authenticated())
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+
+        dispatch = super().dispatch
+        rendered_responses = []
+
+        def render():
+            response = dispatch(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                # Rendered before reaching MetricsMiddleware, which would only time a no-op
+                start = time.perf_counter()
+                response.render()
+                metrics.add_template_duration(request, time.perf_counter() - start)
+            rendered_responses.append(response)
+            if response.status_code != 200 or response.streaming:
+                return None, []
+
+            content = response.content.decode(response.charset)
+            if request.META.get('CSRF_COOKIE_USED'):
+                content = content.replace(request.META.get('CSRF_COOKIE'), CSRF_TOKEN_PLACEHOLDER)
+            headers = {header: response[header] for header in ('Content-Type', ) + VALIDATOR_HEADERS
+                       if response.has_header(header)}
+
+            return (content, headers), self.get_cache_tags()
+
+        entry = get_or_compute(
+            self.get_page_cache_key(),
+            render,
+            soft_timeout=self.get_page_cache_soft_timeout(),
+            hard_timeout=self.get_page_cache_timeout(),
+            lock_timeout=getattr(settings, 'PAGE_CACHE_LOCK_TIMEOUT', LOCK_TIMEOUT))
+        if rendered_responses:
+            return rendered_responses[0]
+
+        content, headers = entry
+        headers = dict(headers)
+        if CSRF_TOKEN_PLACEHOLDER in content:
+            content = content.replace(CSRF_TOKEN_PLACEHOLDER, get_token(request))
+        response = HttpResponse(content, content_type=headers.pop('Content-Type'))
+        for header, value in headers.items():
+            response[header] = value
+        if is_not_modified(request, response):
+            not_modified = HttpResponseNotModified()
+            for header, value in headers.items():
+                not_modified[header] = value
+            return not_modified
+
+        return response
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Two tier cache backend: a bounded in-process LRU in front of a shared cache such as Redis.
+
+Hot keys are served from the memory of the worker. Writes of keys starting with one of the
+INVALIDATION_PREFIXES, such as the tag versions of tuticfruti_blog.core.cache, bump a generation
+counter stored next to the entries, and workers compare their generation with it at most every
+GENERATION_INTERVAL seconds, dropping their local entries when it changed. Any other write, like
+storing a page, only reaches the local tier of other workers once their copy expires. Local
+entries never outlive LOCAL_TIMEOUT, which also bounds staleness while the shared cache is down
+and the backend runs on the local tier only.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'tuticfruti_blog.core.cache_backends.TwoTierCache',
+            'LOCATION': 'shared',  # alias of the shared cache
+            'OPTIONS': {
+                'LOCAL_MAX_ENTRIES': 1000,
+                'LOCAL_TIMEOUT': 5,
+                'GENERATION_INTERVAL': 1,
+                'INVALIDATION_PREFIXES': ('tag:', 'generation:'),
+            },
+        },
+        'shared': {...},
+    }
+"""
+import collections
+import logging
+import pickle
+import threading
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+GENERATION_KEY = 'two_tier_cache:generation'
+INVALIDATION_PREFIXES = ('tag:', 'generation:')
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.shared_alias = location
+        self.local_max_entries = int(options.get('LOCAL_MAX_ENTRIES', 1000))
+        self.local_timeout = float(options.get('LOCAL_TIMEOUT', 5))
+        self.generation_interval = float(options.get('GENERATION_INTERVAL', 1))
+        self.retry_interval = float(options.get('RETRY_INTERVAL', 5))
+        self.invalidation_prefixes = tuple(options.get('INVALIDATION_PREFIXES', INVALIDATION_PREFIXES))
+
+        self._local = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._generation = None
+        self._next_generation_check = 0
+        self._shared_down_until = 0
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _version(self, version):
+        return self.version if version is None else version
+
+    # Local tier
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expiry, pickled = entry
+            if expiry <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+
+        return pickle.loads(pickled)
+
+    def _local_set(self, key, value, timeout):
+        local_timeout = self.local_timeout
+        backend_timeout = self.get_backend_timeout(timeout)
+        if backend_timeout is not None:
+            local_timeout = min(local_timeout, backend_timeout - time.time())
+        if local_timeout <= 0:
+            self._local_delete(key)
+            return
+
+        pickled = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[key] = (time.monotonic() + local_timeout, pickled)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_delete(self, key):
+        with self._lock:
+            self._local.pop(key, None)
+
+    def _local_clear(self):
+        with self._lock:
+            self._local.clear()
+
+    # Shared tier
+
+    def _is_shared_down(self):
+        return time.monotonic() < self._shared_down_until
+
+    def _shared_failed(self, exc):
+        logger.warning('Shared cache %r unavailable, using the local cache only: %s', self.shared_alias, exc)
+        self._shared_down_until = time.monotonic() + self.retry_interval
+        # Writes of other workers are missed from now on
+        self._generation = None
+
+    def _call_shared(self, method, *args, **kwargs):
+        """Calls a method of the shared cache, returning (succeeded, result)."""
+        if self._is_shared_down():
+            return False, None
+        try:
+            return True, getattr(self.shared, method)(*args, **kwargs)
+        except Exception as exc:
+            self._shared_failed(exc)
+            return False, None
+
+    def _sync_generation(self):
+        now = time.monotonic()
+        if now < self._next_generation_check:
+            return
+        self._next_generation_check = now + self.generation_interval
+
+        succeeded, generation = self._call_shared('get', GENERATION_KEY, version=1)
+        if succeeded and generation != self._generation:
+            self._local_clear()
+            self._generation = generation
+
+    def _invalidates(self, keys):
+        return any(str(key).startswith(self.invalidation_prefixes) for key in keys)
+
+    def _bump_generation(self, keys):
+        if not self._invalidates(keys):
+            return
+
+        self._call_shared('add', GENERATION_KEY, 0, None, version=1)
+        succeeded, generation = self._call_shared('incr', GENERATION_KEY, version=1)
+        if not succeeded:
+            return
+        # Entries of this worker are only current if nobody else wrote since the last check
+        if self._generation is None or generation != self._generation + 1:
+            self._local_clear()
+        self._generation = generation
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        version = self._version(version)
+        local_key = self.make_key(key, version)
+        self.validate_key(local_key)
+        self._sync_generation()
+
+        value = self._local_get(local_key)
+        if value is not None:
+            return value
+
+        succeeded, value = self._call_shared('get', key, version=version)
+        if not succeeded or value is None:
+            return default
+        self._local_set(local_key, value, DEFAULT_TIMEOUT)
+
+        return value
+
+    def get_many(self, keys, version=None):
+        version = self._version(version)
+        self._sync_generation()
+
+        values, missing = {}, []
+        for key in keys:
+            local_key = self.make_key(key, version)
+            self.validate_key(local_key)
+            value = self._local_get(local_key)
+            if value is None:
+                missing.append(key)
+            else:
+                values[key] = value
+
+        if missing:
+            succeeded, shared_values = self._call_shared('get_many', missing, version=version)
+            for key, value in (shared_values or {}).items():
+                self._local_set(self.make_key(key, version), value, DEFAULT_TIMEOUT)
+                values[key] = value
+
+        return values
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        local_key = self.make_key(key, version)
+        self.validate_key(local_key)
+
+        self._call_shared('set', key, value, timeout, version=version)
+        self._bump_generation([key])
+        self._local_set(local_key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+
+        self._call_shared('set_many', data, timeout, version=version)
+        self._bump_generation(data)
+        for key, value in data.items():
+            self._local_set(self.make_key(key, version), value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        version = self._version(version)
+        local_key = self.make_key(key, version)
+        self.validate_key(local_key)
+
+        succeeded, added = self._call_shared('add', key, value, timeout, version=version)
+        if not succeeded:
+            added = self._local_get(local_key) is None
+        if added:
+            self._bump_generation([key])
+            self._local_set(local_key, value, timeout)
+
+        return added
+
+    def delete(self, key, version=None):
+        version = self._version(version)
+        local_key = self.make_key(key, version)
+        self.validate_key(local_key)
+
+        self._call_shared('delete', key, version=version)
+        self._bump_generation([key])
+        self._local_delete(local_key)
+
+    def delete_many(self, keys, version=None):
+        version = self._version(version)
+
+        self._call_shared('delete_many', keys, version=version)
+        self._bump_generation(keys)
+        for key in keys:
+            self._local_delete(self.make_key(key, version))
+
+    def incr(self, key, delta=1, version=None):
+        version = self._version(version)
+        local_key = self.make_key(key, version)
+
+        succeeded, value = self._call_shared('incr', key, delta, version=version)
+        if not succeeded:
+            value = self._local_get(local_key)
+            if value is None:
+                raise ValueError("Key '%s' not found" % key)
+            value += delta
+            self._local_set(local_key, value, DEFAULT_TIMEOUT)
+            return value
+
+        self._bump_generation([key])
+        self._local_delete(local_key)
+
+        return value
+
+    def clear(self):
+        self._call_shared('clear')
+        self._local_clear()
+        self._generation = None
+
+    def close(self, **kwargs):
+        if not self._is_shared_down():
+            self.shared.close(**kwargs)
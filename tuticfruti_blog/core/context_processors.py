@@ -3,3 +3,7 @@ from django.conf import settings
 
 def ckeditor(request):
     return {'CKE_CODESNIPPET_THEME': settings.CKEDITOR_CONFIGS.get('default').get('codeSnippet_theme')}
+
+
+def posts(request):
+    return {'POSTS_FRAGMENT_CACHE_TIMEOUT': settings.POSTS_FRAGMENT_CACHE_TIMEOUT}
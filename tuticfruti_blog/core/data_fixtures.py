@@ -1,10 +1,21 @@
+import contextlib
 import datetime
+import itertools
+import random
 
+from django.contrib.auth.hashers import make_password
+from django.template.defaultfilters import slugify
 from django.utils import timezone
 
 from tuticfruti_blog.users.models import User
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.posts import caching
+from tuticfruti_blog.posts import facets
 from tuticfruti_blog.posts import factories
 from tuticfruti_blog.posts import models
+from tuticfruti_blog.posts import search
+
+BASE_CLASS_NAMES = ('DataFixtures', 'ScaledDataFixtures')
 
 
 class RegistryHolder(type):
@@ -12,7 +23,7 @@ class RegistryHolder(type):
 
     def __new__(cls, name, bases, attrs):
         new_cls = super(RegistryHolder, cls).__new__(cls, name, bases, attrs)
-        if new_cls.__name__ != 'DataFixtures':
+        if new_cls.__name__ not in BASE_CLASS_NAMES:
             cls.REGISTRY[new_cls.get_order()] = new_cls
         return new_cls
 
@@ -143,3 +154,204 @@ class LoadCommentData(DataFixtures):
     @staticmethod
     def get_order():
         return 5
+
+
+class ScaledRegistryHolder(RegistryHolder):
+    REGISTRY = {}
+
+
+def _batches(iterable, batch_size):
+    iterator = iter(iterable)
+    batch = list(itertools.islice(iterator, batch_size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(iterator, batch_size))
+
+
+@contextlib.contextmanager
+def _explicit_dates(model):
+    """Lets bulk_create store the given created and modified dates instead of the current time."""
+    fields = [field for field in model._meta.fields if getattr(field, 'auto_now', False) or
+              getattr(field, 'auto_now_add', False)]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class ScaledDataFixtures(DataFixtures, metaclass=ScaledRegistryHolder):
+    """
+    Synthetic dataset for load testing, sized by a scale factor.
+
+    Scale 1 means 1,000 posts and 10,000 comments. Rows are inserted with bulk_create in batches
+    of at most MAX_BATCH_SIZE rows, every random choice coming from a seeded generator and every
+    date from START, so the same scale and seed always build the same data. Meant to be loaded
+    into an empty database.
+    """
+    START = datetime.datetime(2015, 1, 1, tzinfo=timezone.utc)
+    # Batches are also looked up by slug and pk, SQLite allows 999 parameters per query
+    MAX_BATCH_SIZE = 900
+
+    @staticmethod
+    def load(scale=1, batch_size=MAX_BATCH_SIZE, seed=0):
+        batch_size = min(batch_size, ScaledDataFixtures.MAX_BATCH_SIZE)
+        rng = random.Random(seed)
+        for key in sorted(ScaledRegistryHolder.get_registry()):
+            ScaledRegistryHolder.get_registry().get(key).load(scale, batch_size, rng)
+
+        # bulk_create sends no signals, so denormalized data is rebuilt at once
+        models.Post.objects.refresh_published_comment_count(touch=False)
+        backend = search.get_search_backend()
+        for pks in _batches(models.Post.objects.order_by('pk').values_list('pk', flat=True), batch_size):
+            backend.index(pks)
+        search.bump_generation()
+        facets.bump_generation()
+        # Other workers may rebuild their results and indexes before the data is committed
+        transactions.after_commit(search.bump_generation)
+        transactions.after_commit(facets.bump_generation)
+        caching.invalidate_lists()
+        caching.invalidate_navigation()
+
+
+class LoadScaledUserData(ScaledDataFixtures):
+    PER_SCALE = 5
+
+    @staticmethod
+    def load(scale, batch_size, rng):
+        password = make_password(None)
+        users = (
+            User(username='author{}'.format(n), email='author{}@example.com'.format(n), password=password)
+            for n in range(LoadScaledUserData.PER_SCALE * scale))
+        for batch in _batches(users, batch_size):
+            User.objects.bulk_create(batch)
+
+    @staticmethod
+    def get_order():
+        return 1
+
+
+class LoadScaledCategoryData(ScaledDataFixtures):
+    COUNT = 20
+    DISABLED = 2
+
+    @staticmethod
+    def load(scale, batch_size, rng):
+        models.Category.objects.bulk_create(
+            models.Category(
+                name='Category {}'.format(n),
+                slug=slugify('Category {}'.format(n)),
+                order=n,
+                is_enabled=n >= LoadScaledCategoryData.DISABLED)
+            for n in range(LoadScaledCategoryData.COUNT))
+
+    @staticmethod
+    def get_order():
+        return 2
+
+
+class LoadScaledTagData(ScaledDataFixtures):
+    PER_SCALE = 50
+
+    @staticmethod
+    def load(scale, batch_size, rng):
+        tags = (models.Tag(term='tag{}'.format(n)) for n in range(LoadScaledTagData.PER_SCALE * scale))
+        for batch in _batches(tags, batch_size):
+            models.Tag.objects.bulk_create(batch)
+
+    @staticmethod
+    def get_order():
+        return 3
+
+
+class LoadScaledPostData(ScaledDataFixtures):
+    PER_SCALE = 1000
+    PUBLISHED_RATIO = 0.9
+    MAX_CATEGORIES = 3
+    MAX_TAGS = 5
+    INTERVAL = datetime.timedelta(hours=1)
+
+    @staticmethod
+    def _build(n, user_pks, rng):
+        title = 'Scaled post {}'.format(n)
+        content = rng.choice(factories.FUZZY_TEXTS)
+        excerpt, body = models.Post.split_content(content)
+        created = ScaledDataFixtures.START + n * LoadScaledPostData.INTERVAL
+        is_published = rng.random() < LoadScaledPostData.PUBLISHED_RATIO
+
+        return models.Post(
+            author_id=rng.choice(user_pks),
+            title=title,
+            slug=slugify(title),
+            content=content,
+            excerpt=excerpt,
+            body=body,
+            status_id=models.Post.STATUS_PUBLISHED if is_published else models.Post.STATUS_DRAFT,
+            created=created,
+            modified=created)
+
+    @staticmethod
+    def load(scale, batch_size, rng):
+        user_pks = list(User.objects.order_by('pk').values_list('pk', flat=True))
+        category_pks = list(models.Category.objects.order_by('pk').values_list('pk', flat=True))
+        tag_pks = list(models.Tag.objects.order_by('pk').values_list('pk', flat=True))
+        PostCategory = models.Post.categories.through
+        PostTag = models.Post.tags.through
+
+        posts = (LoadScaledPostData._build(n, user_pks, rng) for n in range(LoadScaledPostData.PER_SCALE * scale))
+        for batch in _batches(posts, batch_size):
+            with _explicit_dates(models.Post):
+                models.Post.objects.bulk_create(batch)
+
+            # Primary keys are not set by bulk_create on every backend
+            pks = models.Post.objects \
+                .filter(slug__in=[post.slug for post in batch]) \
+                .order_by('pk') \
+                .values_list('pk', flat=True)
+            post_categories, post_tags = [], []
+            for pk in pks:
+                for category_pk in rng.sample(category_pks, rng.randint(1, LoadScaledPostData.MAX_CATEGORIES)):
+                    post_categories.append(PostCategory(post_id=pk, category_id=category_pk))
+                for tag_pk in rng.sample(tag_pks, rng.randint(0, LoadScaledPostData.MAX_TAGS)):
+                    post_tags.append(PostTag(post_id=pk, tag_id=tag_pk))
+            PostCategory.objects.bulk_create(post_categories)
+            PostTag.objects.bulk_create(post_tags)
+
+    @staticmethod
+    def get_order():
+        return 4
+
+
+class LoadScaledCommentData(ScaledDataFixtures):
+    PER_SCALE = 10000
+    PUBLISHED_RATIO = 0.8
+
+    @staticmethod
+    def _build(n, posts, rng):
+        post_pk, post_created = rng.choice(posts)
+        created = post_created + datetime.timedelta(minutes=rng.randint(1, 60 * 24 * 30))
+        is_published = rng.random() < LoadScaledCommentData.PUBLISHED_RATIO
+
+        return models.Comment(
+            post_id=post_pk,
+            status_id=models.Comment.STATUS_PUBLISHED if is_published else models.Comment.STATUS_PENDING,
+            author='reader{}'.format(n % 1000),
+            email='reader{}@example.com'.format(n % 1000),
+            content=rng.choice(factories.FUZZY_TEXTS),
+            created=created,
+            modified=created)
+
+    @staticmethod
+    def load(scale, batch_size, rng):
+        posts = list(models.Post.objects.order_by('pk').values_list('pk', 'created'))
+        comments = (LoadScaledCommentData._build(n, posts, rng) for n in range(LoadScaledCommentData.PER_SCALE * scale))
+        for batch in _batches(comments, batch_size):
+            with _explicit_dates(models.Comment):
+                models.Comment.objects.bulk_create(batch)
+
+    @staticmethod
+    def get_order():
+        return 5
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import json
+import platform
+import subprocess
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from tuticfruti_blog.core import benchmarks
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.posts import models
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=str(settings.ROOT_DIR), stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks the public views against a scaled dataset in a test database and prints JSON results.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            action='store',
+            dest='scale',
+            type=int,
+            default=1,
+            help='Scale factor of the dataset, see load_scaled_data. Defaults to 1.')
+        parser.add_argument(
+            '--seed',
+            action='store',
+            dest='seed',
+            type=int,
+            default=0,
+            help='Seed of the dataset random generator. Defaults to 0.')
+        parser.add_argument(
+            '--requests',
+            action='store',
+            dest='requests',
+            type=int,
+            default=50,
+            help='Number of timed requests per view. Defaults to 50.')
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            dest='keepdb',
+            default=False,
+            help='Preserves the test database and its dataset between runs, ignoring --scale and --seed once loaded.')
+        parser.add_argument(
+            '--output',
+            action='store',
+            dest='output',
+            default=None,
+            help='Writes the results to this file instead of the standard output.')
+
+    def handle(self, *args, **options):
+        scale, seed, keepdb = options.get('scale'), options.get('seed'), options.get('keepdb')
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=keepdb)
+        try:
+            loaded = not models.Post.objects.exists()
+            if loaded:
+                data_fixtures.ScaledDataFixtures.load(scale=scale, seed=seed)
+            # A kept dataset may have been loaded with other options
+            num_posts, num_comments = models.Post.objects.count(), models.Comment.objects.count()
+            # Like the test runner, without debug tooling skewing the numbers
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                results = benchmarks.run(Client(), benchmarks.get_scenarios(), options.get('requests'))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+            teardown_test_environment()
+
+        report = dict(
+            revision=_git_revision(),
+            created=timezone.now().isoformat(),
+            python=platform.python_version(),
+            django=django.get_version(),
+            database=connection.vendor,
+            page_cache_enabled=getattr(settings, 'PAGE_CACHE_ENABLED', True),
+            scale=scale if loaded else None,
+            seed=seed if loaded else None,
+            posts=num_posts,
+            comments=num_comments,
+            views=results)
+        content = json.dumps(report, indent=2, sort_keys=True)
+
+        if options.get('output'):
+            with open(options.get('output'), 'w') as output:
+                output.write(content)
+        else:
+            self.stdout.write(content)
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.posts import models
+
+
+class Command(BaseCommand):
+    help = 'Loads a reproducible synthetic dataset for load testing into an empty database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            action='store',
+            dest='scale',
+            type=int,
+            default=1,
+            help='Scale factor, 1 meaning 1,000 posts and 10,000 comments. Defaults to 1.')
+        parser.add_argument(
+            '--batch-size',
+            action='store',
+            dest='batch_size',
+            type=int,
+            default=data_fixtures.ScaledDataFixtures.MAX_BATCH_SIZE,
+            help='Number of rows inserted per statement, at most and by default {}.'.format(
+                data_fixtures.ScaledDataFixtures.MAX_BATCH_SIZE))
+        parser.add_argument(
+            '--seed',
+            action='store',
+            dest='seed',
+            type=int,
+            default=0,
+            help='Seed of the random generator. Defaults to 0.')
+
+    def handle(self, *args, **options):
+        with transactions.atomic():
+            data_fixtures.ScaledDataFixtures.load(
+                scale=options.get('scale'),
+                batch_size=options.get('batch_size'),
+                seed=options.get('seed'))
+
+        self.stdout.write('{} posts and {} comments loaded.'.format(
+            models.Post.objects.count(), models.Comment.objects.count()))
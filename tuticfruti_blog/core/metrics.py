@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+In-process request metrics exposed in the Prometheus text format.
+
+Histograms are aggregated per process, so every worker reports its own requests and the
+scraper sums them up. Database cursors are wrapped to count queries and time them without
+the SQL logging of DEBUG.
+"""
+import bisect
+import threading
+import time
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets, label_names):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.get(key, ([0] * (len(self.buckets) + 1), 0))
+            counts[index] += 1
+            self._series[key] = (counts, total + value)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def _labels(self, key, **extra):
+        labels = list(zip(self.label_names, key)) + list(extra.items())
+        return ','.join('{}="{}"'.format(name, _escape(value)) for name, value in labels)
+
+    def render(self):
+        lines = [
+            '# HELP {} {}'.format(self.name, self.documentation),
+            '# TYPE {} histogram'.format(self.name),
+        ]
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+
+        for key, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf', ), counts):
+                cumulative += count
+                lines.append('{}_bucket{{{}}} {}'.format(self.name, self._labels(key, le=bound), cumulative))
+            lines.append('{}_sum{{{}}} {}'.format(self.name, self._labels(key), total))
+            lines.append('{}_count{{{}}} {}'.format(self.name, self._labels(key), cumulative))
+
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+LABEL_NAMES = ('view', 'method')
+
+REQUEST_DURATION = Histogram(
+    'blog_request_duration_seconds', 'Total request latency.', DURATION_BUCKETS, LABEL_NAMES)
+REQUEST_QUERIES = Histogram(
+    'blog_request_queries', 'SQL queries per request.', QUERIES_BUCKETS, LABEL_NAMES)
+REQUEST_SQL_DURATION = Histogram(
+    'blog_request_sql_duration_seconds', 'Time spent running SQL queries per request.', DURATION_BUCKETS, LABEL_NAMES)
+REQUEST_TEMPLATE_DURATION = Histogram(
+    'blog_request_template_duration_seconds', 'Time spent rendering template responses per request.',
+    DURATION_BUCKETS, LABEL_NAMES)
+
+HISTOGRAMS = (REQUEST_DURATION, REQUEST_QUERIES, REQUEST_SQL_DURATION, REQUEST_TEMPLATE_DURATION)
+
+
+def render():
+    return '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n'
+
+
+def clear():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+def add_template_duration(request, duration):
+    """Adds render time to the request, for responses rendered by the view before reaching the middleware."""
+    if hasattr(request, 'metrics_template_duration'):
+        request.metrics_template_duration += duration
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+class MeteredCursor:
+    """Proxies a cursor wrapper, counting and timing the statements it runs."""
+
+    def __init__(self, cursor, counter):
+        self.cursor = cursor
+        self.counter = counter
+
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        return self.cursor.__exit__(type, value, traceback)
+
+    def _metered(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.counter.count += 1
+            self.counter.duration += time.perf_counter() - start
+
+    def callproc(self, *args):
+        return self._metered(self.cursor.callproc, *args)
+
+    def execute(self, *args):
+        return self._metered(self.cursor.execute, *args)
+
+    def executemany(self, *args):
+        return self._metered(self.cursor.executemany, *args)
+
+
+def get_query_counter(connection):
+    """Returns the query counter of a connection, metering its cursors on first use."""
+    counter = getattr(connection, 'query_counter', None)
+    if counter is None:
+        counter = connection.query_counter = QueryCounter()
+        make_cursor, make_debug_cursor = connection.make_cursor, connection.make_debug_cursor
+        connection.make_cursor = lambda cursor: MeteredCursor(make_cursor(cursor), counter)
+        connection.make_debug_cursor = lambda cursor: MeteredCursor(make_debug_cursor(cursor), counter)
+
+    return counter
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from . import metrics
+from . import routers
+from .transactions import SAFE_METHODS
+
+UNRESOLVED_VIEW = '<unresolved>'
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, SQL queries, SQL time and template render time of every request.
+
+    Observations are labeled with the view name and the HTTP method. Should be listed first,
+    so the latency includes every other middleware. Disabled by the METRICS_ENABLED setting.
+    """
+
+    def __init__(self):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+
+    def _query_totals(self):
+        counters = [metrics.get_query_counter(connection) for connection in connections.all()]
+
+        return sum(counter.count for counter in counters), sum(counter.duration for counter in counters)
+
+    def process_request(self, request):
+        request.metrics_start = time.perf_counter()
+        request.metrics_queries = self._query_totals()
+        request.metrics_template_duration = 0.0
+
+    def process_template_response(self, request, response):
+        start = time.perf_counter()
+
+        def record_render(response):
+            metrics.add_template_duration(request, time.perf_counter() - start)
+
+        response.add_post_render_callback(record_render)
+
+        return response
+
+    def process_response(self, request, response):
+        if not hasattr(request, 'metrics_start'):
+            return response
+
+        duration = time.perf_counter() - request.metrics_start
+        num_queries, sql_duration = self._query_totals()
+        resolver_match = getattr(request, 'resolver_match', None)
+        labels = dict(
+            view=resolver_match.view_name if resolver_match else UNRESOLVED_VIEW,
+            method=request.method)
+
+        metrics.REQUEST_DURATION.observe(duration, **labels)
+        metrics.REQUEST_QUERIES.observe(num_queries - request.metrics_queries[0], **labels)
+        metrics.REQUEST_SQL_DURATION.observe(sql_duration - request.metrics_queries[1], **labels)
+        metrics.REQUEST_TEMPLATE_DURATION.observe(request.metrics_template_duration, **labels)
+
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Reads from a random replica of DATABASE_REPLICAS in the safe requests of DATABASE_REPLICA_VIEWS.
+
+    Views are matched by url name or namespace. A client is pinned to the primary for
+    DATABASE_REPLICA_LAG seconds after any unsafe request, so it reads its own writes.
+    """
+    pin_cookie_name = 'read_primary_until'
+
+    def _is_pinned(self, request):
+        try:
+            return float(request.COOKIES.get(self.pin_cookie_name, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def _is_replica_view(self, request):
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return False
+
+        views = getattr(settings, 'DATABASE_REPLICA_VIEWS', ())
+
+        return resolver_match.view_name in views or any(
+            namespace in views for namespace in resolver_match.namespaces)
+
+    def process_request(self, request):
+        routers.set_replica(None)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if (replicas and request.method in SAFE_METHODS and
+                self._is_replica_view(request) and not self._is_pinned(request)):
+            routers.set_replica(random.choice(replicas))
+
+    def process_response(self, request, response):
+        routers.set_replica(None)
+
+        lag = getattr(settings, 'DATABASE_REPLICA_LAG', 0)
+        if request.method not in SAFE_METHODS and lag:
+            response.set_cookie(self.pin_cookie_name, str(time.time() + lag), max_age=lag, httponly=True)
+
+        return response
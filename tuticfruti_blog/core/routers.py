@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""
+Read replica routing.
+
+ReplicaMiddleware picks a replica for the safe requests of the public views, reads of the
+current thread then go to it until the response is finished. Every other read, and every
+write, goes to the primary database.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+
+_state = threading.local()
+
+
+def get_replica():
+    """Returns the replica alias the current thread reads from, None for the primary."""
+    return getattr(_state, 'replica', None)
+
+
+def set_replica(alias):
+    _state.replica = alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return get_replica()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
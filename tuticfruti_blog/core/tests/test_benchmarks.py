@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from django import test
+
+from tuticfruti_blog.core import benchmarks
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.posts import models
+
+
+class PercentileTest(unittest.TestCase):
+    def test_nearest_rank(self):
+        values = list(range(100, 0, -1))
+
+        self.assertEqual(benchmarks.percentile(values, 50), 50)
+        self.assertEqual(benchmarks.percentile(values, 95), 95)
+        self.assertEqual(benchmarks.percentile(values, 100), 100)
+
+    def test_single_value(self):
+        self.assertEqual(benchmarks.percentile([3], 95), 3)
+
+
+class TestBenchmarks(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+
+    def test_every_public_view_is_benchmarked(self):
+        results = benchmarks.run(test.Client(), benchmarks.get_scenarios(), requests=2)
+
+        self.assertEqual(
+            set(results),
+            {
+                'list', 'list_last_page', 'list_by_category', 'list_by_tag', 'browse', 'search', 'detail',
+                'detail_comment'})
+        for result in results.values():
+            self.assertEqual(result['requests'], 2)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertGreater(result['queries'], 0)
+
+    def test_bytes_rendered_are_recorded(self):
+        results = benchmarks.run(test.Client(), benchmarks.get_scenarios(), requests=1)
+
+        self.assertGreater(results['detail']['bytes'], 0)
+        self.assertEqual(results['detail_comment']['bytes'], 0)
+
+    def test_unexpected_status_code_fails(self):
+        scenario = benchmarks.Scenario('missing', '/missing/')
+
+        with self.assertRaises(AssertionError):
+            benchmarks.run_scenario(test.Client(), scenario, requests=1)
+
+    def test_comments_are_posted(self):
+        num_comments = models.Comment.objects.count()
+        scenario = [scenario for scenario in benchmarks.get_scenarios() if scenario.name == 'detail_comment'][0]
+        benchmarks.run_scenario(test.Client(), scenario, requests=1, warmup=0)
+
+        self.assertEqual(models.Comment.objects.count(), num_comments + 1)
+
+    @test.override_settings(POSTS_PAGINATION_MODE='cursor')
+    def test_last_page_is_reached_by_cursor(self):
+        scenario = [scenario for scenario in benchmarks.get_scenarios() if scenario.name == 'list_last_page'][0]
+        res = scenario.request(test.Client())
+        oldest_post = models.Post.objects.all_published().order_by('created', 'pk').first()
+
+        self.assertEqual(res.status_code, 200)
+        self.assertIn(oldest_post, res.context_data['posts'])
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+import time
+import unittest
+from unittest import mock
+
+from django.core.cache import cache as django_cache
+from django.db import DatabaseError
+from django.test.utils import override_settings
+
+from tuticfruti_blog.core import cache
+from tuticfruti_blog.core import routers
+
+
+class TaggedCacheTest(unittest.TestCase):
+    def setUp(self):
+        django_cache.clear()
+        cache.set_tagged('key', 'value', ['tag0', 'tag1'])
+
+    def test_get_tagged(self):
+        self.assertEqual(cache.get_tagged('key'), 'value')
+
+    def test_missing_key(self):
+        self.assertIsNone(cache.get_tagged('missing'))
+
+    def test_invalidate_tag(self):
+        cache.invalidate_tags(['tag1'])
+
+        self.assertIsNone(cache.get_tagged('key'))
+
+    def test_invalidate_unrelated_tag(self):
+        cache.invalidate_tags(['tag2'])
+
+        self.assertEqual(cache.get_tagged('key'), 'value')
+
+    def test_evicted_tag_invalidates_entries(self):
+        django_cache.delete('{}tag0'.format(cache.TAG_KEY_PREFIX))
+
+        self.assertIsNone(cache.get_tagged('key'))
+
+    def test_get_tag_versions_are_stable(self):
+        versions = cache.get_tag_versions(['tag0', 'tag3'])
+
+        self.assertEqual(cache.get_tag_versions(['tag0', 'tag3']), versions)
+
+    def test_invalidation_while_computing_makes_entry_stale(self):
+        versions = cache.get_tag_versions(['tag0'])
+        cache.invalidate_tags(['tag0'])
+        cache.set_tagged('computed', 'value', versions=versions)
+
+        self.assertIsNone(cache.get_tagged('computed'))
+
+    @override_settings(DATABASE_REPLICA_LAG=5)
+    def test_replica_reads_shortly_after_invalidation_are_not_stored(self):
+        cache.invalidate_tags(['tag0'])
+        versions = cache.get_tag_versions(['tag0'])
+        routers.set_replica('replica')
+        self.addCleanup(routers.set_replica, None)
+        cache.set_tagged('computed', 'value', versions=versions)
+
+        self.assertIsNone(cache.get_tagged('computed'))
+
+
+class GetOrComputeTest(unittest.TestCase):
+    def setUp(self):
+        django_cache.clear()
+        self.compute = mock.Mock(return_value=('value', ['tag']))
+
+    def _get(self, **kwargs):
+        return cache.get_or_compute('key', self.compute, **kwargs)
+
+    def _lock(self):
+        django_cache.add('{}key'.format(cache.LOCK_KEY_PREFIX), 'another worker')
+
+    def test_miss_is_computed_once(self):
+        self.assertEqual(self._get(), 'value')
+        self.assertEqual(self._get(), 'value')
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_uncacheable_values_are_not_cached(self):
+        self.compute.return_value = (None, [])
+        self._get()
+        self._get()
+
+        self.assertEqual(self.compute.call_count, 2)
+
+    def test_stale_after_soft_timeout(self):
+        self._get(soft_timeout=60)
+        self.compute.return_value = ('new value', ['tag'])
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertEqual(self._get(soft_timeout=60), 'new value')
+
+    def test_stale_after_tag_invalidation(self):
+        self._get()
+        self.compute.return_value = ('new value', ['tag'])
+        cache.invalidate_tags(['tag'])
+
+        self.assertEqual(self._get(), 'new value')
+
+    def test_invalidation_while_computing_is_not_cached(self):
+        def compute():
+            cache.invalidate_tags(['tag'])
+            return 'value', ['tag']
+
+        self.compute.side_effect = compute
+
+        self.assertEqual(self._get(), 'value')
+        self.assertEqual(self._get(), 'value')
+        self.assertEqual(self.compute.call_count, 2)
+
+    def _read_from_replica(self):
+        routers.set_replica('replica')
+        self.addCleanup(routers.set_replica, None)
+
+    @override_settings(DATABASE_REPLICA_LAG=5)
+    def test_replica_reads_shortly_after_invalidation_are_not_cached(self):
+        cache.invalidate_tags(['tag'])
+        self._read_from_replica()
+        self._get()
+        self._get()
+
+        self.assertEqual(self.compute.call_count, 2)
+
+    @override_settings(DATABASE_REPLICA_LAG=5)
+    def test_replica_reads_are_cached_once_the_lag_is_over(self):
+        cache.invalidate_tags(['tag'])
+        self._read_from_replica()
+        with mock.patch('time.time', return_value=time.time() + 6):
+            self._get()
+            self._get()
+
+        self.assertEqual(self.compute.call_count, 1)
+
+    @override_settings(DATABASE_REPLICA_LAG=5)
+    def test_primary_reads_after_invalidation_are_cached(self):
+        cache.invalidate_tags(['tag'])
+        self._get()
+        self._get()
+
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_lock_is_released(self):
+        self._get()
+
+        self.assertIsNone(django_cache.get('{}key'.format(cache.LOCK_KEY_PREFIX)))
+
+    def test_stale_value_is_served_while_another_worker_computes(self):
+        self._get()
+        cache.invalidate_tags(['tag'])
+        self._lock()
+
+        self.assertEqual(self._get(), 'value')
+        self.assertEqual(self.compute.call_count, 1)
+
+    def test_stale_value_is_served_on_database_errors(self):
+        self._get()
+        cache.invalidate_tags(['tag'])
+        self.compute.side_effect = DatabaseError
+
+        self.assertEqual(self._get(), 'value')
+        self.assertIsNone(django_cache.get('{}key'.format(cache.LOCK_KEY_PREFIX)))
+
+    def test_database_errors_without_stale_value_are_raised(self):
+        self.compute.side_effect = DatabaseError
+
+        with self.assertRaises(DatabaseError):
+            self._get()
+
+    def test_miss_waits_for_another_worker(self):
+        self._lock()
+
+        def another_worker_computes(seconds):
+            django_cache.set('key', ({}, 'value of another worker', None))
+
+        with mock.patch('time.sleep', side_effect=another_worker_computes):
+            self.assertEqual(self._get(), 'value of another worker')
+        self.assertFalse(self.compute.called)
+
+    def test_miss_is_computed_when_another_worker_gives_up(self):
+        self._lock()
+
+        with mock.patch('time.sleep'):
+            self.assertEqual(self._get(lock_timeout=0.01), 'value')
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django import test
+
+from tuticfruti_blog.core.cache_backends import TwoTierCache
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'two-tier-shared',
+    },
+}
+
+
+@test.override_settings(CACHES=CACHES)
+class TestTwoTierCache(test.SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.worker = self._worker()
+        self.another_worker = self._worker()
+
+    def _worker(self, **options):
+        defaults = dict(LOCAL_MAX_ENTRIES=3, LOCAL_TIMEOUT=60, GENERATION_INTERVAL=0)
+        defaults.update(options)
+
+        return TwoTierCache('shared', dict(OPTIONS=defaults))
+
+    def test_set_and_get(self):
+        self.worker.set('key', 'value')
+
+        self.assertEqual(self.worker.get('key'), 'value')
+        self.assertEqual(caches['shared'].get('key'), 'value')
+        self.assertEqual(self.another_worker.get('key'), 'value')
+
+    def test_hits_are_served_locally(self):
+        self.worker.set('key', 'value')
+        with mock.patch.object(caches['shared'], 'get', wraps=caches['shared'].get) as shared_get:
+            self.worker.get('key')
+
+        # Only the generation is asked for
+        self.assertEqual(shared_get.call_count, 1)
+
+    def test_local_values_are_copies(self):
+        self.worker.set('key', {'a': 1})
+        self.worker.get('key').pop('a')
+
+        self.assertEqual(self.worker.get('key'), {'a': 1})
+
+    def test_local_tier_is_bounded(self):
+        for i in range(4):
+            self.worker.set('key{}'.format(i), i)
+        self.worker.get('key1')
+        self.worker.set('key4', 4)
+
+        self.assertEqual(len(self.worker._local), 3)
+        self.assertNotIn(self.worker.make_key('key0'), self.worker._local)
+        self.assertIn(self.worker.make_key('key1'), self.worker._local)
+
+    def test_local_entries_expire(self):
+        worker = self._worker(LOCAL_TIMEOUT=0.01)
+        worker.set('key', 'value')
+        caches['shared'].set('key', 'changed behind its back')
+
+        with mock.patch('time.monotonic', return_value=10 ** 9):
+            self.assertEqual(worker.get('key'), 'changed behind its back')
+
+    def test_versions_are_part_of_the_key(self):
+        self.worker.set('key', 'first', version=1)
+        self.worker.set('key', 'second', version=2)
+
+        self.assertEqual(self.worker.get('key', version=1), 'first')
+        self.assertEqual(self.worker.get('key', version=2), 'second')
+        self.assertEqual(self.another_worker.get('key', version=1), 'first')
+
+    def test_invalidating_writes_reach_other_workers(self):
+        self.worker.set('tag:key', 'old')
+        self.another_worker.get('tag:key')
+        self.worker.set('tag:key', 'new')
+
+        self.assertEqual(self.another_worker.get('tag:key'), 'new')
+
+    def test_invalidating_deletes_reach_other_workers(self):
+        self.worker.set('tag:key', 'value')
+        self.another_worker.get('tag:key')
+        self.worker.delete('tag:key')
+
+        self.assertIsNone(self.another_worker.get('tag:key'))
+
+    def test_other_writes_keep_the_local_tier_of_other_workers(self):
+        self.another_worker.set('tag:key', 'value')
+        self.another_worker.get('tag:key')
+        self.worker.set('page:key', 'page')
+        self.worker.delete('lock:key')
+        with mock.patch.object(caches['shared'], 'get', wraps=caches['shared'].get) as shared_get:
+            self.assertEqual(self.another_worker.get('tag:key'), 'value')
+
+        # Only the generation is asked for
+        self.assertEqual(shared_get.call_count, 1)
+        self.assertIn(self.another_worker.make_key('tag:key'), self.another_worker._local)
+
+    def test_other_writes_do_not_bump_the_generation(self):
+        with mock.patch.object(caches['shared'], 'incr') as shared_incr:
+            self.worker.set('page:key', 'page')
+            self.worker.add('lock:key', 'token')
+            self.worker.delete('lock:key')
+
+        self.assertFalse(shared_incr.called)
+
+    def test_other_writes_reach_other_workers_once_their_copy_expires(self):
+        self.worker.set('key', 'old')
+        self.another_worker.get('key')
+        self.worker.set('key', 'new')
+
+        self.assertEqual(self.another_worker.get('key'), 'old')
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 120):
+            self.assertEqual(self.another_worker.get('key'), 'new')
+
+    def test_writes_reach_other_workers_after_the_generation_interval(self):
+        another_worker = self._worker(LOCAL_TIMEOUT=3600, GENERATION_INTERVAL=60)
+        self.worker.set('tag:key', 'old')
+        another_worker.get('tag:key')
+        self.worker.set('tag:key', 'new')
+
+        self.assertEqual(another_worker.get('tag:key'), 'old')
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 120):
+            self.assertEqual(another_worker.get('tag:key'), 'new')
+
+    def test_get_many_and_set_many(self):
+        self.worker.set_many({'a': 1, 'b': 2})
+        self.another_worker.get('a')
+
+        self.assertEqual(self.another_worker.get_many(['a', 'b', 'c']), {'a': 1, 'b': 2})
+
+    def test_add(self):
+        self.assertTrue(self.worker.add('key', 'first'))
+        self.assertFalse(self.another_worker.add('key', 'second'))
+        self.assertEqual(self.another_worker.get('key'), 'first')
+
+    def test_incr(self):
+        self.worker.set('generation:counter', 1)
+        self.another_worker.get('generation:counter')
+
+        self.assertEqual(self.worker.incr('generation:counter'), 2)
+        self.assertEqual(self.another_worker.get('generation:counter'), 2)
+
+    def test_falls_back_to_local_tier_when_shared_cache_is_down(self):
+        self.worker.set('key', 'value')
+        with mock.patch.object(caches['shared'], 'get', side_effect=ConnectionError), \
+                mock.patch.object(caches['shared'], 'set', side_effect=ConnectionError) as shared_set:
+            self.assertEqual(self.worker.get('key'), 'value')
+            self.worker.set('another_key', 'another value')
+            self.worker.set('yet_another_key', 'yet another value')
+
+            self.assertEqual(self.worker.get('another_key'), 'another value')
+            # Not called again before the retry interval
+            self.assertEqual(shared_set.call_count, 0)
+
+    def test_recovers_when_shared_cache_is_back(self):
+        worker = self._worker(RETRY_INTERVAL=0)
+        with mock.patch.object(caches['shared'], 'set', side_effect=ConnectionError):
+            worker.set('key', 'local only')
+        worker.set('key', 'shared')
+
+        self.assertEqual(self.another_worker.get('key'), 'shared')
+        self.assertEqual(worker.get('key'), 'shared')
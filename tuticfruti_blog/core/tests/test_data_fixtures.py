@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils.six import StringIO
+from django import test
+
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.users.models import User
+from tuticfruti_blog.posts import facets
+from tuticfruti_blog.posts import models
+from tuticfruti_blog.posts import search
+
+
+class TestScaledDataFixtures(test.TestCase):
+    def _load(self, **kwargs):
+        out = StringIO()
+        kwargs.setdefault('batch_size', 300)
+        call_command('load_scaled_data', stdout=out, **kwargs)
+
+        return out.getvalue()
+
+    def _snapshot(self):
+        return (
+            list(models.Post.objects.order_by('pk').values_list(
+                'title', 'status_id', 'author__username', 'created', 'modified')),
+            list(models.Post.categories.through.objects.order_by('pk').values_list('post__title', 'category__name')),
+            list(models.Comment.objects.order_by('pk').values_list('post__title', 'status_id', 'created')))
+
+    def test_rows_are_scaled(self):
+        out = self._load(scale=1)
+
+        self.assertIn('1000 posts and 10000 comments loaded.', out)
+        self.assertEqual(models.Category.objects.count(), data_fixtures.LoadScaledCategoryData.COUNT)
+        self.assertEqual(models.Tag.objects.count(), data_fixtures.LoadScaledTagData.PER_SCALE)
+
+    def test_same_seed_builds_same_data(self):
+        self._load(seed=1)
+        snapshot = self._snapshot()
+        models.Comment.objects.all().delete()
+        models.Post.objects.all().delete()
+        models.Category.objects.all().delete()
+        models.Tag.objects.all().delete()
+        User.objects.all().delete()
+        self._load(seed=1)
+
+        self.assertEqual(self._snapshot(), snapshot)
+
+    def test_denormalized_data_is_rebuilt(self):
+        self._load()
+        post = models.Post.objects.order_by('-published_comment_count').first()
+
+        self.assertEqual(post.published_comment_count, post.comments.all_published().count())
+        self.assertEqual(post.excerpt, models.Post.split_content(post.content)[0])
+
+    def test_dates_are_not_overwritten(self):
+        self._load()
+        post = models.Post.objects.order_by('created').first()
+
+        self.assertEqual(post.created, data_fixtures.ScaledDataFixtures.START)
+        self.assertEqual(post.modified, post.created)
+
+    def test_batches_fit_sqlite_query_parameters(self):
+        with mock.patch.object(data_fixtures, '_batches', wraps=data_fixtures._batches) as batches:
+            self._load(batch_size=1000)
+
+        self.assertEqual(
+            {args[1] for args, kwargs in batches.call_args_list},
+            {data_fixtures.ScaledDataFixtures.MAX_BATCH_SIZE})
+
+    def test_search_results_and_facets_are_invalidated(self):
+        cache.clear()
+        search_generation, facets_generation = search.get_generation(), facets.get_generation()
+        facets.browse([])
+        self._load()
+        post_pks, counts = facets.browse([])
+
+        self.assertNotEqual(search.get_generation(), search_generation)
+        self.assertNotEqual(facets.get_generation(), facets_generation)
+        self.assertEqual(len(post_pks), models.Post.objects.all_published().count())
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import re
+import time
+import unittest
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.template.response import SimpleTemplateResponse
+from django import test
+
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.core import metrics
+from tuticfruti_blog.users.models import User
+
+
+class HistogramTest(unittest.TestCase):
+    def setUp(self):
+        self.histogram = metrics.Histogram('test_seconds', 'Test histogram.', (0.1, 1), ('view', ))
+
+    def test_observations_are_cumulative(self):
+        for value in (0.05, 0.1, 0.5, 2):
+            self.histogram.observe(value, view='list')
+        lines = self.histogram.render().splitlines()
+
+        self.assertIn('# TYPE test_seconds histogram', lines)
+        self.assertIn('test_seconds_bucket{view="list",le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{view="list",le="1"} 3', lines)
+        self.assertIn('test_seconds_bucket{view="list",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_sum{view="list"} 2.65', lines)
+        self.assertIn('test_seconds_count{view="list"} 4', lines)
+
+    def test_series_per_label(self):
+        self.histogram.observe(0.5, view='list')
+        self.histogram.observe(0.5, view='detail')
+
+        self.assertIn('test_seconds_count{view="detail"} 1', self.histogram.render())
+        self.assertIn('test_seconds_count{view="list"} 1', self.histogram.render())
+
+    def test_label_values_are_escaped(self):
+        self.histogram.observe(0.5, view='"quoted"')
+
+        self.assertIn('view="\\"quoted\\""', self.histogram.render())
+
+
+class TestQueryCounter(test.TestCase):
+    def test_queries_are_counted_and_timed(self):
+        counter = metrics.get_query_counter(connection)
+        count, duration = counter.count, counter.duration
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertEqual(counter.count, count + 1)
+        self.assertGreater(counter.duration, duration)
+        self.assertIs(metrics.get_query_counter(connection), counter)
+
+
+class TestMetricsMiddleware(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+
+    def setUp(self):
+        cache.clear()
+        metrics.clear()
+
+    def test_post_views_are_measured(self):
+        self.client.get(reverse('posts:detail', kwargs=dict(slug='published-post')))
+        content = metrics.render()
+
+        self.assertIn('blog_request_duration_seconds_count{view="posts:detail",method="GET"} 1', content)
+        self.assertIn('blog_request_template_duration_seconds_count{view="posts:detail",method="GET"} 1', content)
+        self.assertNotIn('blog_request_queries_bucket{view="posts:detail",method="GET",le="0"} 1', content)
+
+    @test.override_settings(PAGE_CACHE_ENABLED=True)
+    def test_page_cached_views_measure_template_time_on_miss(self):
+        rendered_content = SimpleTemplateResponse.rendered_content
+
+        def slow_rendered_content(response):
+            time.sleep(0.01)
+            return rendered_content.fget(response)
+
+        with mock.patch.object(SimpleTemplateResponse, 'rendered_content', property(slow_rendered_content)):
+            self.client.get(reverse('home'))
+        match = re.search(
+            r'^blog_request_template_duration_seconds_sum\{view="home",method="GET"\} (.+)$', metrics.render(), re.M)
+
+        self.assertGreaterEqual(float(match.group(1)), 0.01)
+
+    def test_unresolved_requests_are_measured(self):
+        self.client.get('/missing/')
+
+        self.assertIn('view="<unresolved>"', metrics.render())
+
+    def test_metrics_are_staff_only(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 302)
+
+        User.objects.create_superuser('staff', 'staff@example.com', 'password')
+        self.client.login(username='staff', password='password')
+        res = self.client.get(reverse('metrics'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE blog_request_queries histogram', res.content.decode())
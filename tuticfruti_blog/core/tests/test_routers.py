@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import time
+
+from django.core.urlresolvers import reverse
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django import test
+
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.core import middleware
+from tuticfruti_blog.core import routers
+from tuticfruti_blog.posts import models
+from tuticfruti_blog.users.models import User
+
+REPLICA = 'replica'
+
+
+class TestReplicaRouter(test.SimpleTestCase):
+    def tearDown(self):
+        routers.set_replica(None)
+
+    def test_reads_go_to_primary_by_default(self):
+        self.assertIsNone(routers.ReplicaRouter().db_for_read(models.Post))
+
+    def test_reads_go_to_current_replica(self):
+        routers.set_replica(REPLICA)
+
+        self.assertEqual(routers.ReplicaRouter().db_for_read(models.Post), REPLICA)
+
+    def test_writes_go_to_primary(self):
+        routers.set_replica(REPLICA)
+
+        self.assertEqual(routers.ReplicaRouter().db_for_write(models.Post), 'default')
+
+
+@test.override_settings(DATABASE_REPLICAS=[REPLICA], DATABASE_REPLICA_LAG=5)
+class TestReplicaMiddleware(test.TestCase):
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+        # Only the replica knows about this post, telling which database a view read from
+        author = User.objects.db_manager(REPLICA).create_user('replica', 'replica@example.com', 'password')
+        cls.replica_post = models.Post.objects.using(REPLICA).create(
+            author=author, title='Replica post', status_id=models.Post.STATUS_PUBLISHED)
+        cls.published_post = models.Post.objects.get(slug='published-post')
+
+    def _detail_url(self, post):
+        return reverse('posts:detail', kwargs=dict(slug=post.slug))
+
+    def test_public_views_read_from_replica(self):
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            res = self.client.get(self._detail_url(self.replica_post))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(queries)
+
+    def test_user_pages_read_from_replica(self):
+        self.client.login(username='admin', password='password')
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            self.client.get(reverse('users:list'))
+
+        self.assertTrue(queries)
+
+    def test_admin_reads_from_primary(self):
+        self.client.login(username='admin', password='password')
+        with CaptureQueriesContext(connections[REPLICA]) as queries:
+            res = self.client.get(reverse('admin:posts_post_changelist'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(queries)
+
+    def test_writes_go_to_primary_and_pin_the_client(self):
+        res = self.client.post(
+            self._detail_url(self.published_post),
+            dict(author='anonymous', email='anonymous@example.com', content='Primary comment'))
+
+        self.assertTrue(models.Comment.objects.using('default').filter(content='Primary comment').exists())
+        self.assertFalse(models.Comment.objects.using(REPLICA).filter(content='Primary comment').exists())
+        self.assertIn(middleware.ReplicaMiddleware.pin_cookie_name, res.cookies)
+
+    def test_pinned_client_reads_from_primary(self):
+        self.client.cookies[middleware.ReplicaMiddleware.pin_cookie_name] = str(time.time() + 5)
+        res = self.client.get(self._detail_url(self.replica_post))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_expired_pin_reads_from_replica(self):
+        self.client.cookies[middleware.ReplicaMiddleware.pin_cookie_name] = str(time.time() - 1)
+        res = self.client.get(self._detail_url(self.replica_post))
+
+        self.assertEqual(res.status_code, 200)
+
+    def test_replica_is_released_after_the_response(self):
+        self.client.get(self._detail_url(self.replica_post))
+
+        self.assertIsNone(routers.get_replica())
+
+    @test.override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_from_primary(self):
+        res = self.client.get(self._detail_url(self.replica_post))
+
+        self.assertEqual(res.status_code, 404)
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+from unittest import mock
+
+from django.conf.urls import include, url
+from django.contrib.admin import helpers
+from django.core.management import call_command
+from django.core.urlresolvers import reverse, resolve
+from django.db import connection, DatabaseError
+from django.http import HttpResponse
+from django.utils.six import StringIO
+from django import test
+
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.posts import managers
+from tuticfruti_blog.posts import models
+from tuticfruti_blog.posts import tasks
+from tuticfruti_blog.posts import views
+from tuticfruti_blog.users.models import User
+
+
+def in_atomic_block_view(request):
+    return HttpResponse(str(connection.in_atomic_block))
+
+
+# Tests run outside of a wrapping transaction, so in_atomic_block is only set by the code under test
+class TestAtomicWrites(test.TransactionTestCase):
+    def setUp(self):
+        self.factory = test.RequestFactory()
+        self.view = transactions.atomic_writes(in_atomic_block_view)
+
+    def test_safe_methods_run_in_autocommit(self):
+        for method in ('get', 'head', 'options'):
+            res = getattr(self.factory, method)('/')
+
+            self.assertEqual(self.view(res).content, b'False')
+
+    def test_unsafe_methods_run_in_a_transaction(self):
+        for method in ('post', 'put', 'patch', 'delete'):
+            res = getattr(self.factory, method)('/')
+
+            self.assertEqual(self.view(res).content, b'True')
+
+    def test_after_commit_runs_right_away_in_autocommit(self):
+        func = mock.Mock()
+        transactions.after_commit(func)
+
+        self.assertEqual(func.call_count, 1)
+
+    def test_after_commit_waits_for_the_transaction_to_exit(self):
+        func = mock.Mock()
+
+        def view(request):
+            transactions.after_commit(func)
+            transactions.after_commit(func)
+            return HttpResponse(str(func.called))
+
+        res = transactions.atomic_writes(view)(self.factory.post('/'))
+
+        self.assertEqual(res.content, b'False')
+        self.assertEqual(func.call_count, 1)
+
+    def test_atomic_runs_deferred_functions_once_the_transaction_exits(self):
+        func = mock.Mock()
+        with transactions.atomic():
+            with transactions.atomic():
+                transactions.after_commit(func)
+            self.assertFalse(func.called)
+
+        self.assertEqual(func.call_count, 1)
+
+    def test_patterns_are_wrapped(self):
+        patterns = transactions.atomic_writes_patterns([
+            url(r'^view/$', in_atomic_block_view, name='view'),
+            url(r'^nested/', include([url(r'^view/$', in_atomic_block_view, name='nested')])),
+        ])
+
+        self.assertEqual(patterns[0].name, 'view')
+        self.assertIs(patterns[0].callback.__wrapped__, in_atomic_block_view)
+        self.assertIs(patterns[1].url_patterns[0].callback.__wrapped__, in_atomic_block_view)
+
+    def test_third_party_account_views_are_wrapped(self):
+        match = resolve(reverse('account_signup'))
+
+        self.assertTrue(hasattr(match.func, '__wrapped__'))
+
+
+class TestTransactionPolicy(test.TransactionTestCase):
+    def setUp(self):
+        data_fixtures.DataFixtures.load()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+        self.published_post = models.Post.objects.get(slug='published-post')
+
+    def test_tasks_run_the_functions_deferred_by_their_transactions(self):
+        tasks.ingest_comment.delay(
+            post_pk=self.published_post.pk, author='anonymous', email='anonymous@example.com', content='A new comment')
+
+        self.assertEqual(transactions._pending(), [])
+
+    def test_commands_run_the_functions_deferred_by_their_transactions(self):
+        call_command('load_scaled_data', stdout=StringIO())
+
+        self.assertEqual(transactions._pending(), [])
+
+    def test_read_only_views_run_in_autocommit(self):
+        in_atomic_block = []
+        get_context_data = views.PostListView.get_context_data
+
+        def record_atomic_block(view, **kwargs):
+            in_atomic_block.append(connection.in_atomic_block)
+            return get_context_data(view, **kwargs)
+
+        with mock.patch.object(views.PostListView, 'get_context_data', record_atomic_block):
+            self.client.get(reverse('home'))
+
+        self.assertEqual(in_atomic_block, [False])
+
+    def test_detail_view_reads_run_in_autocommit(self):
+        in_atomic_block = []
+        get_context_data = views.PostDetailView.get_context_data
+
+        def record_atomic_block(view, **kwargs):
+            in_atomic_block.append(connection.in_atomic_block)
+            return get_context_data(view, **kwargs)
+
+        with mock.patch.object(views.PostDetailView, 'get_context_data', record_atomic_block):
+            self.client.get(reverse('posts:detail', kwargs=dict(slug=self.published_post.slug)))
+
+        self.assertEqual(in_atomic_block, [False])
+
+    def test_comment_submission_is_atomic(self):
+        num_comments = models.Comment.objects.count()
+        with mock.patch.object(tasks, 'notify_managers', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(
+                    reverse('posts:detail', kwargs=dict(slug=self.published_post.slug)),
+                    dict(author='anonymous', email='anonymous@example.com', content='Rolled back comment'))
+
+        self.assertEqual(models.Comment.objects.count(), num_comments)
+
+    def test_changelist_saves_are_atomic(self):
+        self.client.login(username='admin', password='password')
+        categories = list(models.Category.objects.order_by('order', 'name'))
+        data = {
+            'form-TOTAL_FORMS': len(categories),
+            'form-INITIAL_FORMS': len(categories),
+            '_save': 'Save',
+        }
+        for i, category in enumerate(categories):
+            data.update({
+                'form-{}-id'.format(i): category.pk,
+                'form-{}-is_enabled'.format(i): 'on',
+                'form-{}-order'.format(i): category.order + 100,
+            })
+        save = models.Category.save
+
+        def fail_on_second_save(category, *args, **kwargs):
+            if fail_on_second_save.calls:
+                raise RuntimeError
+            fail_on_second_save.calls += 1
+            return save(category, *args, **kwargs)
+        fail_on_second_save.calls = 0
+
+        with mock.patch.object(models.Category, 'save', fail_on_second_save):
+            with self.assertRaises(RuntimeError):
+                self.client.post(reverse('admin:posts_category_changelist'), data)
+
+        self.assertEqual(
+            [category.order for category in models.Category.objects.order_by('order', 'name')],
+            [category.order for category in categories])
+
+    def test_moderation_batches_commit_on_their_own(self):
+        self.client.login(username='admin', password='password')
+        comments = list(models.Comment.objects.all_published().order_by('pk')[:2])
+        batches = managers.CommentQuerySet._batches
+
+        def fail_on_second_batch(queryset, batch_size):
+            for number, batch in enumerate(batches(queryset, 1)):
+                if number:
+                    raise DatabaseError
+                yield batch
+
+        with mock.patch.object(managers.CommentQuerySet, '_batches', fail_on_second_batch):
+            with self.assertRaises(DatabaseError):
+                self.client.post(reverse('admin:posts_comment_changelist'), {
+                    'action': 'reject_comments',
+                    'index': 0,
+                    helpers.ACTION_CHECKBOX_NAME: [comment.pk for comment in comments],
+                })
+
+        self.assertEqual(
+            [models.Comment.objects.get(pk=comment.pk).status_id for comment in comments],
+            [models.Comment.STATUS_PENDING, models.Comment.STATUS_PUBLISHED])
@@ -3,7 +3,9 @@
 import unittest
 from unittest import mock
 
-from tuticfruti_blog.core.utils import MockQueryset
+from django import test
+
+from tuticfruti_blog.core.utils import MockQueryset, QueryBudgetMixin, normalize_sql, query_budget
 from tuticfruti_blog.posts import models
 
 
@@ -55,3 +57,66 @@ class MockQuerySetTest(unittest.TestCase):
 
     def test___repr__(self):
         self.assertEqual(repr(self.queryset), repr(self.items))
+
+
+class NormalizeSqlTest(unittest.TestCase):
+    def test_literals_are_replaced(self):
+        sql = normalize_sql("SELECT * FROM t WHERE id = 12 AND name = 'it''s' AND price > 1.5")
+
+        self.assertEqual(sql, 'SELECT * FROM t WHERE id = ? AND name = ? AND price > ?')
+
+    def test_in_lists_are_collapsed(self):
+        self.assertEqual(
+            normalize_sql('SELECT * FROM t WHERE id IN (1, 2, 3)'),
+            normalize_sql('SELECT * FROM t WHERE id IN (4)'))
+
+    def test_sqlite_queries_are_unwrapped(self):
+        sql = normalize_sql("QUERY = 'SELECT * FROM t WHERE id = %s' - PARAMS = (1,)")
+
+        self.assertEqual(sql, 'SELECT * FROM t WHERE id = ?')
+
+    def test_identifiers_are_kept(self):
+        self.assertEqual(normalize_sql('SELECT "t1"."id" FROM "t1"'), 'SELECT "t1"."id" FROM "t1"')
+
+
+class QueryBudgetMixinTest(QueryBudgetMixin, test.TestCase):
+    def _query(self, pk):
+        models.Tag.objects.filter(pk=pk).exists()
+
+    def test_within_budget(self):
+        with self.assertMaxQueries(2):
+            self._query(1)
+            self._query(2)
+
+    def test_over_budget_lists_repeated_queries(self):
+        with self.assertRaises(AssertionError) as context:
+            with self.assertMaxQueries(1):
+                self._query(1)
+                self._query(2)
+
+        self.assertIn('2 queries executed, the budget is 1.', str(context.exception))
+        self.assertIn('2x SELECT', str(context.exception))
+
+    def test_growing_queries_fail(self):
+        pks = [1]
+
+        with self.assertRaises(AssertionError) as context:
+            self.assertQueriesDoNotGrow(lambda: [self._query(pk) for pk in pks], lambda: pks.append(2))
+
+        self.assertIn('Queries grew from 1 to 2.', str(context.exception))
+        self.assertIn('1 -> 2x SELECT', str(context.exception))
+
+    def test_constant_queries_pass(self):
+        pks = [1]
+
+        self.assertQueriesDoNotGrow(lambda: models.Tag.objects.filter(pk__in=pks).exists(), lambda: pks.append(2))
+
+    @query_budget(1)
+    def test_decorator_within_budget(self):
+        self._query(1)
+
+    def test_decorator_over_budget(self):
+        decorated = query_budget(0)(lambda self: self._query(1))
+
+        with self.assertRaises(AssertionError):
+            decorated(self)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Per view transaction policy.
+
+Requests are not atomic as a whole, so read only views run in autocommit and don't hold a
+transaction, nor a pooled server connection, while rendering. Write paths open their own
+transaction: unsafe methods of the views wrapped here, admin saves and model level bulk writes.
+
+Django has no commit hooks yet, so after_commit defers callbacks until the outermost transaction
+exits, either from the views wrapped here, from atomic or at the end of the request. Code running
+outside of requests, as tasks and management commands, opens its transactions with atomic. Callbacks
+are meant for cache invalidation and also run after a rollback, where they are harmless.
+"""
+import contextlib
+import functools
+import threading
+
+from django.core import signals
+from django.core.urlresolvers import RegexURLPattern, RegexURLResolver
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+_local = threading.local()
+
+
+def _pending():
+    if not hasattr(_local, 'pending'):
+        _local.pending = []
+
+    return _local.pending
+
+
+def after_commit(func, using=DEFAULT_DB_ALIAS):
+    """
+    Calls func once the current transaction of the using database exits, or right away in autocommit.
+
+    A function deferred several times within a transaction is only called once.
+    """
+    pending = _pending()
+    if (func, using) not in pending:
+        pending.append((func, using))
+    run_after_commit()
+
+
+def run_after_commit(**kwargs):
+    """Calls the deferred functions whose database is no longer in a transaction."""
+    pending = _pending()
+    for func, using in list(pending):
+        if not connections[using].in_atomic_block:
+            pending.remove((func, using))
+            func()
+
+
+signals.request_finished.connect(run_after_commit, dispatch_uid='tuticfruti_blog.core.transactions')
+
+
+@contextlib.contextmanager
+def atomic(using=None):
+    """Like transaction.atomic, calling the deferred functions once the transaction exits."""
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        run_after_commit()
+
+
+def atomic_writes(view):
+    """Runs a view in a transaction unless the request method is safe."""
+    @functools.wraps(view)
+    def wrapped_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+
+        with atomic():
+            return view(request, *args, **kwargs)
+
+    return wrapped_view
+
+
+def atomic_writes_patterns(urlpatterns):
+    """Wraps the views of third party url patterns with atomic_writes."""
+    patterns = []
+    for pattern in urlpatterns:
+        if isinstance(pattern, RegexURLResolver):
+            patterns.append(RegexURLResolver(
+                pattern.regex.pattern,
+                atomic_writes_patterns(pattern.url_patterns),
+                pattern.default_kwargs,
+                pattern.app_name,
+                pattern.namespace))
+        else:
+            patterns.append(RegexURLPattern(
+                pattern.regex.pattern,
+                atomic_writes(pattern.callback),
+                pattern.default_args,
+                pattern.name))
+
+    return patterns
+
+
+class AtomicWritesMixin:
+    """Runs the unsafe methods of a class based view in a transaction, safe methods in autocommit."""
+
+    def dispatch(self, request, *args, **kwargs):
+        return atomic_writes(super().dispatch)(request, *args, **kwargs)
+
+
+class AtomicChangeListMixin:
+    """
+    Saves the list_editable rows and runs the actions of a ModelAdmin changelist in a transaction.
+
+    Actions named in non_atomic_actions open their own transactions, as the batched ones which
+    commit every batch on its own. Add, change and delete views are already atomic.
+    """
+    non_atomic_actions = ()
+
+    def _get_action(self, request):
+        # Changelists have an action form above and below the results, index tells which one was sent
+        try:
+            return request.POST.getlist('action')[int(request.POST.get('index', 0))]
+        except (IndexError, ValueError):
+            return None
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method not in SAFE_METHODS and '_save' not in request.POST and \
+                self._get_action(request) in self.non_atomic_actions:
+            return super().changelist_view(request, extra_context)
+
+        return atomic_writes(super().changelist_view)(request, extra_context)
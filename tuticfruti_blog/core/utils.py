@@ -1,4 +1,17 @@
+import ast
+import collections
+import contextlib
+import functools
+import re
+
+from django.db import connections, DEFAULT_DB_ALIAS
 from django.db.models.query import EmptyQuerySet
+from django.test.utils import CaptureQueriesContext
+
+# SQLite reports queries with their parameters apart
+SQLITE_QUERY_REGEX = re.compile(r'''^QUERY = ('.*'|".*") - PARAMS = ''', re.DOTALL)
+SQL_LITERAL_REGEX = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s")
+SQL_IN_LIST_REGEX = re.compile(r'\bIN \((?:\?, )*\?\)')
 
 
 def singleton(class_):
@@ -48,3 +61,69 @@ class MockQueryset(EmptyQuerySet):
 
     def __repr__(self):
         return repr(self._result_cache)
+
+
+def normalize_sql(sql):
+    """Replaces literals by placeholders, so queries only differing in their parameters look the same."""
+    match = SQLITE_QUERY_REGEX.match(sql)
+    if match:
+        sql = ast.literal_eval(match.group(1))
+
+    return SQL_IN_LIST_REGEX.sub('IN (...)', SQL_LITERAL_REGEX.sub('?', sql))
+
+
+def count_sql_patterns(queries):
+    return collections.Counter(normalize_sql(query['sql']) for query in queries)
+
+
+def format_sql_patterns(patterns, baseline=None):
+    """Lists query patterns by number of executions, the repeated ones or those grown over baseline only."""
+    lines = []
+    for sql, count in patterns.most_common():
+        if baseline is not None and count > baseline[sql]:
+            lines.append('  {} -> {}x {}'.format(baseline[sql], count, sql))
+        elif baseline is None and count > 1:
+            lines.append('  {}x {}'.format(count, sql))
+
+    return '\n'.join(lines) or '  (no repeated queries)'
+
+
+class QueryBudgetMixin:
+    """
+    Assertions on the number of queries run by a test case.
+
+    Failures list the repeated SQL patterns, which usually point straight at the N+1 culprit.
+    """
+
+    @contextlib.contextmanager
+    def assertMaxQueries(self, budget, using=DEFAULT_DB_ALIAS):
+        with CaptureQueriesContext(connections[using]) as context:
+            yield context
+
+        if len(context) > budget:
+            self.fail('{} queries executed, the budget is {}. Repeated queries:\n{}'.format(
+                len(context), budget, format_sql_patterns(count_sql_patterns(context.captured_queries))))
+
+    def assertQueriesDoNotGrow(self, func, grow, using=DEFAULT_DB_ALIAS):
+        """Runs func before and after calling grow, failing when the second run executes more queries."""
+        with CaptureQueriesContext(connections[using]) as before:
+            func()
+        grow()
+        with CaptureQueriesContext(connections[using]) as after:
+            func()
+
+        if len(after) > len(before):
+            baseline = count_sql_patterns(before.captured_queries)
+            self.fail('Queries grew from {} to {}. Grown queries:\n{}'.format(
+                len(before), len(after), format_sql_patterns(count_sql_patterns(after.captured_queries), baseline)))
+
+
+def query_budget(budget, using=DEFAULT_DB_ALIAS):
+    """Decorates a QueryBudgetMixin test method, failing it when it runs more than budget queries."""
+    def decorator(test_method):
+        @functools.wraps(test_method)
+        def wrapper(self, *args, **kwargs):
+            with self.assertMaxQueries(budget, using=using):
+                return test_method(self, *args, **kwargs)
+        return wrapper
+    return decorator
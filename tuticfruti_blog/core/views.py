@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+
+from . import metrics as metrics_registry
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+@staff_member_required
+def metrics(request):
+    return HttpResponse(metrics_registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
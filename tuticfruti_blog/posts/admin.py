@@ -1,61 +1,249 @@
 # -*- coding: utf-8 -*-
-from django.utils.translation import ugettext_lazy as _
+from django.conf.urls import url
+from django import forms
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator, InvalidPage
+from django.core.urlresolvers import reverse
+from django.http import Http404, JsonResponse, QueryDict
+from django.utils.encoding import force_text
+from django.template.response import TemplateResponse
+from django.utils.translation import ugettext_lazy as _, ungettext
 from django.db.models import Prefetch
 from django.contrib import admin
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList, PAGE_VAR
 
+from tuticfruti_blog.core.transactions import AtomicChangeListMixin
 from . import models
+from . import widgets
+
+
+class LoadedModelChoiceField(forms.ModelChoiceField):
+    """Resolves primary keys against objects already loaded instead of querying them one by one."""
+
+    def __init__(self, objects, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.objects = objects
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects[self.queryset.model._meta.pk.to_python(value)]
+        except (KeyError, ValidationError):
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice')
+
+
+class CommentInlineFormSet(forms.BaseInlineFormSet):
+    """
+    Edits a page of the comments of a post, pending comments first.
+
+    Bound formsets load the comments submitted by the rendered page instead of the page itself,
+    so comments arriving in between neither shift the rows nor get overwritten.
+    """
+    page_number = 1
+    per_page = 20
+    page_param = 'comments_page'
+    query_params = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Pending sorts before published
+        queryset = self.queryset.order_by('status_id', '-created', '-pk')
+        self.page = None
+        if self.is_bound:
+            self.queryset = queryset.filter(pk__in=self.get_submitted_pks())
+        else:
+            paginator = Paginator(queryset, self.per_page)
+            try:
+                self.page = paginator.page(self.page_number)
+            except InvalidPage:
+                self.page = paginator.page(1)
+            self.queryset = self.page.object_list
+
+    def get_submitted_pks(self):
+        pk_name = self.model._meta.pk.name
+        keys = ('{}-{}'.format(self.add_prefix(i), pk_name) for i in range(self.initial_form_count()))
+
+        return [pk for pk in (self.data.get(key) for key in keys) if pk and pk.isdigit()]
+
+    def get_page_query_string(self, number):
+        params = self.query_params.copy() if self.query_params is not None else QueryDict(mutable=True)
+        params[self.page_param] = number
+
+        return '?{}'.format(params.urlencode())
+
+    @property
+    def previous_page_query_string(self):
+        return self.get_page_query_string(self.page.previous_page_number())
+
+    @property
+    def next_page_query_string(self):
+        return self.get_page_query_string(self.page.next_page_number())
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+
+        if form.is_bound and not form.instance._state.adding:
+            pk_field = form.fields[self._pk_field.name]
+            form.fields[self._pk_field.name] = LoadedModelChoiceField(
+                self._object_dict, pk_field.queryset, initial=pk_field.initial, required=False,
+                widget=pk_field.widget)
 
 
 class CommentInline(admin.TabularInline):
     model = models.Comment
+    formset = CommentInlineFormSet
+    fields = ('status_id', 'author', 'email', 'content', 'created', )
+    readonly_fields = ('created', )
+    template = 'admin/posts/comment_inline.html'
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.page_number = request.GET.get(formset.page_param, 1)
+        formset.query_params = request.GET
+
+        return formset
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Filters by a typed value instead of listing every value of the related table in the sidebar."""
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        # Filters without lookups are not displayed
+        return ((None, None), )
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value()})
+
+    def choices(self, cl):
+        excluded = (self.parameter_name, PAGE_VAR)
+        yield dict(
+            parameter_name=self.parameter_name,
+            value=self.value() or '',
+            query_parts=[(key, value) for key, value in cl.params.items() if key not in excluded],
+            query_string=cl.get_query_string(remove=[self.parameter_name]))
+
+
+class TagFilter(InputFilter):
+    title = _('tag')
+    parameter_name = 'tag'
+    lookup = 'tags__term'
+
+
+class PostFilter(InputFilter):
+    title = _('post')
+    parameter_name = 'post'
+    lookup = 'post__slug'
+
+
+class AuthorFilter(InputFilter):
+    title = _('author')
+    parameter_name = 'author'
+    lookup = 'author__username'
+
+
+class PostChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+
+        # Annotated once rows are counted, counting would evaluate the subquery for every post
+        self.result_list = self.result_list.annotate(num_comments=models.Post.objects.comment_count())
 
 
 @admin.register(models.Post)
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(AtomicChangeListMixin, admin.ModelAdmin):
     def _categories(self, obj):
-        return obj.categories.values_list('name', flat=True)
+        return [category.name for category in obj.categories.all()]
     _categories.short_description = _('categories')
 
     def _tags(self, obj):
-        return obj.tags.values_list('term', flat=True)
+        return [tag.term for tag in obj.tags.all()]
     _tags.short_description = _('tags')
 
     def num_comments(self, obj):
-        return obj.comments.count()
+        return obj.num_comments
     num_comments.short_description = _('comments')
 
     date_hierarchy = 'created'
     fields = (('title', 'created', ), ('author', 'status_id', ), 'content', 'tags', 'categories', )
-    filter_horizontal = ('categories', 'tags', )
+    autocomplete_fields = ('author', 'categories', 'tags', )
+    autocomplete_per_page = 20
     list_display = ('title', 'author', 'status_id', 'created', '_categories', '_tags', 'num_comments', )
     list_editable = ('status_id', )
-    list_filter = ('status_id', 'categories', 'tags', 'author', 'created')
+    list_filter = ('status_id', 'categories', TagFilter, AuthorFilter, 'created')
+    list_select_related = ('author', )
     search_fields = ('title', )
     readonly_fields = ('created', )
     inlines = [CommentInline, ]
 
+    def formfield_for_dbfield(self, db_field, **kwargs):
+        if db_field.name in self.autocomplete_fields:
+            url = reverse('admin:posts_post_autocomplete', kwargs=dict(field_name=db_field.name))
+            widget_class = widgets.AutocompleteSelectMultiple if db_field.many_to_many else widgets.AutocompleteSelect
+            kwargs['widget'] = widget_class(url)
+
+        return super().formfield_for_dbfield(db_field, **kwargs)
+
+    def get_urls(self):
+        urls = [
+            url(r'^autocomplete/(?P<field_name>\w+)/$',
+                self.admin_site.admin_view(self.autocomplete_view),
+                name='posts_post_autocomplete'),
+        ]
+
+        return urls + super().get_urls()
+
+    def autocomplete_view(self, request, field_name):
+        """Pages the related objects of an autocomplete field, searched by the search fields of their admin."""
+        if field_name not in self.autocomplete_fields:
+            raise Http404
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+
+        related_model = self.model._meta.get_field(field_name).related_model
+        related_admin = self.admin_site._registry[related_model]
+        queryset = related_admin.get_queryset(request).order_by(*related_admin.get_ordering(request) or ['pk'])
+        queryset, use_distinct = related_admin.get_search_results(request, queryset, request.GET.get('term', ''))
+        if use_distinct:
+            queryset = queryset.distinct()
+
+        try:
+            page = Paginator(queryset, self.autocomplete_per_page).page(request.GET.get('page', 1))
+        except InvalidPage:
+            raise Http404
+
+        return JsonResponse(dict(
+            results=[dict(id=obj.pk, text=force_text(obj)) for obj in page.object_list],
+            more=page.has_next()))
+
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
         form.base_fields['author'].initial = request.user
         return form
 
     def get_queryset(self, request):
-        categories = models.Category.objects.all_enabled()
+        categories = models.Category.objects.all()
         tags = models.Tag.objects.all()
-        comments = models.Comment.objects.all()
 
         qs = models.Post.objects \
             .all() \
             .prefetch_related(
                 Prefetch('categories', queryset=categories),
-                Prefetch('comments', queryset=comments),
                 Prefetch('tags', queryset=tags))
 
         return qs
 
+    def get_changelist(self, request, **kwargs):
+        return PostChangeList
+
 
 @admin.register(models.Tag)
-class TagAdmin(admin.ModelAdmin):
+class TagAdmin(AtomicChangeListMixin, admin.ModelAdmin):
     fields = ('term', )
     list_display = ('term', )
     search_fields = ('term', )
@@ -64,18 +252,63 @@ class TagAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(AtomicChangeListMixin, admin.ModelAdmin):
     fields = ('name', 'is_enabled', 'order', )
     list_display = ('name', 'is_enabled', 'order', )
     list_editable = ('is_enabled', 'order', )
+    search_fields = ('name', )
 
 
 @admin.register(models.Comment)
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(AtomicChangeListMixin, admin.ModelAdmin):
     date_hierarchy = 'created'
     fields = (('author', 'created', ), ('email', 'status_id', ), 'content', )
     list_display = ('author', 'email', 'status_id', 'created', 'content', )
     list_editable = ('status_id', )
-    list_filter = ('status_id', 'created')
+    list_filter = ('status_id', PostFilter, 'created')
     search_fields = ('author', 'email', 'content', )
     readonly_fields = ('created', )
+    actions = ['approve_comments', 'reject_comments', 'delete_comments']
+    # Moderation actions update and delete comments in batches, each in its own transaction
+    non_atomic_actions = ('approve_comments', 'reject_comments', 'delete_comments')
+
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # Collects and lists every comment before deleting them one by one
+        actions.pop('delete_selected', None)
+
+        return actions
+
+    def approve_comments(self, request, queryset):
+        num_comments = queryset.approve()
+        self.message_user(request, ungettext(
+            '%(count)d comment approved.', '%(count)d comments approved.', num_comments) % dict(count=num_comments))
+    approve_comments.short_description = _('Approve selected comments')
+
+    def reject_comments(self, request, queryset):
+        num_comments = queryset.reject()
+        self.message_user(request, ungettext(
+            '%(count)d comment rejected.', '%(count)d comments rejected.', num_comments) % dict(count=num_comments))
+    reject_comments.short_description = _('Reject selected comments')
+
+    def delete_comments(self, request, queryset):
+        if not self.has_delete_permission(request):
+            raise PermissionDenied
+
+        if request.POST.get('post'):
+            num_comments = queryset.delete_in_batches()
+            self.message_user(request, ungettext(
+                '%(count)d comment deleted.', '%(count)d comments deleted.', num_comments) % dict(count=num_comments))
+            return None
+
+        context = dict(
+            self.admin_site.each_context(request),
+            title=_('Are you sure?'),
+            opts=self.model._meta,
+            num_comments=queryset.count(),
+            select_across=request.POST.get('select_across', '0'),
+            selected=request.POST.getlist(helpers.ACTION_CHECKBOX_NAME),
+            action_checkbox_name=helpers.ACTION_CHECKBOX_NAME)
+
+        return TemplateResponse(request, 'admin/posts/comment/delete_comments_confirmation.html', context)
+    delete_comments.short_description = _('Delete selected comments')
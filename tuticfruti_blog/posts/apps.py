@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+from django.apps import AppConfig
+from django.utils.translation import ugettext_lazy as _
+
+
+class PostsConfig(AppConfig):
+    name = 'tuticfruti_blog.posts'
+    verbose_name = _('posts')
+
+    def ready(self):
+        from . import receivers  # noqa
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Dependency tags of cached post pages."""
+from tuticfruti_blog.core import cache
+
+# Pages listing every published post
+LIST_TAG = 'posts:list'
+# Pages displaying the category navigation, that is every post page
+NAVIGATION_TAG = 'posts:navigation'
+
+
+def post_tag(pk):
+    return 'posts:post:{}'.format(pk)
+
+
+def category_tag(slug):
+    return 'posts:category:{}'.format(slug)
+
+
+def tag_tag(pk):
+    return 'posts:tag:{}'.format(pk)
+
+
+def invalidate_posts(pks):
+    cache.invalidate_tags([post_tag(pk) for pk in pks])
+
+
+def invalidate_lists(category_slugs=()):
+    cache.invalidate_tags([LIST_TAG] + [category_tag(slug) for slug in category_slugs])
+
+
+def invalidate_tag_lists(tag_pks):
+    cache.invalidate_tags([tag_tag(pk) for pk in tag_pks])
+
+
+def invalidate_navigation():
+    cache.invalidate_tags([NAVIGATION_TAG])
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+In-memory posting lists of the published posts of every category and tag, used for faceted browsing.
+
+Every worker holds the set of published post ids of each facet, so intersecting facets and counting
+them within a result set never touches the database. Receivers apply post and relation changes to the
+index of their worker and bump a generation counter in the shared cache, the other workers rebuilding
+their index once they see it changed. The counter is bumped again once the change is committed, as other
+workers may rebuild in between without seeing it. Indexes are also rebuilt after POSTS_FACETS_INDEX_TIMEOUT
+seconds, which bounds the staleness left by bulk updates and rolled back changes.
+
+Changes are applied to a copy of the index sharing the posting lists they leave unchanged, so requests
+browse the index they got without locking it.
+"""
+import collections
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import router
+
+from tuticfruti_blog.core import transactions
+from . import models
+
+# Facets are named after the field of the post relation pointing to them
+CATEGORY = 'category'
+TAG = 'tag'
+FACET_FIELDS = {CATEGORY: 'categories', TAG: 'tags'}
+
+GENERATION_KEY = 'generation:posts:facets'
+INDEX_TIMEOUT = 300
+
+
+def _links(facet, using=None, **filters):
+    """Returns the (facet pk, post pk) pairs of the post relation of a facet."""
+    through = getattr(models.Post, FACET_FIELDS[facet]).through
+
+    return through.objects.db_manager(using).filter(**filters).values_list('{}_id'.format(facet), 'post_id')
+
+
+class FacetIndex:
+    """
+    Creation times of the published posts by id, and ids of the published posts by (facet, pk) of their
+    categories and tags. Operations replace the containers they change instead of updating them in place.
+    """
+
+    def __init__(self, published=(), links=()):
+        self.published = dict(published)
+        self.postings = collections.defaultdict(set)
+        for facet, pk, post_pk in links:
+            self.postings[facet, pk].add(post_pk)
+
+    def copy(self):
+        """Returns an index sharing the published posts and posting lists of this one."""
+        index = FacetIndex()
+        index.published = self.published
+        index.postings.update(self.postings)
+
+        return index
+
+    @classmethod
+    def build(cls):
+        # Read from the primary, replicas may lag behind the change that made the index stale
+        using = router.db_for_write(models.Post)
+        published = models.Post.objects.db_manager(using).all_published().values_list('pk', 'created')
+        links = [
+            (facet, pk, post_pk)
+            for facet in FACET_FIELDS
+            for pk, post_pk in _links(facet, using, post__status_id=models.Post.STATUS_PUBLISHED)]
+
+        return cls(published, links)
+
+    def _discard(self, post_pk, facet=None):
+        for (posting_facet, pk), post_pks in list(self.postings.items()):
+            if facet in (None, posting_facet) and post_pk in post_pks:
+                self.postings[posting_facet, pk] = post_pks - {post_pk}
+
+    def publish(self, post_pk):
+        using = router.db_for_write(models.Post)
+        created = models.Post.objects.db_manager(using).filter(pk=post_pk).values_list('created', flat=True).first()
+        if created is None:
+            return
+
+        self.published = dict(self.published)
+        self.published[post_pk] = created
+        for facet in FACET_FIELDS:
+            for pk, _ in _links(facet, using, post_id=post_pk):
+                self.postings[facet, pk] = self.postings[facet, pk] | {post_pk}
+
+    def unpublish(self, post_pk):
+        if post_pk in self.published:
+            self.published = {pk: created for pk, created in self.published.items() if pk != post_pk}
+        self._discard(post_pk)
+
+    def link(self, facet, pks, post_pks):
+        post_pks = self.published.keys() & set(post_pks)
+        for pk in pks:
+            self.postings[facet, pk] = self.postings[facet, pk] | post_pks
+
+    def unlink(self, facet, pks, post_pks):
+        for pk in pks:
+            if (facet, pk) in self.postings:
+                self.postings[facet, pk] = self.postings[facet, pk].difference(post_pks)
+
+    def clear_post(self, facet, post_pk):
+        self._discard(post_pk, facet)
+
+    def remove(self, facet, pk):
+        self.postings.pop((facet, pk), None)
+
+    def filter(self, selection):
+        """Returns the ids of the published posts linked to every selected (facet, pk)."""
+        post_pks = set(self.published)
+        for key in sorted(selection, key=lambda key: len(self.postings.get(key, ()))):
+            post_pks.intersection_update(self.postings.get(key, ()))
+
+        return post_pks
+
+    def sort(self, post_pks):
+        """Returns post_pks in the order of the post lists, newest first."""
+        return sorted(post_pks, key=lambda pk: (self.published[pk], pk), reverse=True)
+
+    def counts(self, facet, post_pks):
+        """Returns the number of posts among post_pks linked to each pk of a facet, leaving out zeros."""
+        counts = {}
+        for (posting_facet, pk), posting in self.postings.items():
+            if posting_facet == facet:
+                count = len(posting.intersection(post_pks))
+                if count:
+                    counts[pk] = count
+
+        return counts
+
+
+_lock = threading.RLock()
+_index = None
+_generation = None
+_expires = 0
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 0, None)
+        generation = cache.get(GENERATION_KEY)
+
+    return generation
+
+
+def _get_index():
+    global _index, _generation, _expires
+    generation = get_generation()
+    with _lock:
+        index, current, expires = _index, _generation, _expires
+
+    if index is None or generation != current or time.monotonic() >= expires:
+        # The generation is read before building, so an index missing later changes is rebuilt again
+        index = FacetIndex.build()
+        with _lock:
+            _index = index
+            _generation = generation
+            _expires = time.monotonic() + getattr(settings, 'POSTS_FACETS_INDEX_TIMEOUT', INDEX_TIMEOUT)
+
+    return index
+
+
+def browse(selection):
+    """
+    Returns the ids of the published posts linked to every selected (facet, pk), newest first, and the
+    counts of every facet among them as a {facet: {pk: count}} dict.
+    """
+    index = _get_index()
+    post_pks = index.filter(selection)
+
+    return index.sort(post_pks), {facet: index.counts(facet, post_pks) for facet in FACET_FIELDS}
+
+
+def _bump(operation=None, *args):
+    global _index, _generation
+    cache.add(GENERATION_KEY, 0, None)
+    try:
+        generation = cache.incr(GENERATION_KEY)
+    except ValueError:
+        generation = None
+
+    with _lock:
+        # The index is only current if no other worker changed the posts since it was built
+        if _index is not None and _generation is not None and generation == _generation + 1:
+            if operation is not None:
+                _index = _index.copy()
+                getattr(_index, operation)(*args)
+            _generation = generation
+        else:
+            _index = None
+
+
+def update(operation, *args):
+    """Applies an operation of FacetIndex to the index of this worker, making the other workers rebuild theirs."""
+    _bump(operation, *args)
+    transactions.after_commit(_bump)
+
+
+def bump_generation():
+    """Makes every worker rebuild its index, this one included, after changes sending no signals."""
+    cache.add(GENERATION_KEY, 0, None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        pass
+    clear()
+
+
+def clear():
+    """Drops the index of this worker, which is rebuilt on next use."""
+    global _index
+    with _lock:
+        _index = None
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Request scoped loaders of the data shared by every post page.
+
+Loaded data is memoized on the request, so the navigation menus, the views and the prefetches
+of a request share a single evaluation. It is backed by the shared cache under the dependency
+tags of posts.caching, which Category saves and deletes invalidate.
+"""
+from tuticfruti_blog.core import cache
+from . import caching
+from . import models
+
+NAVIGATION_CATEGORIES_KEY = 'posts:navigation_categories'
+
+
+def get_navigation_categories(request):
+    """Returns the list of enabled categories, loading them once per request."""
+    categories = getattr(request, '_navigation_categories', None)
+    if categories is None:
+        categories = cache.get_tagged(NAVIGATION_CATEGORIES_KEY)
+        if categories is None:
+            versions = cache.get_tag_versions([caching.NAVIGATION_TAG])
+            categories = list(models.Category.objects.all_enabled())
+            cache.set_tagged(NAVIGATION_CATEGORIES_KEY, categories, versions=versions)
+        request._navigation_categories = categories
+
+    return categories
+
+
+def prefetch_categories(posts, categories):
+    """
+    Fills the prefetched categories of posts from the loaded categories.
+
+    Only the links between posts and categories are queried, disabled categories are left out.
+    """
+    posts = list(posts)
+    if not posts:
+        return
+
+    links = models.Post.categories.through.objects \
+        .filter(post_id__in=[post.pk for post in posts], category_id__in=[category.pk for category in categories]) \
+        .values_list('post_id', 'category_id')
+    category_pks = {post.pk: set() for post in posts}
+    for post_pk, category_pk in links:
+        category_pks[post_pk].add(category_pk)
+
+    for post in posts:
+        queryset = post.categories.all()
+        queryset._result_cache = [category for category in categories if category.pk in category_pks[post.pk]]
+        queryset._prefetch_done = True
+        if not hasattr(post, '_prefetched_objects_cache'):
+            post._prefetched_objects_cache = {}
+        post._prefetched_objects_cache['categories'] = queryset
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from tuticfruti_blog.posts import models
+
+EXPLAIN_PREFIXES = {
+    'postgresql': 'EXPLAIN ANALYZE',
+    'mysql': 'EXPLAIN',
+    'sqlite': 'EXPLAIN QUERY PLAN',
+}
+
+
+class Command(BaseCommand):
+    help = 'Prints the query plan and median timing of the queries behind the public post pages.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            action='store',
+            dest='repeat',
+            type=int,
+            default=10,
+            help='Number of times every query is timed. Defaults to 10.')
+        parser.add_argument(
+            '--database',
+            action='store',
+            dest='database',
+            default=DEFAULT_DB_ALIAS,
+            help='Nominates the database to explain. Defaults to the "default" database.')
+
+    def get_querysets(self, database):
+        posts = models.Post.objects.db_manager(database).all_published()
+        category = models.Category.objects.db_manager(database).all_enabled().first()
+        tag = models.Tag.objects.db_manager(database).first()
+        post = posts.order_by('-published_comment_count').first()
+        page_size = models.Post.PAGINATE_BY
+
+        querysets = [
+            ('published posts, first page', posts[:page_size]),
+            ('published posts, page 100', posts[page_size * 99:page_size * 100]),
+        ]
+        if category is not None:
+            querysets.append(
+                ('published posts by category', posts.filter(categories__slug=category.slug)[:page_size]))
+        if tag is not None:
+            querysets.append(('published posts by tag', posts.filter(tags=tag)[:page_size]))
+        if post is not None:
+            querysets.append(
+                ('published comments of a post', models.Comment.objects.db_manager(database)
+                    .all_published()
+                    .filter(post=post)))
+
+        return querysets
+
+    def explain(self, connection, sql, params):
+        prefix = EXPLAIN_PREFIXES.get(connection.vendor, 'EXPLAIN')
+        with connection.cursor() as cursor:
+            cursor.execute('{} {}'.format(prefix, sql), params)
+            return [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+
+    def time(self, connection, sql, params, repeat):
+        timings = []
+        with connection.cursor() as cursor:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                timings.append(time.perf_counter() - start)
+
+        return statistics.median(timings)
+
+    def handle(self, *args, **options):
+        database = options.get('database')
+        repeat = options.get('repeat')
+        connection = connections[database]
+
+        for name, queryset in self.get_querysets(database):
+            sql, params = queryset.query.sql_with_params()
+            self.stdout.write('== {}'.format(name))
+            self.stdout.write(sql % tuple(repr(param) for param in params))
+            for line in self.explain(connection, sql, params):
+                self.stdout.write('   {}'.format(line))
+            self.stdout.write('   median: {:.3f} ms'.format(self.time(connection, sql, params, repeat) * 1000))
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from tuticfruti_blog.posts import managers
+from tuticfruti_blog.posts import models
+
+ACTIONS = {'approve': 'approved', 'reject': 'rejected', 'delete': 'deleted'}
+
+
+def parse_moment(value, end=False):
+    """Parses an ISO date or date time, a date meaning its start or, if end, the start of the next day."""
+    moment = parse_datetime(value)
+    if moment is None:
+        date = parse_date(value)
+        if date is None:
+            raise CommandError('"{}" is not an ISO date nor date time.'.format(value))
+        if end:
+            date += datetime.timedelta(days=1)
+        moment = datetime.datetime.combine(date, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+
+    return moment
+
+
+class Command(BaseCommand):
+    help = 'Approves, rejects or deletes every comment matching the given filters, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=sorted(ACTIONS),
+            help='"approve" publishes the comments, "reject" sets them back to pending, "delete" deletes them.')
+        parser.add_argument(
+            '--post',
+            action='store',
+            dest='post',
+            help='Slug of the post commented.')
+        parser.add_argument(
+            '--email',
+            action='store',
+            dest='email',
+            help='Email of the authors, case insensitive.')
+        parser.add_argument(
+            '--author',
+            action='store',
+            dest='author',
+            help='Name of the authors, case insensitive.')
+        parser.add_argument(
+            '--since',
+            action='store',
+            dest='since',
+            help='Comments created at or after this ISO date or date time.')
+        parser.add_argument(
+            '--until',
+            action='store',
+            dest='until',
+            help='Comments created before this ISO date time, or until the end of this ISO date.')
+        parser.add_argument(
+            '--content',
+            action='store',
+            dest='content',
+            help='Regular expression searched in the content, case insensitive.')
+        parser.add_argument(
+            '--batch-size',
+            action='store',
+            dest='batch_size',
+            type=int,
+            default=managers.MODERATION_BATCH_SIZE,
+            help='Number of comments per statement. Defaults to {}.'.format(managers.MODERATION_BATCH_SIZE))
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            dest='dry_run',
+            default=False,
+            help='Counts the matching comments without changing them.')
+
+    def get_queryset(self, options):
+        lookups = dict(
+            post='post__slug',
+            email='email__iexact',
+            author='author__iexact',
+            content='content__iregex')
+        filters = {lookup: options[name] for name, lookup in lookups.items() if options.get(name)}
+        if options.get('since'):
+            filters['created__gte'] = parse_moment(options['since'])
+        if options.get('until'):
+            filters['created__lt'] = parse_moment(options['until'], end=True)
+        if not filters:
+            raise CommandError('At least one filter is required.')
+
+        return models.Comment.objects.filter(**filters)
+
+    def handle(self, *args, **options):
+        action = options.get('action')
+        queryset = self.get_queryset(options)
+
+        if options.get('dry_run'):
+            self.stdout.write('{} comments would be {}.'.format(queryset.count(), ACTIONS[action]))
+            return
+
+        batch_size = options.get('batch_size')
+        if action == 'delete':
+            num_comments = queryset.delete_in_batches(batch_size)
+        else:
+            num_comments = getattr(queryset, action)(batch_size)
+
+        self.stdout.write('{} comments {}.'.format(num_comments, ACTIONS[action]))
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.posts import models
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the denormalized published comments counter of every post.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            action='store',
+            dest='batch_size',
+            type=int,
+            default=1000,
+            help='Number of posts updated per statement. Defaults to 1000.')
+
+    def handle(self, *args, **options):
+        batch_size = options.get('batch_size')
+        pks = list(models.Post.objects.order_by('pk').values_list('pk', flat=True))
+
+        num_posts = 0
+        for start in range(0, len(pks), batch_size):
+            with transactions.atomic():
+                num_posts += models.Post.objects.refresh_published_comment_count(pks[start:start + batch_size])
+
+        self.stdout.write('{} posts updated.'.format(num_posts))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.posts import models
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the precomputed excerpt and body of every post from its content.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            action='store',
+            dest='batch_size',
+            type=int,
+            default=1000,
+            help='Number of posts updated per transaction. Defaults to 1000.')
+
+    def handle(self, *args, **options):
+        batch_size = options.get('batch_size')
+        pks = list(models.Post.objects.order_by('pk').values_list('pk', flat=True))
+
+        num_posts = 0
+        for start in range(0, len(pks), batch_size):
+            posts = models.Post.objects \
+                .filter(pk__in=pks[start:start + batch_size]) \
+                .only('pk', 'content')
+            with transactions.atomic():
+                for post in posts:
+                    excerpt, body = models.Post.split_content(post.content)
+                    num_posts += models.Post.objects.filter(pk=post.pk).update(excerpt=excerpt, body=body)
+
+        self.stdout.write('{} posts updated.'.format(num_posts))
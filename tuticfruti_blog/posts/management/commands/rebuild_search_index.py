@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.posts import models
+from tuticfruti_blog.posts import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the full text search index of every post.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            action='store',
+            dest='batch_size',
+            type=int,
+            default=1000,
+            help='Number of posts indexed per statement. Defaults to 1000.')
+        parser.add_argument(
+            '--database',
+            action='store',
+            dest='database',
+            default=DEFAULT_DB_ALIAS,
+            help='Nominates the database to index. Defaults to the "default" database.')
+
+    def handle(self, *args, **options):
+        batch_size = options.get('batch_size')
+        database = options.get('database')
+        backend = search.get_search_backend(database)
+        pks = list(models.Post.objects.using(database).order_by('pk').values_list('pk', flat=True))
+
+        for start in range(0, len(pks), batch_size):
+            with transactions.atomic(using=database):
+                backend.index(pks[start:start + batch_size])
+        search.bump_generation()
+
+        self.stdout.write('{} posts indexed.'.format(len(pks)))
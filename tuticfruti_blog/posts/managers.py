@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
 from django.db import models
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from tuticfruti_blog.core import transactions
+from . import signals
 
 
 class PostManager(models.Manager):
@@ -9,8 +14,117 @@ class PostManager(models.Manager):
     def all_draft(self):
         return self.filter(status_id=self.model.STATUS_DRAFT)
 
+    def touch(self, pks):
+        """Bumps the modified date, the version of anything rendered from the given posts."""
+        return self.filter(pk__in=pks).update(modified=timezone.now())
+
+    def comment_count(self, status_id=None):
+        """Correlated subquery counting the comments of a post, only those in status_id if given."""
+        comment_model = self.model._meta.get_field('comments').related_model
+        count_sql = 'SELECT COUNT(*) FROM {comment} WHERE {comment}.post_id = {post}.id' \
+            .format(comment=comment_model._meta.db_table, post=self.model._meta.db_table)
+        if status_id is None:
+            return RawSQL(count_sql, ())
+
+        return RawSQL('{} AND {}.status_id = %s'.format(count_sql, comment_model._meta.db_table), (status_id, ))
+
+    def refresh_published_comment_count(self, pks=None, touch=True):
+        """
+        Recomputes the denormalized published comments counter in one UPDATE, bumping the modified
+        date unless touch is False.
+        """
+        comment_model = self.model._meta.get_field('comments').related_model
+        queryset = self.all() if pks is None else self.filter(pk__in=pks)
+        fields = dict(published_comment_count=self.comment_count(comment_model.STATUS_PUBLISHED))
+        if touch:
+            fields['modified'] = timezone.now()
+
+        return queryset.update(**fields)
+
+
+MODERATION_BATCH_SIZE = 1000
+
+
+class CommentQuerySet(models.QuerySet):
+    """Keeps Post.published_comment_count and Post.modified up to date on bulk updates and deletes."""
+
+    def _post_ids(self):
+        return set(self.order_by().values_list('post_id', flat=True).distinct())
+
+    def _refresh_published_comment_count(self, post_ids):
+        if post_ids:
+            post_model = self.model._meta.get_field('post').rel.to
+            post_model.objects.refresh_published_comment_count(post_ids)
+
+    def update(self, **kwargs):
+        post_ids = self._post_ids()
+        rows = super().update(**kwargs)
+        post = kwargs.get('post', kwargs.get('post_id'))
+        if post is not None:
+            post_ids.add(getattr(post, 'pk', post))
+        self._refresh_published_comment_count(post_ids)
+        signals.comments_changed.send(sender=self.model, post_ids=post_ids)
+
+        return rows
+    update.alters_data = True
+
+    def delete(self):
+        post_ids = self._post_ids()
+        result = super().delete()
+        self._refresh_published_comment_count(post_ids)
+        signals.comments_changed.send(sender=self.model, post_ids=post_ids)
+
+        return result
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def _batches(self, batch_size):
+        pks = list(self.order_by('pk').values_list('pk', flat=True))
+        manager = self.model._default_manager.db_manager(self.db)
+        for start in range(0, len(pks), batch_size):
+            batch_pks = pks[start:start + batch_size]
+            yield batch_pks, manager.filter(pk__in=batch_pks)
+
+    def update_in_batches(self, batch_size=MODERATION_BATCH_SIZE, **kwargs):
+        """Updates the comments with one UPDATE per batch of batch_size comments, each in its own transaction."""
+        rows = 0
+        for batch_pks, batch in self._batches(batch_size):
+            with transactions.atomic(using=self.db):
+                rows += batch.update(**kwargs)
+
+        return rows
+    update_in_batches.alters_data = True
+
+    def delete_in_batches(self, batch_size=MODERATION_BATCH_SIZE):
+        """
+        Deletes the comments with one DELETE per batch of batch_size comments, each in its own transaction.
+
+        Nothing references comments, so rows are deleted without loading them nor sending delete signals,
+        counters and caches are refreshed by comments_changed as for any bulk delete.
+        """
+        rows = 0
+        for batch_pks, batch in self._batches(batch_size):
+            with transactions.atomic(using=self.db):
+                post_ids = batch._post_ids()
+                batch._raw_delete(using=self.db)
+                batch._refresh_published_comment_count(post_ids)
+                signals.comments_changed.send(sender=self.model, post_ids=post_ids)
+            rows += len(batch_pks)
+
+        return rows
+    delete_in_batches.alters_data = True
+    delete_in_batches.queryset_only = True
+
+    def approve(self, batch_size=MODERATION_BATCH_SIZE):
+        return self.update_in_batches(batch_size, status_id=self.model.STATUS_PUBLISHED, modified=timezone.now())
+    approve.alters_data = True
+
+    def reject(self, batch_size=MODERATION_BATCH_SIZE):
+        return self.update_in_batches(batch_size, status_id=self.model.STATUS_PENDING, modified=timezone.now())
+    reject.alters_data = True
+
 
-class CommentManager(models.Manager):
+class CommentManager(models.Manager.from_queryset(CommentQuerySet)):
     def all_published(self):
         return self.filter(status_id=self.model.STATUS_PUBLISHED)
 
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models.expressions import RawSQL
+
+
+def forwards_published_comment_count(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    count_sql = 'SELECT COUNT(*) FROM {comment} WHERE {comment}.post_id = {post}.id AND {comment}.status_id = %s' \
+        .format(comment=Comment._meta.db_table, post=Post._meta.db_table)
+
+    Post.objects.update(published_comment_count=RawSQL(count_sql, ('published', )))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='published_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='published comments'),
+        ),
+        migrations.RunPython(forwards_published_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+HR = '<hr />'
+
+
+def forwards_excerpt_body(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    for post in Post.objects.only('pk', 'content').iterator():
+        excerpt, hr, body = post.content.partition(HR)
+        if not hr:
+            excerpt = body = post.content
+        Post.objects.filter(pk=post.pk).update(excerpt=excerpt, body=body)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0002_post_published_comment_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='excerpt'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='body',
+            field=models.TextField(blank=True, editable=False, verbose_name='body'),
+        ),
+        migrations.RunPython(forwards_excerpt_body, migrations.RunPython.noop),
+    ]
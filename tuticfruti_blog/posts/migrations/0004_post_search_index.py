@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations
+
+# Structures of tuticfruti_blog.posts.search as of this migration, which must not follow later changes
+INSTALL_SQL = {
+    'postgresql': (
+        'ALTER TABLE posts_post ADD COLUMN search_vector tsvector',
+        'CREATE INDEX posts_post_search_vector_gin ON posts_post USING GIN (search_vector)',
+    ),
+    'sqlite': (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts "
+        "USING fts5(title, categories, tags, excerpt, tokenize='unicode61 remove_diacritics 1')",
+    ),
+}
+UNINSTALL_SQL = {
+    'postgresql': (
+        'DROP INDEX IF EXISTS posts_post_search_vector_gin',
+        'ALTER TABLE posts_post DROP COLUMN IF EXISTS search_vector',
+    ),
+    'sqlite': (
+        'DROP TABLE IF EXISTS posts_post_fts',
+    ),
+}
+POSTGRESQL_INDEX_SQL = (
+    "UPDATE posts_post SET search_vector = "
+    "setweight(to_tsvector(%(config)s, posts_post.title), 'A') || "
+    "setweight(to_tsvector(%(config)s, coalesce(("
+    "SELECT string_agg(posts_category.name, ' ') FROM posts_category "
+    "INNER JOIN posts_post_categories ON posts_post_categories.category_id = posts_category.id "
+    "WHERE posts_post_categories.post_id = posts_post.id), '')), 'B') || "
+    "setweight(to_tsvector(%(config)s, coalesce(("
+    "SELECT string_agg(posts_tag.term, ' ') FROM posts_tag "
+    "INNER JOIN posts_post_tags ON posts_post_tags.tag_id = posts_tag.id "
+    "WHERE posts_post_tags.post_id = posts_post.id), '')), 'B') || "
+    "setweight(to_tsvector(%(config)s, posts_post.excerpt), 'C') "
+    "WHERE posts_post.id IN %(pks)s"
+)
+SQLITE_INDEX_SQL = (
+    "INSERT INTO posts_post_fts (rowid, title, categories, tags, excerpt) "
+    "SELECT posts_post.id, posts_post.title, coalesce(("
+    "SELECT group_concat(posts_category.name, ' ') FROM posts_category "
+    "INNER JOIN posts_post_categories ON posts_post_categories.category_id = posts_category.id "
+    "WHERE posts_post_categories.post_id = posts_post.id), ''), coalesce(("
+    "SELECT group_concat(posts_tag.term, ' ') FROM posts_tag "
+    "INNER JOIN posts_post_tags ON posts_post_tags.tag_id = posts_tag.id "
+    "WHERE posts_post_tags.post_id = posts_post.id), ''), posts_post.excerpt "
+    "FROM posts_post WHERE posts_post.id IN ({pks})"
+)
+# SQLite allows 999 parameters per query
+BATCH_SIZE = 900
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in INSTALL_SQL.get(vendor, ()):
+        schema_editor.execute(sql)
+
+    Post = apps.get_model('posts', 'Post')
+    pks = list(Post.objects.using(schema_editor.connection.alias).order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(pks), BATCH_SIZE):
+        batch = pks[start:start + BATCH_SIZE]
+        if vendor == 'postgresql':
+            config = getattr(settings, 'POSTS_SEARCH_CONFIG', 'simple')
+            schema_editor.execute(POSTGRESQL_INDEX_SQL, dict(config=config, pks=tuple(batch)))
+        elif vendor == 'sqlite':
+            schema_editor.execute(SQLITE_INDEX_SQL.format(pks=', '.join(['%s'] * len(batch))), batch)
+
+
+def uninstall_search_index(apps, schema_editor):
+    for sql in UNINSTALL_SQL.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0003_post_excerpt_body'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+# SQLite only matches partial indexes against literals, while Django binds status_id as a parameter
+PARTIAL_INDEX_VENDORS = ('postgresql', )
+PUBLISHED_INDEX_NAME = 'posts_post_published_created'
+
+
+def create_published_index(apps, schema_editor):
+    if schema_editor.connection.vendor not in PARTIAL_INDEX_VENDORS:
+        return
+
+    Post = apps.get_model('posts', 'Post')
+    schema_editor.execute(
+        "CREATE INDEX {name} ON {post} (created DESC, id DESC) WHERE status_id = 'published'".format(
+            name=PUBLISHED_INDEX_NAME,
+            post=schema_editor.quote_name(Post._meta.db_table)))
+
+
+def drop_published_index(apps, schema_editor):
+    if schema_editor.connection.vendor in PARTIAL_INDEX_VENDORS:
+        schema_editor.execute('DROP INDEX IF EXISTS {}'.format(PUBLISHED_INDEX_NAME))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0004_post_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='post',
+            index_together=set([('status_id', 'created')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='comment',
+            index_together=set([('post', 'status_id', 'created')]),
+        ),
+        migrations.RunPython(create_published_index, drop_published_index),
+    ]
@@ -61,6 +61,8 @@ class Post(models.Model):
     title = models.CharField(max_length=255, unique=True, verbose_name=_('title'))
     slug = models.SlugField(max_length=255, db_index=True, verbose_name=_('slug'))
     content = RichTextUploadingField(blank=True, verbose_name=_('content'))
+    excerpt = models.TextField(blank=True, editable=False, verbose_name=_('excerpt'))
+    body = models.TextField(blank=True, editable=False, verbose_name=_('body'))
     status_id = models.CharField(
         choices=STATUS_CHOICES,
         default=STATUS_DRAFT,
@@ -69,10 +71,31 @@ class Post(models.Model):
     tags = models.ManyToManyField(Tag, related_name='posts', verbose_name=_('tags'))
     created = models.DateTimeField(auto_now_add=True, blank=True, db_index=True, verbose_name=_('created'))
     modified = models.DateTimeField(auto_now=True, blank=True, db_index=True, verbose_name=_('modified'))
+    published_comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name=_('published comments'))
+
+    @classmethod
+    def split_content(cls, content):
+        """Splits content into the excerpt before the first HR and the body after it."""
+        excerpt, hr, body = content.partition(cls.HR)
+        if not hr:
+            return content, content
+
+        return excerpt, body
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status_id = instance.__dict__.get('status_id')
+        return instance
 
     def save(self, *args, **kwargs):
         self.slug = slugify(self.title)
+        self.excerpt, self.body = self.split_content(self.content)
         super().save(*args, **kwargs)
+        self._loaded_status_id = self.status_id
 
     def get_absolute_url(self):
         return reverse('posts:detail', kwargs={'slug': self.slug})
@@ -86,6 +109,7 @@ class Post(models.Model):
         verbose_name = _('post')
         verbose_name_plural = _('posts')
         ordering = ['-created']
+        index_together = [('status_id', 'created')]
 
 
 class Comment(models.Model):
@@ -107,6 +131,26 @@ class Comment(models.Model):
     created = models.DateTimeField(auto_now_add=True, blank=True, db_index=True, verbose_name=_('created'))
     modified = models.DateTimeField(auto_now=True, blank=True, db_index=True, verbose_name=_('created'))
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_state = (instance.__dict__.get('post_id'), instance.__dict__.get('status_id'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded_post_id, loaded_status_id = getattr(self, '_loaded_state', (None, None))
+        super().save(*args, **kwargs)
+        self._loaded_state = (self.post_id, self.status_id)
+
+        # Pending comments are not displayed, so they never change the counter nor the post version
+        if self.STATUS_PUBLISHED in (loaded_status_id, self.status_id):
+            Post.objects.refresh_published_comment_count({self.post_id, loaded_post_id} - {None})
+
+    def delete(self, *args, **kwargs):
+        post_id = self.post_id
+        super().delete(*args, **kwargs)
+        Post.objects.refresh_published_comment_count([post_id])
+
     def __str__(self):
         return self.content
 
@@ -116,3 +160,4 @@ class Comment(models.Model):
         verbose_name = _('comment')
         verbose_name_plural = _('comments')
         ordering = ["-created"]
+        index_together = [('post', 'status_id', 'created')]
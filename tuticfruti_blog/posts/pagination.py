@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Keyset pagination for post lists.
+
+Pages are addressed by an opaque cursor holding the (created, id) key of the first or
+last post of the page already seen, so fetching any page is an index range scan
+without OFFSET nor COUNT(*).
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+MODE_PAGE = 'page'
+MODE_CURSOR = 'cursor'
+
+DIRECTION_NEXT = 'n'
+DIRECTION_PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, post):
+    value = '{}|{}|{}'.format(direction, post.created.isoformat(), post.pk)
+
+    return base64.urlsafe_b64encode(value.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        value = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        direction, created, pk = value.split('|')
+        created, pk = parse_datetime(created), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+    if direction not in (DIRECTION_NEXT, DIRECTION_PREVIOUS) or created is None:
+        raise InvalidCursor(cursor)
+
+    return direction, created, pk
+
+
+class CursorPaginator:
+    ordering = ('-created', '-pk')
+    reverse_ordering = ('created', 'pk')
+
+    def __init__(self, object_list, per_page):
+        self.object_list = object_list
+        self.per_page = per_page
+
+    def page(self, cursor=None):
+        if not cursor:
+            object_list = list(self.object_list.order_by(*self.ordering)[:self.per_page + 1])
+            return CursorPage(
+                object_list[:self.per_page],
+                has_previous=False,
+                has_next=len(object_list) > self.per_page)
+
+        direction, created, pk = decode_cursor(cursor)
+        if direction == DIRECTION_NEXT:
+            object_list = list(self.object_list
+                               .filter(Q(created__lt=created) | Q(created=created, pk__lt=pk))
+                               .order_by(*self.ordering)[:self.per_page + 1])
+            return CursorPage(object_list[:self.per_page], has_previous=True, has_next=len(object_list) > self.per_page)
+
+        object_list = list(self.object_list
+                           .filter(Q(created__gt=created) | Q(created=created, pk__gt=pk))
+                           .order_by(*self.reverse_ordering)[:self.per_page + 1])
+        return CursorPage(
+            list(reversed(object_list[:self.per_page])),
+            has_previous=len(object_list) > self.per_page,
+            has_next=True)
+
+
+class CursorPage:
+    """Duck types django.core.paginator.Page, page numbers being cursors."""
+
+    def __init__(self, object_list, has_previous, has_next):
+        self.object_list = object_list
+        self._has_previous = has_previous and bool(object_list)
+        self._has_next = has_next and bool(object_list)
+
+    def __repr__(self):
+        return '<Cursor page of {} objects>'.format(len(self))
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def previous_page_number(self):
+        return encode_cursor(DIRECTION_PREVIOUS, self.object_list[0])
+
+    def next_page_number(self):
+        return encode_cursor(DIRECTION_NEXT, self.object_list[-1])
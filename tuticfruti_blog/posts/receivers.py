@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+from django.db.models import signals as model_signals
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import caching
+from . import facets
+from . import models
+from . import search
+from . import signals
+
+
+def _post_pks(instance):
+    return list(instance.posts.values_list('pk', flat=True))
+
+
+def _category_slugs(post):
+    return list(post.categories.values_list('slug', flat=True))
+
+
+# Search index
+
+@receiver(model_signals.post_save, sender=models.Post)
+def index_post(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:
+        search.index_posts([instance.pk], using)
+
+
+@receiver(model_signals.post_delete, sender=models.Post)
+def remove_post(sender, instance, using=None, **kwargs):
+    search.remove_posts([instance.pk], using)
+
+
+@receiver(model_signals.m2m_changed, sender=models.Post.categories.through)
+@receiver(model_signals.m2m_changed, sender=models.Post.tags.through)
+def index_post_relations(sender, instance, action, reverse, pk_set, using=None, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            search.index_posts([instance.pk], using)
+    elif action == 'pre_clear':
+        instance._post_pks = _post_pks(instance)
+    elif action == 'post_clear':
+        search.index_posts(getattr(instance, '_post_pks', []), using)
+    elif action in ('post_add', 'post_remove'):
+        search.index_posts(pk_set, using)
+
+
+@receiver(model_signals.post_save, sender=models.Category)
+@receiver(model_signals.post_save, sender=models.Tag)
+def index_taxonomy_posts(sender, instance, created, raw=False, using=None, **kwargs):
+    if not (raw or created):
+        search.index_posts(_post_pks(instance), using)
+
+
+@receiver(model_signals.pre_delete, sender=models.Category)
+@receiver(model_signals.pre_delete, sender=models.Tag)
+def collect_taxonomy_posts(sender, instance, **kwargs):
+    instance._post_pks = _post_pks(instance)
+
+
+@receiver(model_signals.post_delete, sender=models.Category)
+@receiver(model_signals.post_delete, sender=models.Tag)
+def reindex_taxonomy_posts(sender, instance, using=None, **kwargs):
+    search.index_posts(getattr(instance, '_post_pks', []), using)
+
+
+# Page cache
+
+@receiver(model_signals.post_save, sender=models.Post)
+def invalidate_post_pages(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    caching.invalidate_posts([instance.pk])
+    if created or getattr(instance, '_loaded_status_id', None) != instance.status_id:
+        caching.invalidate_lists(_category_slugs(instance))
+
+
+@receiver(model_signals.pre_delete, sender=models.Post)
+def collect_post_categories(sender, instance, **kwargs):
+    instance._category_slugs = _category_slugs(instance)
+
+
+@receiver(model_signals.post_delete, sender=models.Post)
+def invalidate_deleted_post_pages(sender, instance, **kwargs):
+    caching.invalidate_posts([instance.pk])
+    if instance.status_id == models.Post.STATUS_PUBLISHED:
+        caching.invalidate_lists(getattr(instance, '_category_slugs', []))
+
+
+@receiver(model_signals.m2m_changed, sender=models.Post.categories.through)
+def invalidate_post_categories_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        instance._category_slugs = _category_slugs(instance) if not reverse else [instance.slug]
+        instance._post_pks = _post_pks(instance) if reverse else [instance.pk]
+    elif action == 'post_clear':
+        caching.invalidate_posts(getattr(instance, '_post_pks', []))
+        caching.invalidate_lists(getattr(instance, '_category_slugs', []))
+    elif action in ('post_add', 'post_remove') and not reverse:
+        caching.invalidate_posts([instance.pk])
+        caching.invalidate_lists(models.Category.objects.filter(pk__in=pk_set).values_list('slug', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        caching.invalidate_posts(pk_set)
+        caching.invalidate_lists([instance.slug])
+
+
+@receiver(model_signals.m2m_changed, sender=models.Post.tags.through)
+def invalidate_post_tags_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action == 'pre_clear':
+            instance._tag_pks = list(instance.tags.values_list('pk', flat=True))
+        elif action == 'post_clear':
+            caching.invalidate_posts([instance.pk])
+            caching.invalidate_tag_lists(getattr(instance, '_tag_pks', []))
+        elif action in ('post_add', 'post_remove'):
+            caching.invalidate_posts([instance.pk])
+            caching.invalidate_tag_lists(pk_set)
+    elif action == 'pre_clear':
+        caching.invalidate_posts(_post_pks(instance))
+        caching.invalidate_tag_lists([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        caching.invalidate_posts(pk_set)
+        caching.invalidate_tag_lists([instance.pk])
+
+
+@receiver(model_signals.post_save, sender=models.Comment)
+@receiver(model_signals.post_delete, sender=models.Comment)
+def invalidate_comment_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        loaded_post_id, loaded_status_id = getattr(instance, '_loaded_state', (None, None))
+        caching.invalidate_posts({instance.post_id, loaded_post_id} - {None})
+
+
+@receiver(signals.comments_changed)
+def invalidate_comments_pages(sender, post_ids, **kwargs):
+    caching.invalidate_posts(post_ids)
+
+
+@receiver(model_signals.post_save, sender=models.Category)
+@receiver(model_signals.post_delete, sender=models.Category)
+def invalidate_category_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        caching.invalidate_navigation()
+
+
+@receiver(model_signals.post_save, sender=models.Tag)
+def invalidate_tag_pages(sender, instance, created, raw=False, **kwargs):
+    if not (raw or created):
+        caching.invalidate_posts(_post_pks(instance))
+        caching.invalidate_tag_lists([instance.pk])
+
+
+@receiver(model_signals.post_delete, sender=models.Tag)
+def invalidate_deleted_tag_pages(sender, instance, **kwargs):
+    caching.invalidate_posts(getattr(instance, '_post_pks', []))
+    caching.invalidate_tag_lists([instance.pk])
+
+
+# Facet index
+
+@receiver(model_signals.post_save, sender=models.Post)
+def update_post_facets(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    was_published = getattr(instance, '_loaded_status_id', None) == models.Post.STATUS_PUBLISHED
+    is_published = instance.status_id == models.Post.STATUS_PUBLISHED
+    if is_published and not was_published:
+        facets.update('publish', instance.pk)
+    elif was_published and not is_published:
+        facets.update('unpublish', instance.pk)
+
+
+@receiver(model_signals.post_delete, sender=models.Post)
+def update_deleted_post_facets(sender, instance, **kwargs):
+    if instance.status_id == models.Post.STATUS_PUBLISHED:
+        facets.update('unpublish', instance.pk)
+
+
+@receiver(model_signals.m2m_changed, sender=models.Post.categories.through)
+@receiver(model_signals.m2m_changed, sender=models.Post.tags.through)
+def update_relation_facets(sender, instance, action, reverse, pk_set, **kwargs):
+    facet = facets.CATEGORY if sender is models.Post.categories.through else facets.TAG
+    if not reverse:
+        if action == 'post_add':
+            facets.update('link', facet, pk_set, [instance.pk])
+        elif action == 'post_remove':
+            facets.update('unlink', facet, pk_set, [instance.pk])
+        elif action == 'post_clear':
+            facets.update('clear_post', facet, instance.pk)
+    elif action == 'post_add':
+        facets.update('link', facet, [instance.pk], pk_set)
+    elif action == 'post_remove':
+        facets.update('unlink', facet, [instance.pk], pk_set)
+    elif action == 'post_clear':
+        facets.update('remove', facet, instance.pk)
+
+
+@receiver(model_signals.post_delete, sender=models.Category)
+@receiver(model_signals.post_delete, sender=models.Tag)
+def update_deleted_taxonomy_facets(sender, instance, **kwargs):
+    facets.update('remove', facets.CATEGORY if sender is models.Category else facets.TAG, instance.pk)
+
+
+# Fragment cache versions
+
+@receiver(model_signals.post_save, sender=models.Category)
+@receiver(model_signals.post_save, sender=models.Tag)
+def touch_taxonomy_posts(sender, instance, created, raw=False, **kwargs):
+    if not (raw or created):
+        models.Post.objects.touch(instance.posts.values('pk'))
+
+
+@receiver(model_signals.post_delete, sender=models.Category)
+@receiver(model_signals.post_delete, sender=models.Tag)
+def touch_deleted_taxonomy_posts(sender, instance, **kwargs):
+    models.Post.objects.touch(getattr(instance, '_post_pks', []))
+
+
+@receiver(model_signals.m2m_changed, sender=models.Post.categories.through)
+@receiver(model_signals.m2m_changed, sender=models.Post.tags.through)
+def touch_post_relations(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.modified = timezone.now()
+            models.Post.objects.filter(pk=instance.pk).update(modified=instance.modified)
+    elif action == 'pre_clear':
+        models.Post.objects.touch(instance.posts.values('pk'))
+    elif action in ('post_add', 'post_remove'):
+        models.Post.objects.touch(pk_set)
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Full text search backends for posts.
+
+Every backend indexes the title, excerpt, category names and tag terms of a post and
+filters a Post queryset by free search terms, ordering it by relevance.
+
+The ordered ids of the results are cached under the normalized terms and the scope of the
+search. Every index update bumps a generation number which is part of the cache keys, so
+results cached before any content change are never served again. The generation is bumped
+again once the change is committed, as results may be computed in between from the primary,
+which doesn't see the change yet.
+"""
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, DEFAULT_DB_ALIAS
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.core.cache import get_or_compute
+from . import models
+
+BACKENDS = {
+    'postgresql': 'tuticfruti_blog.posts.search.PostgresSearchBackend',
+    'sqlite': 'tuticfruti_blog.posts.search.SqliteSearchBackend',
+}
+DEFAULT_BACKEND = 'tuticfruti_blog.posts.search.SimpleSearchBackend'
+
+TERM_REGEX = re.compile(r'\w+', re.UNICODE)
+
+GENERATION_KEY = 'generation:posts:search'
+RESULTS_KEY_PREFIX = 'posts:search:results:'
+RESULTS_TIMEOUT = 300
+
+
+def get_terms(search_terms):
+    """Returns the lowercased words of a search string, dropping anything but word characters."""
+    return TERM_REGEX.findall((search_terms or '').lower())
+
+
+def get_search_backend(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    path = getattr(settings, 'POSTS_SEARCH_BACKEND', None) or BACKENDS.get(connection.vendor, DEFAULT_BACKEND)
+
+    return import_string(path)(connection)
+
+
+def normalize_terms(search_terms):
+    """Returns the sorted distinct terms of a search string, equal for every equivalent search."""
+    return ' '.join(sorted(set(get_terms(search_terms))))
+
+
+def get_generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, 0, None)
+        generation = cache.get(GENERATION_KEY, 0)
+
+    return generation
+
+
+def bump_generation():
+    cache.add(GENERATION_KEY, 0, None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        pass
+
+
+def index_posts(pks, using=DEFAULT_DB_ALIAS):
+    get_search_backend(using).index(pks)
+    bump_generation()
+    transactions.after_commit(bump_generation, using)
+
+
+def remove_posts(pks, using=DEFAULT_DB_ALIAS):
+    get_search_backend(using).remove(pks)
+    bump_generation()
+    transactions.after_commit(bump_generation, using)
+
+
+def get_result_pks(queryset, search_terms, scope=''):
+    """
+    Returns the ids of the posts of queryset matching the search terms, ordered by relevance.
+
+    Results are cached for POSTS_SEARCH_RESULTS_TIMEOUT seconds under the normalized terms and
+    the scope, which names whatever queryset is restricted to.
+    """
+    terms = normalize_terms(search_terms)
+    digest = hashlib.md5('{}|{}'.format(scope, terms).encode()).hexdigest()
+    key = '{}{}:{}'.format(RESULTS_KEY_PREFIX, get_generation(), digest)
+
+    def compute():
+        # Read from the primary, replicas may lag behind the change that bumped the generation
+        using = router.db_for_write(models.Post)
+        backend = get_search_backend(using)
+        return list(backend.search(queryset.using(using), terms).values_list('pk', flat=True)), []
+
+    return get_or_compute(key, compute, hard_timeout=getattr(settings, 'POSTS_SEARCH_RESULTS_TIMEOUT', RESULTS_TIMEOUT))
+
+
+class BaseSearchBackend:
+    INSTALL_SQL = ()
+    UNINSTALL_SQL = ()
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def _tables(self):
+        categories = models.Post._meta.get_field('categories')
+        tags = models.Post._meta.get_field('tags')
+
+        return dict(
+            post=models.Post._meta.db_table,
+            category=models.Category._meta.db_table,
+            post_categories=categories.m2m_db_table(),
+            post_categories_post=categories.m2m_column_name(),
+            post_categories_category=categories.m2m_reverse_name(),
+            tag=models.Tag._meta.db_table,
+            post_tags=tags.m2m_db_table(),
+            post_tags_post=tags.m2m_column_name(),
+            post_tags_tag=tags.m2m_reverse_name())
+
+    def _execute(self, sql, params=()):
+        with self.connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def install(self):
+        """Creates the database structures the backend relies on."""
+        for sql in self.INSTALL_SQL:
+            self._execute(sql.format(**self._tables()))
+
+    def uninstall(self):
+        """Drops the database structures created by install."""
+        for sql in self.UNINSTALL_SQL:
+            self._execute(sql.format(**self._tables()))
+
+    def index(self, pks):
+        """Updates the index entries of the given posts."""
+
+    def remove(self, pks):
+        """Removes the index entries of the given posts."""
+
+    def search(self, queryset, search_terms):
+        raise NotImplementedError
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Portable fallback without index, matching any term as a case insensitive substring."""
+
+    def search(self, queryset, search_terms):
+        query = Q(pk__in=[])
+        for term in get_terms(search_terms):
+            query |= Q(title__icontains=term) | Q(categories__name__icontains=term) | Q(tags__term__icontains=term)
+
+        return queryset.filter(query).distinct()
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """Weighted tsvector column on the post table, backed by a GIN index and ordered by ts_rank."""
+
+    CONFIG = 'simple'
+
+    INSTALL_SQL = (
+        'ALTER TABLE {post} ADD COLUMN search_vector tsvector',
+        'CREATE INDEX {post}_search_vector_gin ON {post} USING GIN (search_vector)',
+    )
+    UNINSTALL_SQL = (
+        'DROP INDEX IF EXISTS {post}_search_vector_gin',
+        'ALTER TABLE {post} DROP COLUMN IF EXISTS search_vector',
+    )
+    INDEX_SQL = (
+        "UPDATE {post} SET search_vector = "
+        "setweight(to_tsvector(%(config)s, {post}.title), 'A') || "
+        "setweight(to_tsvector(%(config)s, coalesce(("
+        "SELECT string_agg({category}.name, ' ') FROM {category} "
+        "INNER JOIN {post_categories} ON {post_categories}.{post_categories_category} = {category}.id "
+        "WHERE {post_categories}.{post_categories_post} = {post}.id), '')), 'B') || "
+        "setweight(to_tsvector(%(config)s, coalesce(("
+        "SELECT string_agg({tag}.term, ' ') FROM {tag} "
+        "INNER JOIN {post_tags} ON {post_tags}.{post_tags_tag} = {tag}.id "
+        "WHERE {post_tags}.{post_tags_post} = {post}.id), '')), 'B') || "
+        "setweight(to_tsvector(%(config)s, {post}.excerpt), 'C') "
+        "WHERE {post}.id IN %(pks)s"
+    )
+
+    def _config(self):
+        return getattr(settings, 'POSTS_SEARCH_CONFIG', self.CONFIG)
+
+    def index(self, pks):
+        pks = tuple(pks)
+        if pks:
+            self._execute(self.INDEX_SQL.format(**self._tables()), dict(config=self._config(), pks=pks))
+
+    def search(self, queryset, search_terms):
+        terms = get_terms(search_terms)
+        if not terms:
+            return queryset.none()
+
+        query = ' | '.join("'{}':*".format(term) for term in terms)
+        tables = self._tables()
+
+        return queryset.extra(
+            select={'search_rank': 'ts_rank({post}.search_vector, to_tsquery(%s, %s))'.format(**tables)},
+            select_params=(self._config(), query),
+            where=['{post}.search_vector @@ to_tsquery(%s, %s)'.format(**tables)],
+            params=(self._config(), query),
+            order_by=['-search_rank', '-created'])
+
+
+class SqliteSearchBackend(BaseSearchBackend):
+    """FTS5 virtual table keyed by post id, ordered by bm25."""
+
+    INSTALL_SQL = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS {post}_fts "
+        "USING fts5(title, categories, tags, excerpt, tokenize='unicode61 remove_diacritics 1')",
+    )
+    UNINSTALL_SQL = (
+        'DROP TABLE IF EXISTS {post}_fts',
+    )
+    REMOVE_SQL = 'DELETE FROM {post}_fts WHERE rowid IN ({pks})'
+    INDEX_SQL = (
+        "INSERT INTO {post}_fts (rowid, title, categories, tags, excerpt) "
+        "SELECT {post}.id, {post}.title, coalesce(("
+        "SELECT group_concat({category}.name, ' ') FROM {category} "
+        "INNER JOIN {post_categories} ON {post_categories}.{post_categories_category} = {category}.id "
+        "WHERE {post_categories}.{post_categories_post} = {post}.id), ''), coalesce(("
+        "SELECT group_concat({tag}.term, ' ') FROM {tag} "
+        "INNER JOIN {post_tags} ON {post_tags}.{post_tags_tag} = {tag}.id "
+        "WHERE {post_tags}.{post_tags_post} = {post}.id), ''), {post}.excerpt "
+        "FROM {post} WHERE {post}.id IN ({pks})"
+    )
+    # Column weights for bm25: title, categories, tags, excerpt
+    RANK_SQL = (
+        'SELECT bm25({post}_fts, 10.0, 5.0, 5.0, 1.0) FROM {post}_fts '
+        'WHERE {post}_fts MATCH %s AND rowid = {post}.id'
+    )
+    MATCH_SQL = '{post}.id IN (SELECT rowid FROM {post}_fts WHERE {post}_fts MATCH %s)'
+
+    def remove(self, pks):
+        pks = list(pks)
+        if pks:
+            self._execute(self.REMOVE_SQL.format(pks=', '.join(['%s'] * len(pks)), **self._tables()), pks)
+
+    def index(self, pks):
+        pks = list(pks)
+        if pks:
+            self.remove(pks)
+            self._execute(self.INDEX_SQL.format(pks=', '.join(['%s'] * len(pks)), **self._tables()), pks)
+
+    def search(self, queryset, search_terms):
+        terms = get_terms(search_terms)
+        if not terms:
+            return queryset.none()
+
+        query = ' OR '.join('"{}"*'.format(term) for term in terms)
+        tables = self._tables()
+
+        # bm25 scores are negative, the lower the more relevant
+        return queryset.extra(
+            select={'search_rank': self.RANK_SQL.format(**tables)},
+            select_params=(query, ),
+            where=[self.MATCH_SQL.format(**tables)],
+            params=(query, ),
+            order_by=['search_rank', '-created'])
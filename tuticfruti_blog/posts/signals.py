@@ -0,0 +1,5 @@
+# -*- coding: utf-8 -*-
+from django.dispatch import Signal
+
+# Sent after comments are updated or deleted in bulk, bypassing model signals
+comments_changed = Signal(providing_args=['post_ids'])
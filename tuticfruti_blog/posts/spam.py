@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Spam checks of the submitted comments.
+
+Checks are cheap heuristics run by the comment ingestion task before storing a comment,
+comments passing them still wait for moderation.
+"""
+import re
+
+from django.conf import settings
+
+from . import models
+
+LINK_RE = re.compile(r'https?://|www\.', re.IGNORECASE)
+
+
+def get_spam_reason(post, author, email, content):
+    """Returns why a comment looks like spam, None if it does not."""
+    max_links = getattr(settings, 'POSTS_COMMENT_MAX_LINKS', 2)
+    if len(LINK_RE.findall(content)) > max_links:
+        return 'more than {} links'.format(max_links)
+
+    text = ' '.join([author, email, content]).lower()
+    for term in getattr(settings, 'POSTS_COMMENT_BLOCKED_TERMS', []):
+        if term.lower() in text:
+            return 'blocked term "{}"'.format(term)
+
+    if models.Comment.objects.filter(post=post, email__iexact=email, content=content).exists():
+        return 'duplicate'
+
+    return None
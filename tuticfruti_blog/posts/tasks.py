@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from django.conf import settings
+from django.core.mail import mail_managers
+from django.core.urlresolvers import reverse
+from django.db import DatabaseError
+
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.taskapp.celery import app
+from . import models
+from . import spam
+
+logger = logging.getLogger(__name__)
+
+
+def notify_managers(comment):
+    if not getattr(settings, 'POSTS_COMMENT_NOTIFICATIONS_ENABLED', True):
+        return
+
+    subject = 'New comment on "{}"'.format(comment.post.title)
+    message = '{} <{}> wrote:\n\n{}\n\nModerate it at {}'.format(
+        comment.author,
+        comment.email,
+        comment.content,
+        reverse('admin:posts_comment_change', args=[comment.pk]))
+    mail_managers(subject, message, fail_silently=True)
+
+
+@app.task(bind=True, ignore_result=True, max_retries=3, default_retry_delay=10)
+def ingest_comment(self, post_pk, author, email, content):
+    """
+    Stores a comment submitted on the post detail page, waiting for moderation.
+
+    Comments looking like spam are discarded. Counters and caches are kept up to date by the
+    comment model and its receivers, managers are notified once the comment is stored.
+    """
+    post = models.Post.objects.filter(pk=post_pk).only('pk', 'title').first()
+    if post is None:
+        logger.info('Comment on missing post %s discarded', post_pk)
+        return
+
+    reason = spam.get_spam_reason(post, author, email, content)
+    if reason is not None:
+        logger.info('Comment by %s on post %s discarded as spam: %s', email, post_pk, reason)
+        return
+
+    try:
+        with transactions.atomic():
+            comment = models.Comment.objects.create(post=post, author=author, email=email, content=content)
+    except DatabaseError as exc:
+        raise self.retry(exc=exc)
+
+    notify_managers(comment)
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+import json
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django import test
+
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.core.utils import QueryBudgetMixin
+from tuticfruti_blog.users.models import User
+from .. import admin
+from .. import factories
+from .. import models
+
+
+class TestPostAdmin(QueryBudgetMixin, test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+        cls.published_post = models.Post.objects.get(slug='published-post')
+
+    def setUp(self):
+        self.client.login(username='admin', password='password')
+        self.url = reverse('admin:posts_post_changelist')
+
+    def _result(self, res, post):
+        return [result for result in res.context['cl'].result_list if result.pk == post.pk][0]
+
+    def test_changelist_columns(self):
+        res = self.client.get(self.url)
+        post = self._result(res, self.published_post)
+        post_admin = admin.PostAdmin(models.Post, None)
+
+        self.assertEqual(post_admin.num_comments(post), self.published_post.comments.count())
+        self.assertEqual(
+            post_admin._categories(post),
+            list(self.published_post.categories.values_list('name', flat=True)))
+        self.assertEqual(post_admin._tags(post), list(self.published_post.tags.values_list('term', flat=True)))
+
+    def test_changelist_counts_posts_without_comment_subquery(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(self.url, {'status_id__exact': models.Post.STATUS_PUBLISHED})
+        post_table = models.Post._meta.db_table
+        count_queries = [query['sql'] for query in queries if '__count' in query['sql'] and post_table in query['sql']]
+
+        self.assertEqual(res.context['cl'].result_count, models.Post.objects.all_published().count())
+        self.assertTrue(count_queries)
+        for sql in count_queries:
+            self.assertNotIn(models.Comment._meta.db_table, sql)
+
+    @mock.patch.object(admin.PostAdmin, 'list_per_page', 5)
+    def test_paginated_changelist_columns(self):
+        res = self.client.get(self.url, {'p': 1})
+        post_admin = admin.PostAdmin(models.Post, None)
+
+        self.assertEqual(len(res.context['cl'].result_list), 5)
+        for post in res.context['cl'].result_list:
+            self.assertEqual(post_admin.num_comments(post), post.comments.count())
+
+    def test_changelist_queries_do_not_grow_with_posts(self):
+        user = User.objects.get(username='user0')
+        categories = models.Category.objects.all()
+        tags = models.Tag.objects.all()
+
+        def grow():
+            for i in range(5):
+                post = factories.PostFactory(
+                    author=user, title='Admin post {}'.format(i), categories=categories, tags=tags)
+                factories.CommentFactory.create_batch(3, post=post)
+
+        self.assertQueriesDoNotGrow(lambda: self.client.get(self.url), grow)
+
+    def test_changelist_show_all(self):
+        res = self.client.get(self.url, {'all': ''})
+        post = self._result(res, self.published_post)
+
+        self.assertEqual(
+            admin.PostAdmin(models.Post, None).num_comments(post), self.published_post.comments.count())
+
+
+class TestPostAdminAutocomplete(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        factories.TagFactory.create_batch(30)
+
+        cls.published_post = models.Post.objects.get(slug='published-post')
+
+    def setUp(self):
+        self.client.login(username='admin', password='password')
+
+    def _url(self, field_name):
+        return reverse('admin:posts_post_autocomplete', kwargs=dict(field_name=field_name))
+
+    def test_results_are_searched_by_term(self):
+        res = self.client.get(self._url('categories'), {'term': 'categor'})
+        data = json.loads(res.content.decode())
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            {result['text'] for result in data['results']},
+            set(models.Category.objects.filter(name__icontains='categor').values_list('name', flat=True)))
+        self.assertFalse(data['more'])
+
+    def test_results_are_paginated(self):
+        first_page = json.loads(self.client.get(self._url('tags')).content.decode())
+        second_page = json.loads(self.client.get(self._url('tags'), {'page': 2}).content.decode())
+
+        self.assertEqual(len(first_page['results']), admin.PostAdmin.autocomplete_per_page)
+        self.assertTrue(first_page['more'])
+        self.assertFalse({result['id'] for result in first_page['results']} &
+                         {result['id'] for result in second_page['results']})
+
+    def test_invalid_page(self):
+        self.assertEqual(self.client.get(self._url('tags'), {'page': 100}).status_code, 404)
+
+    def test_unknown_field(self):
+        self.assertEqual(self.client.get(self._url('title')).status_code, 404)
+
+    def test_anonymous_user_is_redirected_to_login(self):
+        self.client.logout()
+        res = self.client.get(self._url('tags'))
+
+        self.assertEqual(res.status_code, 302)
+        self.assertIn(reverse('admin:login'), res['Location'])
+
+    def test_change_form_renders_selected_options_only(self):
+        res = self.client.get(reverse('admin:posts_post_change', args=[self.published_post.pk]))
+        selected_terms = set(self.published_post.tags.values_list('term', flat=True))
+        unselected_term = models.Tag.objects.exclude(term__in=selected_terms).first().term
+
+        self.assertContains(res, 'data-autocomplete-url="{}"'.format(self._url('tags')))
+        for term in selected_terms:
+            self.assertContains(res, '>{}</option>'.format(term))
+        self.assertNotContains(res, '>{}</option>'.format(unselected_term))
+
+
+class TestPostAdminFilters(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def setUp(self):
+        self.client.login(username='admin', password='password')
+        self.url = reverse('admin:posts_post_changelist')
+
+    def test_tag_filter(self):
+        tag = models.Tag.objects.filter(posts__isnull=False).first()
+        res = self.client.get(self.url, {'tag': tag.term})
+
+        self.assertEqual(
+            {post.pk for post in res.context['cl'].result_list},
+            set(tag.posts.values_list('pk', flat=True)))
+
+    def test_author_filter(self):
+        author = User.objects.filter(posts__isnull=False).first()
+        res = self.client.get(self.url, {'author': author.username})
+
+        self.assertEqual(
+            {post.pk for post in res.context['cl'].result_list},
+            set(author.posts.values_list('pk', flat=True)))
+
+    def test_sidebar_does_not_list_tags(self):
+        res = self.client.get(self.url)
+
+        self.assertContains(res, 'name="tag"')
+        for term in models.Tag.objects.values_list('term', flat=True):
+            self.assertNotContains(res, '?tag={}'.format(term))
+
+
+class TestCommentInline(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+        cls.post = models.Post.objects.get(slug='published-post')
+        per_page = admin.CommentInlineFormSet.per_page
+        factories.CommentFactory.create_batch(per_page, post=cls.post, status_id=models.Comment.STATUS_PUBLISHED)
+        factories.CommentFactory.create_batch(3, post=cls.post, status_id=models.Comment.STATUS_PENDING)
+
+    def setUp(self):
+        self.client.login(username='admin', password='password')
+        self.url = reverse('admin:posts_post_change', args=[self.post.pk])
+
+    def _formset(self, res):
+        return [formset for formset in res.context['inline_admin_formsets']
+                if formset.formset.model is models.Comment][0].formset
+
+    def _post_data(self, res):
+        form = res.context['adminform'].form
+        formset = self._formset(res)
+        data = {name: value for name, value in form.initial.items() if name in form.fields and value is not None}
+        data.update({
+            '{}-TOTAL_FORMS'.format(formset.prefix): formset.initial_form_count(),
+            '{}-INITIAL_FORMS'.format(formset.prefix): formset.initial_form_count(),
+        })
+        for form in formset.initial_forms:
+            data.update({form.add_prefix(name): value for name, value in form.initial.items() if value is not None})
+            data[form.add_prefix('id')] = form.instance.pk
+            data[form.add_prefix('post')] = self.post.pk
+
+        return data
+
+    def test_renders_a_page_of_comments_pending_first(self):
+        res = self._formset(self.client.get(self.url))
+        comments = [form.instance for form in res.initial_forms]
+
+        self.assertEqual(len(comments), admin.CommentInlineFormSet.per_page)
+        self.assertEqual(
+            [comment.status_id for comment in comments[:3]], [models.Comment.STATUS_PENDING] * 3)
+        self.assertEqual(res.page.paginator.count, self.post.comments.count())
+
+    def test_renders_next_page(self):
+        res = self.client.get(self.url, {'comments_page': 2})
+        formset = self._formset(res)
+        first_page = self._formset(self.client.get(self.url)).initial_forms
+
+        self.assertEqual(formset.page.number, 2)
+        self.assertFalse(
+            {form.instance.pk for form in formset.initial_forms} & {form.instance.pk for form in first_page})
+        self.assertContains(res, 'comments_page=1')
+
+    def test_invalid_page_falls_back_to_first_page(self):
+        res = self.client.get(self.url, {'comments_page': 'last'})
+
+        self.assertEqual(self._formset(res).page.number, 1)
+
+    def test_saves_changed_comments_only(self):
+        data = self._post_data(self.client.get(self.url))
+        formset = self._formset(self.client.get(self.url))
+        comment = formset.initial_forms[0].instance
+        data[formset.initial_forms[0].add_prefix('status_id')] = models.Comment.STATUS_PUBLISHED
+        comment_table = models.Comment._meta.db_table
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(self.url, data)
+        updates = [query['sql'] for query in queries if 'UPDATE "{}"'.format(comment_table) in query['sql']]
+        selects = [query['sql'] for query in queries
+                   if 'SELECT' in query['sql'] and 'FROM "{}"'.format(comment_table) in query['sql']]
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(models.Comment.objects.get(pk=comment.pk).status_id, models.Comment.STATUS_PUBLISHED)
+        self.assertEqual(len(updates), 1)
+        self.assertLessEqual(len(selects), 2)
+
+
+class TestCommentAdminActions(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+        User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+        cls.published_post = models.Post.objects.get(slug='published-post')
+
+    def setUp(self):
+        self.client.login(username='admin', password='password')
+        self.url = reverse('admin:posts_comment_changelist')
+
+    def _action(self, action, comments, **data):
+        data.update({
+            'action': action,
+            'index': 0,
+            'select_across': 0,
+            helpers.ACTION_CHECKBOX_NAME: [comment.pk for comment in comments],
+        })
+
+        return self.client.post(self.url, data)
+
+    def test_approve_comments(self):
+        comments = list(self.published_post.comments.all_pending())
+        res = self._action('approve_comments', comments)
+
+        self.assertEqual(res.status_code, 302)
+        self.assertFalse(self.published_post.comments.all_pending().exists())
+        self.assertEqual(
+            models.Post.objects.get(pk=self.published_post.pk).published_comment_count,
+            self.published_post.comments.count())
+
+    def test_reject_comments(self):
+        comments = list(self.published_post.comments.all_published())
+        self._action('reject_comments', comments)
+
+        self.assertFalse(self.published_post.comments.all_published().exists())
+        self.assertEqual(models.Post.objects.get(pk=self.published_post.pk).published_comment_count, 0)
+
+    def test_delete_comments_asks_for_confirmation(self):
+        comments = list(self.published_post.comments.all())
+        res = self._action('delete_comments', comments)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'value="delete_comments"')
+        self.assertEqual(self.published_post.comments.count(), len(comments))
+
+    def test_delete_comments(self):
+        comments = list(self.published_post.comments.all())
+        res = self._action('delete_comments', comments, post='yes')
+
+        self.assertEqual(res.status_code, 302)
+        self.assertFalse(self.published_post.comments.exists())
+        self.assertEqual(models.Post.objects.get(pk=self.published_post.pk).published_comment_count, 0)
+
+    def test_delete_all_filtered_comments(self):
+        another_comment = factories.CommentFactory(post=models.Post.objects.exclude(pk=self.published_post.pk).first())
+        res = self.client.post('{}?post={}'.format(self.url, self.published_post.slug), {
+            'action': 'delete_comments',
+            'index': 0,
+            'select_across': 1,
+            helpers.ACTION_CHECKBOX_NAME: [self.published_post.comments.first().pk],
+            'post': 'yes',
+        })
+
+        self.assertEqual(res.status_code, 302)
+        self.assertFalse(self.published_post.comments.exists())
+        self.assertTrue(models.Comment.objects.filter(pk=another_comment.pk).exists())
+
+    def test_delete_selected_is_not_offered(self):
+        res = self.client.get(self.url)
+
+        self.assertNotContains(res, 'value="delete_selected"')
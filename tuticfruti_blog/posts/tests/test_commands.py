@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+from django.core.management import call_command, CommandError
+from django.utils.six import StringIO
+from django import test
+
+from tuticfruti_blog.core import data_fixtures
+from .. import models
+
+
+class TestCommandBase(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+
+        cls.published_post = models.Post.objects.get(slug='published-post')
+
+
+class TestRebuildCommentCountsCommand(TestCommandBase):
+    def test_rebuild_published_comment_count(self):
+        num_comments_expected = self.published_post.comments.all_published().count()
+        models.Post.objects.update(published_comment_count=0)
+        call_command('rebuild_comment_counts', batch_size=2, stdout=StringIO())
+        num_comments = models.Post.objects.get(pk=self.published_post.pk).published_comment_count
+
+        self.assertEqual(num_comments, num_comments_expected)
+
+    def test_every_post_is_updated(self):
+        out = StringIO()
+        call_command('rebuild_comment_counts', batch_size=2, stdout=out)
+
+        self.assertIn('{} posts updated.'.format(models.Post.objects.count()), out.getvalue())
+
+
+class TestRebuildPostExcerptsCommand(TestCommandBase):
+    def test_rebuild_excerpt_and_body(self):
+        excerpt_expected, body_expected = models.Post.split_content(self.published_post.content)
+        models.Post.objects.update(excerpt='', body='')
+        call_command('rebuild_post_excerpts', batch_size=2, stdout=StringIO())
+        post = models.Post.objects.get(pk=self.published_post.pk)
+
+        self.assertEqual(post.excerpt, excerpt_expected)
+        self.assertEqual(post.body, body_expected)
+
+    def test_every_post_is_updated(self):
+        out = StringIO()
+        call_command('rebuild_post_excerpts', batch_size=2, stdout=out)
+
+        self.assertIn('{} posts updated.'.format(models.Post.objects.count()), out.getvalue())
+
+
+class TestRebuildSearchIndexCommand(TestCommandBase):
+    def test_every_post_is_indexed(self):
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=2, stdout=out)
+
+        self.assertIn('{} posts indexed.'.format(models.Post.objects.count()), out.getvalue())
+
+
+class TestExplainPostQueriesCommand(TestCommandBase):
+    def test_every_query_is_explained_and_timed(self):
+        out = StringIO()
+        call_command('explain_post_queries', repeat=1, stdout=out)
+
+        self.assertEqual(out.getvalue().count('== '), 5)
+        self.assertEqual(out.getvalue().count('median: '), 5)
+
+
+class TestModerateCommentsCommand(TestCommandBase):
+    def setUp(self):
+        self._num_published = models.Comment.objects.all_published().count()
+
+    def test_approve_by_post(self):
+        out = StringIO()
+        num_comments = self.published_post.comments.all_pending().count()
+        call_command('moderate_comments', 'approve', post=self.published_post.slug, batch_size=1, stdout=out)
+        post = models.Post.objects.get(pk=self.published_post.pk)
+
+        self.assertIn('{} comments approved.'.format(num_comments), out.getvalue())
+        self.assertFalse(post.comments.all_pending().exists())
+        self.assertEqual(post.published_comment_count, post.comments.count())
+
+    def test_delete_by_content_and_date_range(self):
+        comment = self.published_post.comments.first()
+        today = comment.created.date().isoformat()
+        call_command(
+            'moderate_comments', 'delete', content='^{}$'.format(comment.content), since=today, until=today,
+            stdout=StringIO())
+
+        self.assertFalse(models.Comment.objects.filter(pk=comment.pk).exists())
+        self.assertEqual(
+            models.Post.objects.get(pk=self.published_post.pk).published_comment_count,
+            self.published_post.comments.all_published().count())
+
+    def test_date_range_excludes_comments(self):
+        num_comments = models.Comment.objects.count()
+        call_command('moderate_comments', 'delete', until='2000-01-01', stdout=StringIO())
+
+        self.assertEqual(models.Comment.objects.count(), num_comments)
+
+    def test_dry_run(self):
+        out = StringIO()
+        num_comments = models.Comment.objects.filter(email__iexact=self.published_post.comments.first().email).count()
+        call_command(
+            'moderate_comments', 'reject', email=self.published_post.comments.first().email, dry_run=True,
+            stdout=out)
+
+        self.assertIn('{} comments would be rejected.'.format(num_comments), out.getvalue())
+        self.assertEqual(models.Comment.objects.all_published().count(), self._num_published)
+
+    def test_filter_is_required(self):
+        with self.assertRaises(CommandError):
+            call_command('moderate_comments', 'delete', stdout=StringIO())
+
+    def test_invalid_date(self):
+        with self.assertRaises(CommandError):
+            call_command('moderate_comments', 'delete', since='yesterday', stdout=StringIO())
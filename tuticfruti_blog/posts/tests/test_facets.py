@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django import test
+
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.core import transactions
+from .. import facets
+from .. import models
+
+
+class TestFacets(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+        cls.published_post = models.Post.objects.get(slug='published-post')
+        cls.draft_post = models.Post.objects.get(slug='draft-post')
+        cls.python_category = models.Category.objects.get(slug='python')
+        cls.python_tag = models.Tag.objects.get(term='python')
+        cls.django_tag = models.Tag.objects.get(term='django')
+
+    def setUp(self):
+        cache.clear()
+        facets.clear()
+
+    def _expected_counts(self, facet, posts):
+        model = models.Category if facet == facets.CATEGORY else models.Tag
+        counts = {obj.pk: posts.filter(**{facets.FACET_FIELDS[facet]: obj}).count() for obj in model.objects.all()}
+
+        return {pk: count for pk, count in counts.items() if count}
+
+    def _browse_without_rebuild(self, selection):
+        with mock.patch.object(facets.FacetIndex, 'build') as build:
+            result = facets.browse(selection)
+
+        self.assertFalse(build.called)
+        return result
+
+    def test_counts_every_published_post(self):
+        post_pks, counts = facets.browse([])
+        posts = models.Post.objects.all_published()
+
+        self.assertEqual(set(post_pks), set(posts.values_list('pk', flat=True)))
+        self.assertEqual(counts[facets.CATEGORY], self._expected_counts(facets.CATEGORY, posts))
+        self.assertEqual(counts[facets.TAG], self._expected_counts(facets.TAG, posts))
+
+    def test_selection_intersects_facets(self):
+        post_pks, counts = facets.browse([(facets.CATEGORY, self.python_category.pk), (facets.TAG, self.python_tag.pk)])
+        posts = models.Post.objects.all_published().filter(categories=self.python_category, tags=self.python_tag)
+
+        self.assertEqual(set(post_pks), set(posts.values_list('pk', flat=True)))
+        self.assertEqual(counts[facets.TAG], self._expected_counts(facets.TAG, posts))
+
+    def test_publishing_post_updates_the_index(self):
+        facets.browse([])
+        self.draft_post.tags.add(self.python_tag)
+        self.draft_post.status_id = models.Post.STATUS_PUBLISHED
+        self.draft_post.save()
+        post_pks, counts = self._browse_without_rebuild([(facets.TAG, self.python_tag.pk)])
+
+        self.assertIn(self.draft_post.pk, post_pks)
+
+    def test_unpublishing_post_updates_the_index(self):
+        facets.browse([])
+        self.published_post.status_id = models.Post.STATUS_DRAFT
+        self.published_post.save()
+        post_pks, counts = self._browse_without_rebuild([])
+
+        self.assertNotIn(self.published_post.pk, post_pks)
+        self.assertEqual(counts[facets.TAG][self.django_tag.pk], 1)
+
+    def test_untagging_post_updates_the_index(self):
+        facets.browse([])
+        self.published_post.tags.remove(self.python_tag)
+        post_pks, counts = self._browse_without_rebuild([(facets.TAG, self.python_tag.pk)])
+
+        self.assertNotIn(self.published_post.pk, post_pks)
+
+    def test_clearing_tag_posts_updates_the_index(self):
+        facets.browse([])
+        self.python_tag.posts.clear()
+        post_pks, counts = self._browse_without_rebuild([])
+
+        self.assertNotIn(self.python_tag.pk, counts[facets.TAG])
+
+    def test_deleting_category_updates_the_index(self):
+        facets.browse([])
+        models.Category.objects.get(pk=self.python_category.pk).delete()
+        post_pks, counts = self._browse_without_rebuild([])
+
+        self.assertNotIn(self.python_category.pk, counts[facets.CATEGORY])
+
+    def test_updates_leave_the_browsed_index_unchanged(self):
+        index = facets._get_index()
+        post = models.Post.objects.get(pk=self.published_post.pk)
+        post.status_id = models.Post.STATUS_DRAFT
+        post.save()
+
+        self.assertIn(post.pk, index.published)
+        self.assertNotIn(post.pk, facets._get_index().published)
+
+    def test_updates_share_the_unchanged_posting_lists(self):
+        index = facets._get_index()
+        self.published_post.tags.remove(self.python_tag)
+        updated_index = facets._get_index()
+
+        self.assertIs(
+            updated_index.postings[facets.TAG, self.django_tag.pk], index.postings[facets.TAG, self.django_tag.pk])
+        self.assertIsNot(
+            updated_index.postings[facets.TAG, self.python_tag.pk], index.postings[facets.TAG, self.python_tag.pk])
+
+    def test_posts_are_browsed_newest_first(self):
+        post_pks, counts = facets.browse([(facets.TAG, self.python_tag.pk)])
+        posts = models.Post.objects.all_published().filter(tags=self.python_tag)
+
+        self.assertEqual(post_pks, list(posts.values_list('pk', flat=True)))
+
+    def test_changes_of_other_workers_rebuild_the_index(self):
+        facets.browse([])
+        models.Post.objects.filter(pk=self.published_post.pk).update(status_id=models.Post.STATUS_DRAFT)
+        cache.incr(facets.GENERATION_KEY)
+        post_pks, counts = facets.browse([])
+
+        self.assertNotIn(self.published_post.pk, post_pks)
+
+    def test_generation_is_only_added_when_missing(self):
+        generation = facets.get_generation()
+        with mock.patch.object(cache, 'add') as add:
+            self.assertEqual(facets.get_generation(), generation)
+
+        self.assertFalse(add.called)
+
+    @test.override_settings(POSTS_FACETS_INDEX_TIMEOUT=0)
+    def test_expired_index_is_rebuilt(self):
+        facets.browse([])
+        models.Post.objects.filter(pk=self.published_post.pk).update(status_id=models.Post.STATUS_DRAFT)
+        post_pks, counts = facets.browse([])
+
+        self.assertNotIn(self.published_post.pk, post_pks)
+
+
+# Tests run outside of a wrapping transaction, so changes are committed by the code under test
+class TestFacetsAfterCommit(test.TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        facets.clear()
+        data_fixtures.DataFixtures.load()
+
+        self.draft_post = models.Post.objects.get(slug='draft-post')
+
+    def _publish(self, request):
+        self.draft_post.status_id = models.Post.STATUS_PUBLISHED
+        self.draft_post.save()
+        return HttpResponse(str(cache.get(facets.GENERATION_KEY)))
+
+    def test_generation_is_bumped_again_after_commit(self):
+        facets.browse([])
+        res = transactions.atomic_writes(self._publish)(test.RequestFactory().post('/'))
+
+        # Other workers may have rebuilt their index before the commit, they rebuild it again
+        self.assertGreater(cache.get(facets.GENERATION_KEY), int(res.content))
+
+    def test_index_of_the_writer_is_kept_after_commit(self):
+        facets.browse([])
+        transactions.atomic_writes(self._publish)(test.RequestFactory().post('/'))
+
+        with mock.patch.object(facets.FacetIndex, 'build') as build:
+            post_pks, counts = facets.browse([])
+
+        self.assertFalse(build.called)
+        self.assertIn(self.draft_post.pk, post_pks)
@@ -1,10 +1,14 @@
 # -*- coding: utf-8 -*-
 import unittest
+from unittest import mock
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django import test
 
 from tuticfruti_blog.core import data_fixtures
 from .. import models
+from .. import signals
 
 
 class TestManagerBase(test.TestCase):
@@ -44,6 +48,50 @@ class TestCommentManager(TestManagerBase):
 
         self.assertEqual(comments.count(), comments_expected.count())
 
+    def _assert_published_comment_counts(self):
+        for post in models.Post.objects.all():
+            self.assertEqual(post.published_comment_count, post.comments.all_published().count())
+
+    def test_approve(self):
+        num_comments = models.Comment.objects.all_pending().count()
+        with mock.patch.object(signals.comments_changed, 'send') as send:
+            rows = models.Comment.objects.all_pending().approve(batch_size=1)
+
+        self.assertEqual(rows, num_comments)
+        self.assertEqual(send.call_count, num_comments)
+        self.assertFalse(models.Comment.objects.all_pending().exists())
+        self._assert_published_comment_counts()
+
+    def test_reject(self):
+        num_comments = models.Comment.objects.all_published().count()
+        rows = models.Comment.objects.all_published().reject(batch_size=2)
+
+        self.assertEqual(rows, num_comments)
+        self.assertFalse(models.Comment.objects.all_published().exists())
+        self._assert_published_comment_counts()
+
+    def test_delete_in_batches(self):
+        post_ids = set(models.Comment.objects.all_published().values_list('post_id', flat=True))
+        num_comments = models.Comment.objects.all_published().count()
+        with mock.patch.object(signals.comments_changed, 'send') as send:
+            rows = models.Comment.objects.all_published().delete_in_batches(batch_size=1000)
+
+        self.assertEqual(rows, num_comments)
+        send.assert_called_once_with(sender=models.Comment, post_ids=post_ids)
+        self.assertFalse(models.Comment.objects.all_published().exists())
+        self._assert_published_comment_counts()
+
+    def test_delete_in_batches_does_not_load_comments(self):
+        with CaptureQueriesContext(connection) as queries:
+            models.Comment.objects.all().delete_in_batches(batch_size=1000)
+
+        comment_table = models.Comment._meta.db_table
+        deletes = [query['sql'] for query in queries if 'DELETE FROM "{}"'.format(comment_table) in query['sql']]
+        loads = [query['sql'] for query in queries if '"{}"."content"'.format(comment_table) in query['sql']]
+
+        self.assertEqual(len(deletes), 1)
+        self.assertFalse(loads)
+
 
 class TestCategoryManager(TestManagerBase):
     def test_all_enabled(self):
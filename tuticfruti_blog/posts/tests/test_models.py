@@ -89,6 +89,19 @@ class TestPostModel(TestModelBase):
         self.assertEqual(saved_post.created, post_expected.created)
         self.assertEqual(saved_post.modified, post_expected.modified)
 
+    def test_post_split_content_into_excerpt_and_body(self):
+        excerpt_expected, body_expected = factories.FUZZY_TEXTS[0].split(models.Post.HR)
+
+        self.assertEqual(self.published_post.excerpt, excerpt_expected)
+        self.assertEqual(self.published_post.body, body_expected)
+
+    def test_post_without_hr_uses_whole_content(self):
+        post = models.Post.objects.create(
+            author=self.user, title='Without hr', content='Content without hr')
+
+        self.assertEqual(post.excerpt, post.content)
+        self.assertEqual(post.body, post.content)
+
     def test_author_field_must_be_not_null(self):
         with self.assertRaises(IntegrityError):
             models.Post.objects.create(title='Author must be not null')
@@ -332,3 +345,72 @@ class TestCategoryModel(TestModelBase):
         slug = models.Category.objects.create(name='Name with multiple words').slug
 
         self.assertEqual(slug, slug_expected)
+
+
+class TestPostPublishedCommentCount(TestModelBase):
+    def _published_comment_count(self, post):
+        return models.Post.objects.get(pk=post.pk).published_comment_count
+
+    def test_pending_comments_are_not_counted(self):
+        self.assertEqual(self._published_comment_count(self.published_post), 0)
+
+    def test_creating_published_comment(self):
+        models.Comment.objects.create(
+            post=self.published_post,
+            status_id=models.Comment.STATUS_PUBLISHED,
+            author='author2',
+            email='author2@example.com',
+            content=factories.FUZZY_TEXTS[2])
+
+        self.assertEqual(self._published_comment_count(self.published_post), 1)
+
+    def test_publishing_and_unpublishing_comment(self):
+        comment = models.Comment.objects.get(pk=self.comment.pk)
+        comment.status_id = models.Comment.STATUS_PUBLISHED
+        comment.save()
+        self.assertEqual(self._published_comment_count(self.published_post), 1)
+
+        comment.status_id = models.Comment.STATUS_PENDING
+        comment.save()
+        self.assertEqual(self._published_comment_count(self.published_post), 0)
+
+    def test_editing_published_comment_bumps_post_modified(self):
+        comment = models.Comment.objects.get(pk=self.comment.pk)
+        comment.status_id = models.Comment.STATUS_PUBLISHED
+        comment.save()
+        modified = models.Post.objects.get(pk=self.published_post.pk).modified
+        comment.content = 'Edited comment'
+        comment.save()
+
+        self.assertGreater(models.Post.objects.get(pk=self.published_post.pk).modified, modified)
+
+    def test_moving_published_comment_to_another_post(self):
+        comment = models.Comment.objects.get(pk=self.comment.pk)
+        comment.status_id = models.Comment.STATUS_PUBLISHED
+        comment.save()
+        comment.post = self.another_post
+        comment.save()
+
+        self.assertEqual(self._published_comment_count(self.published_post), 0)
+        self.assertEqual(self._published_comment_count(self.another_post), 1)
+
+    def test_deleting_published_comment(self):
+        comment = models.Comment.objects.get(pk=self.comment.pk)
+        comment.status_id = models.Comment.STATUS_PUBLISHED
+        comment.save()
+        comment.delete()
+
+        self.assertEqual(self._published_comment_count(self.published_post), 0)
+
+    def test_bulk_update(self):
+        models.Comment.objects \
+            .filter(post=self.published_post) \
+            .update(status_id=models.Comment.STATUS_PUBLISHED)
+
+        self.assertEqual(self._published_comment_count(self.published_post), 2)
+
+    def test_bulk_delete(self):
+        models.Comment.objects.update(status_id=models.Comment.STATUS_PUBLISHED)
+        models.Comment.objects.filter(pk=self.comment.pk).delete()
+
+        self.assertEqual(self._published_comment_count(self.published_post), 1)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django import test
+
+from tuticfruti_blog.core import data_fixtures
+from .. import models
+from .. import pagination
+
+
+class TestCursor(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+
+        cls.published_post = models.Post.objects.get(slug='published-post')
+
+    def test_encode_and_decode_cursor(self):
+        cursor = pagination.encode_cursor(pagination.DIRECTION_NEXT, self.published_post)
+        direction, created, pk = pagination.decode_cursor(cursor)
+
+        self.assertEqual(direction, pagination.DIRECTION_NEXT)
+        self.assertEqual(created, self.published_post.created)
+        self.assertEqual(pk, self.published_post.pk)
+
+    def test_cursor_is_opaque(self):
+        cursor = pagination.encode_cursor(pagination.DIRECTION_NEXT, self.published_post)
+
+        self.assertNotIn(str(self.published_post.pk), cursor.split('|'))
+
+    def test_malformed_cursor(self):
+        for cursor in ('2', 'not a cursor', pagination.encode_cursor('x', self.published_post)):
+            with self.assertRaises(pagination.InvalidCursor):
+                pagination.decode_cursor(cursor)
+
+
+class TestCursorPaginator(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+
+        cls.posts = list(models.Post.objects.all_published().order_by('-created', '-pk'))
+
+    def setUp(self):
+        self.paginator = pagination.CursorPaginator(models.Post.objects.all_published(), 4)
+
+    def test_first_page(self):
+        page = self.paginator.page()
+
+        self.assertEqual(list(page), self.posts[:4])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_browse_forwards_and_backwards(self):
+        pages = [self.paginator.page()]
+        while pages[-1].has_next():
+            pages.append(self.paginator.page(pages[-1].next_page_number()))
+        posts = [post for page in pages for post in page]
+        self.assertEqual(posts, self.posts)
+
+        page = pages[-1]
+        for expected_page in reversed(pages[:-1]):
+            page = self.paginator.page(page.previous_page_number())
+            self.assertEqual(list(page), list(expected_page))
+        self.assertFalse(page.has_previous())
+
+    def test_queries_do_not_count_nor_offset(self):
+        page = self.paginator.page()
+        with CaptureQueriesContext(connection) as queries:
+            list(self.paginator.page(page.next_page_number()))
+
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT(', queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries[0]['sql'])
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+import unittest
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django import test
+
+from tuticfruti_blog.core import data_fixtures
+from tuticfruti_blog.core import transactions
+from .. import models
+from .. import search
+
+
+class TestSearchBase(test.TestCase):
+    backend_class = None
+
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+
+        cls.published_post = models.Post.objects.get(slug='published-post')
+        cls.python_post = models.Post.objects.get(slug='python-post')
+        cls.python_tag = models.Tag.objects.get(term='python')
+        cls.python_category = models.Category.objects.get(slug='python')
+
+    def setUp(self):
+        self.backend = self.backend_class(connection)
+
+    def _search(self, search_terms):
+        return list(self.backend.search(models.Post.objects.all(), search_terms))
+
+
+class TestSearchBackendCommonMixin:
+    def test_search_by_title(self):
+        self.assertIn(self.published_post, self._search('published'))
+
+    def test_search_by_category_name(self):
+        self.assertIn(self.published_post, self._search('first'))
+
+    def test_search_by_tag_term(self):
+        self.assertIn(self.python_post, self._search('python'))
+
+    def test_any_term_matches(self):
+        posts = self._search('published nonexistent')
+
+        self.assertIn(self.published_post, posts)
+
+    def test_result_has_no_repeated(self):
+        posts = self._search('python python django')
+
+        self.assertEqual(len(posts), len(set(posts)))
+
+    def test_regex_special_chars_are_ignored(self):
+        self.assertEqual(self._search('.* ( | ['), [])
+
+
+class TestGetTerms(test.SimpleTestCase):
+    def test_terms_are_lowercased_words(self):
+        self.assertEqual(search.get_terms('Python (Django|.*)'), ['python', 'django'])
+
+    def test_empty_search_terms(self):
+        self.assertEqual(search.get_terms(None), [])
+
+    def test_normalized_terms_are_sorted_and_distinct(self):
+        self.assertEqual(search.normalize_terms('Python django PYTHON'), 'django python')
+
+
+class TestGetSearchBackend(test.SimpleTestCase):
+    def test_backend_is_chosen_by_vendor(self):
+        backend = search.get_search_backend()
+
+        self.assertEqual(
+            '{}.{}'.format(backend.__module__, backend.__class__.__name__),
+            search.BACKENDS.get(connection.vendor, search.DEFAULT_BACKEND))
+
+    @test.override_settings(POSTS_SEARCH_BACKEND='tuticfruti_blog.posts.search.SimpleSearchBackend')
+    def test_backend_setting(self):
+        self.assertIsInstance(search.get_search_backend(), search.SimpleSearchBackend)
+
+
+class TestSimpleSearchBackend(TestSearchBackendCommonMixin, TestSearchBase):
+    backend_class = search.SimpleSearchBackend
+
+
+class TestPostgresSearchBackend(TestSearchBackendCommonMixin, TestSearchBase):
+    backend_class = search.PostgresSearchBackend
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor != 'postgresql':
+            raise unittest.SkipTest('PostgreSQL tsvector backend requires a PostgreSQL database')
+        super().setUpClass()
+
+    def test_every_post_is_indexed(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM posts_post WHERE search_vector IS NULL')
+            num_rows = cursor.fetchone()[0]
+
+        self.assertEqual(num_rows, 0)
+
+    def test_title_ranks_over_excerpt(self):
+        posts = self._search('python')
+
+        self.assertEqual(posts[0], self.python_post)
+
+    def test_prefixes_match(self):
+        self.assertIn(self.python_post, self._search('pyth'))
+
+    def test_tag_rename_updates_index(self):
+        tag = models.Tag.objects.get(pk=self.python_tag.pk)
+        tag.term = 'snake'
+        tag.save()
+
+        self.assertIn(self.python_post, self._search('snake'))
+
+    def test_removing_tag_updates_index(self):
+        post = models.Post.objects.get(slug='django-post')
+        post.tags.add(models.Tag.objects.create(term='unique'))
+        self.assertIn(post, self._search('unique'))
+        post.tags.clear()
+
+        self.assertNotIn(post, self._search('unique'))
+
+    def test_deleting_category_updates_index(self):
+        models.Category.objects.get(slug='first-category').delete()
+
+        self.assertNotIn(self.published_post, self._search('first'))
+
+
+class TestSqliteSearchBackend(TestSearchBackendCommonMixin, TestSearchBase):
+    backend_class = search.SqliteSearchBackend
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor != 'sqlite':
+            raise unittest.SkipTest('SQLite FTS5 backend requires a SQLite database')
+        super().setUpClass()
+
+    def test_title_ranks_over_excerpt(self):
+        posts = self._search('python')
+
+        self.assertEqual(posts[0], self.python_post)
+
+    def test_tag_rename_updates_index(self):
+        tag = models.Tag.objects.get(pk=self.python_tag.pk)
+        tag.term = 'snake'
+        tag.save()
+
+        self.assertIn(self.python_post, self._search('snake'))
+
+    def test_removing_tag_updates_index(self):
+        post = models.Post.objects.get(slug='django-post')
+        post.tags.add(models.Tag.objects.create(term='unique'))
+        self.assertIn(post, self._search('unique'))
+        post.tags.clear()
+
+        self.assertNotIn(post, self._search('unique'))
+
+    def test_adding_posts_to_category_updates_index(self):
+        post = models.Post.objects.get(slug='django-post')
+        self.python_category.posts.add(post)
+
+        self.assertIn(post, self._search('python'))
+
+    def test_deleting_category_updates_index(self):
+        models.Category.objects.get(slug='first-category').delete()
+
+        self.assertNotIn(self.published_post, self._search('first'))
+
+    def test_deleted_post_is_removed_from_index(self):
+        pk = self.python_post.pk
+        models.Post.objects.get(pk=pk).delete()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM posts_post_fts WHERE rowid = %s', [pk])
+            num_rows = cursor.fetchone()[0]
+
+        self.assertEqual(num_rows, 0)
+
+
+class TestGetResultPks(test.TestCase):
+    multi_db = True
+
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+
+        cls.python_post = models.Post.objects.get(slug='python-post')
+        cls.published_posts = models.Post.objects.all_published()
+
+    def setUp(self):
+        cache.clear()
+
+    def _num_queries(self, search_terms, scope=''):
+        with CaptureQueriesContext(connection) as queries:
+            search.get_result_pks(self.published_posts, search_terms, scope)
+
+        return len(queries)
+
+    def test_results_are_ordered_post_ids(self):
+        backend = search.get_search_backend(connection.alias)
+        pks_expected = [post.pk for post in backend.search(self.published_posts, 'python post')]
+
+        self.assertEqual(search.get_result_pks(self.published_posts, 'python post'), pks_expected)
+
+    def test_equivalent_searches_share_results(self):
+        search.get_result_pks(self.published_posts, 'Python post')
+
+        self.assertEqual(self._num_queries('post  PYTHON python'), 0)
+
+    def test_results_are_cached_per_scope(self):
+        search.get_result_pks(self.published_posts, 'python')
+
+        self.assertGreater(self._num_queries('python', scope='python'), 0)
+
+    def test_index_updates_invalidate_results(self):
+        search.get_result_pks(self.published_posts, 'python')
+        post = models.Post.objects.get(pk=self.python_post.pk)
+        post.status_id = models.Post.STATUS_DRAFT
+        post.save()
+
+        self.assertNotIn(post.pk, search.get_result_pks(self.published_posts, 'python'))
+
+    def test_results_are_read_from_the_primary(self):
+        # The test replica is a database of its own, left empty
+        pks = search.get_result_pks(self.published_posts.using('replica'), 'python')
+
+        self.assertIn(self.python_post.pk, pks)
+
+    def test_generation_is_only_added_when_missing(self):
+        generation = search.get_generation()
+        with mock.patch.object(cache, 'add') as add:
+            self.assertEqual(search.get_generation(), generation)
+
+        self.assertFalse(add.called)
+
+
+# Tests run outside of a wrapping transaction, so changes are committed by the code under test
+class TestGetResultPksAfterCommit(test.TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        data_fixtures.DataFixtures.load()
+
+        self.draft_post = models.Post.objects.get(slug='draft-post')
+        self.published_posts = models.Post.objects.all_published()
+
+    def test_results_computed_before_commit_are_not_served(self):
+        def publish(request):
+            self.draft_post.status_id = models.Post.STATUS_PUBLISHED
+            self.draft_post.save()
+            # Another worker searches before the change is committed, without seeing it
+            search.get_result_pks(models.Post.objects.none(), 'draft')
+            return HttpResponse()
+
+        transactions.atomic_writes(publish)(test.RequestFactory().post('/'))
+
+        self.assertIn(self.draft_post.pk, search.get_result_pks(self.published_posts, 'draft'))
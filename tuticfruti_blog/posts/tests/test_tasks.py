@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from unittest import mock
+
+from django.core import mail
+from django.db import DatabaseError
+from django import test
+
+from celery.exceptions import Retry
+
+from tuticfruti_blog.core import data_fixtures
+from .. import models
+from .. import tasks
+
+
+@test.override_settings(MANAGERS=[('Manager', 'manager@example.com')])
+class TestIngestComment(test.TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        data_fixtures.DataFixtures.load()
+
+        cls.published_post = models.Post.objects.get(slug='published-post')
+
+    def _ingest(self, **kwargs):
+        comment = dict(
+            post_pk=self.published_post.pk,
+            author='anonymous',
+            email='anonymous@example.com',
+            content='A new comment')
+        comment.update(kwargs)
+
+        return tasks.ingest_comment.delay(**comment)
+
+    def _comments(self):
+        return models.Comment.objects.filter(post=self.published_post, email='anonymous@example.com')
+
+    def test_comment_is_stored_pending(self):
+        self._ingest()
+
+        self.assertEqual(self._comments().get().status_id, models.Comment.STATUS_PENDING)
+
+    def test_managers_are_notified(self):
+        self._ingest()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(self.published_post.title, mail.outbox[0].subject)
+        self.assertIn('A new comment', mail.outbox[0].body)
+
+    @test.override_settings(POSTS_COMMENT_NOTIFICATIONS_ENABLED=False)
+    def test_notifications_disabled(self):
+        self._ingest()
+
+        self.assertEqual(len(mail.outbox), 0)
+
+    @test.override_settings(POSTS_COMMENT_MAX_LINKS=1)
+    def test_comment_with_too_many_links_is_discarded(self):
+        self._ingest(content='See http://example.com and www.example.com')
+
+        self.assertFalse(self._comments().exists())
+        self.assertEqual(len(mail.outbox), 0)
+
+    @test.override_settings(POSTS_COMMENT_BLOCKED_TERMS=['casino'])
+    def test_comment_with_blocked_term_is_discarded(self):
+        self._ingest(content='Best CASINO bonus')
+
+        self.assertFalse(self._comments().exists())
+
+    def test_duplicate_comment_is_discarded(self):
+        self._ingest()
+        self._ingest()
+
+        self.assertEqual(self._comments().count(), 1)
+
+    def test_comment_on_missing_post_is_discarded(self):
+        num_comments = models.Comment.objects.count()
+        self._ingest(post_pk=0)
+
+        self.assertEqual(models.Comment.objects.count(), num_comments)
+
+    def test_database_errors_are_retried(self):
+        with mock.patch.object(models.Comment.objects, 'create', side_effect=DatabaseError), \
+                mock.patch.object(tasks.ingest_comment, 'retry', side_effect=Retry) as retry:
+            with self.assertRaises(Retry):
+                self._ingest()
+
+        self.assertEqual(retry.call_count, 1)
@@ -1,12 +1,29 @@
 # -*- coding: utf-8 -*-
 import unittest
+from unittest import mock
 
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
 from django.core.urlresolvers import reverse
+from django.db import connection, DatabaseError
+from django.http import HttpResponse
+from django.test.utils import CaptureQueriesContext
+from django.utils.http import http_date
 from django import test
 
+from tuticfruti_blog.core import cache as core_cache
+from tuticfruti_blog.core import transactions
+from tuticfruti_blog.core.utils import QueryBudgetMixin, query_budget
+from tuticfruti_blog.users.models import User
 from .. import models
 from .. import views
+from .. import caching
+from .. import loaders
 from .. import factories
+from .. import facets
+from .. import tasks
+from .. import search
 from tuticfruti_blog.core import data_fixtures
 
 
@@ -126,6 +143,64 @@ class TestPostListView(TestViewCommonMixin, TestViewBase):
         for i in range(len(categories)):
             self.assertEqual(categories[i], categories_expected[i])
 
+    def test_published_comments_counter(self):
+        num_comments_expected = self.published_post_comments.count()
+        posts = self.res.context_data.get('posts')
+        for post in posts:
+            if post.slug == 'published-post':
+                break
+
+        self.assertEqual(post.published_comment_count, num_comments_expected)
+
+    def test_content_field_is_deferred(self):
+        post = self.res.context_data.get('posts')[0]
+
+        self.assertIn('content', post.get_deferred_fields())
+        self.assertNotIn('excerpt', post.get_deferred_fields())
+
+    def test_comments_are_not_queried(self):
+        comment_table = models.Comment._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+
+        for query in queries:
+            self.assertNotIn(comment_table, query['sql'])
+
+
+@test.override_settings(POSTS_PAGINATION_MODE='cursor')
+class TestPostListViewCursorPagination(TestViewBase):
+    def _browse(self, url, data=None):
+        posts = []
+        res = self.client.get(url, data)
+        while True:
+            posts += res.context_data.get('posts')
+            if not res.context_data.get('page_obj').has_next():
+                return posts
+            data = dict(data or {}, page=res.context_data.get('page_obj').next_page_number())
+            res = self.client.get(url, data)
+
+    def test_browse_all_published_posts(self):
+        posts_expected = list(self.published_posts.order_by('-created', '-pk'))
+        posts = self._browse(reverse('home'))
+
+        self.assertEqual(posts, posts_expected)
+
+    def test_browse_search_results(self):
+        posts_expected = self.published_posts.filter(title__icontains='post').count()
+        posts = self._browse(reverse('posts:search'), dict(search_terms='post'))
+
+        self.assertEqual(len(posts), posts_expected)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(reverse('home'), dict(page='invalid'))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_pagination_links_keep_search_terms(self):
+        res = self.client.get(reverse('posts:search'), dict(search_terms='post'))
+
+        self.assertContains(res, '?search_terms=post&amp;page=')
+
 
 class TestPostListByCategoryView(TestViewCommonMixin, TestViewBase):
     view = views.PostListByCategoryView
@@ -145,6 +220,106 @@ class TestPostListByCategoryView(TestViewCommonMixin, TestViewBase):
             self.assertEqual(posts[i], posts_expected[i])
 
 
+class TestPostListByTagView(TestViewCommonMixin, TestViewBase):
+    view = views.PostListByTagView
+    context_data_vars = ['current_tag', 'categories']
+    template_name = 'posts/list.html'
+
+    def setUp(self):
+        self.res = self.client.get(reverse('posts:list_by_tag', kwargs=dict(pk=self.python_tag.pk)))
+
+    def test_filter_posts_by_python_tag(self):
+        posts_expected = self.published_posts.filter(tags=self.python_tag)
+        posts = self.res.context_data.get('posts')
+
+        self.assertEqual(list(posts), list(posts_expected))
+
+    def test_terms_with_slashes_are_linked(self):
+        tag = models.Tag.objects.create(term='ci/cd')
+        self.published_post.tags.add(tag)
+        res = self.client.get(reverse('posts:list_by_tag', kwargs=dict(pk=tag.pk)))
+
+        self.assertEqual(list(res.context_data.get('posts')), [self.published_post])
+        self.assertContains(res, 'ci/cd')
+
+    def test_unknown_tag_is_not_found(self):
+        res = self.client.get(reverse('posts:list_by_tag', kwargs=dict(pk=0)))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_tag_links_point_to_the_tag_list(self):
+        self.assertContains(self.res, reverse('posts:list_by_tag', kwargs=dict(pk=self.python_tag.pk)))
+
+
+class TestPostListByFacetsView(TestViewCommonMixin, TestViewBase):
+    view = views.PostListByFacetsView
+    context_data_vars = ['category_facets', 'tag_facets', 'facet_query']
+    template_name = 'posts/browse.html'
+
+    def setUp(self):
+        cache.clear()
+        facets.clear()
+        self.res = self.client.get(reverse('posts:browse'), dict(category='python', tag=['python', 'django']))
+
+    def _facet(self, facets_, obj):
+        return next(facet for facet in facets_ if facet['object'] == obj)
+
+    def test_posts_of_every_selected_facet_are_listed(self):
+        posts_expected = self.published_posts \
+            .filter(categories=self.python_category) \
+            .filter(tags=self.python_tag) \
+            .filter(tags=self.django_tag)
+
+        self.assertEqual(list(self.res.context_data.get('posts')), list(posts_expected))
+
+    def test_facets_count_the_listed_posts(self):
+        res = self.client.get(reverse('posts:browse'), dict(tag='python'))
+        posts = self.published_posts.filter(tags=self.python_tag)
+
+        for facet in res.context_data.get('category_facets'):
+            self.assertEqual(facet['count'], posts.filter(categories=facet['object']).count())
+        for facet in res.context_data.get('tag_facets'):
+            self.assertEqual(facet['count'], posts.filter(tags=facet['object']).count())
+
+    def test_disabled_categories_are_not_facets(self):
+        categories = [facet['object'] for facet in self.res.context_data.get('category_facets')]
+
+        self.assertNotIn(self.disabled_category, categories)
+
+    def test_facet_links_toggle_the_selection(self):
+        python_facet = self._facet(self.res.context_data.get('category_facets'), self.python_category)
+        django_facet = self._facet(self.res.context_data.get('tag_facets'), self.django_tag)
+
+        self.assertTrue(python_facet['selected'])
+        self.assertEqual(python_facet['query'], 'tag=django&tag=python')
+        self.assertEqual(django_facet['query'], 'category=python&tag=python')
+
+    def test_facet_counts_do_not_query_the_relations(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:browse'), dict(tag='python'))
+
+        for query in queries:
+            self.assertNotIn('GROUP BY', query['sql'])
+
+    def test_posts_are_fetched_by_id(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:browse'), dict(category='python', tag=['python', 'django']))
+
+        post_queries = [query['sql'] for query in queries if 'FROM "posts_post" ' in query['sql']]
+        self.assertTrue(post_queries)
+        for sql in post_queries:
+            self.assertNotIn('posts_post_tags', sql)
+            self.assertNotIn('posts_post_categories', sql)
+
+    def test_pages_are_slices_of_the_selected_posts(self):
+        posts_expected = self.published_posts.filter(tags=self.python_tag)
+        with mock.patch.multiple(views.PostListByFacetsView, paginate_by=1, paginate_orphans=0):
+            res = self.client.get(reverse('posts:browse'), dict(tag='python', page=2))
+
+        self.assertEqual(res.context_data['paginator'].count, posts_expected.count())
+        self.assertEqual(list(res.context_data.get('posts')), [posts_expected[1]])
+
+
 class TestPostListSearchView(TestViewCommonMixin, TestViewBase):
     view = views.PostListSearchView
     context_data_vars = ['search_terms']
@@ -236,6 +411,18 @@ class TestPostDetailView(TestViewCommonMixin, TestViewBase):
             reverse('posts:detail', kwargs=dict(slug=self.published_post.slug)),
             res.redirect_chain[0][0])
 
+    def test_send_a_comment_enqueues_its_ingestion(self):
+        with mock.patch.object(tasks.ingest_comment, 'delay') as delay:
+            res = self.client.post(
+                reverse('posts:detail', kwargs=dict(slug=self.published_post.slug)),
+                dict(author='anonymous', email='anonymous@example.com', content='Enqueued comment'))
+
+        self.assertEqual(res.status_code, 302)
+        delay.assert_called_once_with(
+            post_pk=self.published_post.pk, author='anonymous', email='anonymous@example.com',
+            content='Enqueued comment')
+        self.assertFalse(models.Comment.objects.filter(content='Enqueued comment').exists())
+
     def test_send_an_invalid_form_comment(self):
         num_comments_expected = self.pending_post_comments.count()
         self.client.post(
@@ -274,3 +461,461 @@ class TestPostDetailView(TestViewCommonMixin, TestViewBase):
         comments = self.res.context_data.get('post').comments.all()
 
         self.assertEqual(comments.count(), comments_expected.count())
+
+
+@test.override_settings(PAGE_CACHE_ENABLED=True)
+class TestPageCache(TestViewBase):
+    def setUp(self):
+        cache.clear()
+
+    def _num_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+
+        return len(queries)
+
+    def _page_cache_key(self, url):
+        view = views.PostListView()
+        view.request = test.RequestFactory().get(url)
+        view.request.LANGUAGE_CODE = settings.LANGUAGE_CODE
+
+        return view.get_page_cache_key()
+
+    def test_anonymous_pages_are_cached(self):
+        for url in (
+                reverse('home'),
+                reverse('posts:list_by_category', kwargs=dict(slug=self.python_category.slug)),
+                reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))):
+            self.client.get(url)
+
+            self.assertEqual(self._num_queries(url), 0)
+
+    @test.override_settings(PAGE_CACHE_SOFT_TIMEOUT=0)
+    def test_stale_page_is_served_while_another_request_renders_it(self):
+        self.client.get(reverse('home'))
+        core_cache.cache.add('{}{}'.format(core_cache.LOCK_KEY_PREFIX, self._page_cache_key(reverse('home'))), 'lock')
+
+        self.assertEqual(self._num_queries(reverse('home')), 0)
+
+    @test.override_settings(PAGE_CACHE_SOFT_TIMEOUT=0)
+    def test_stale_page_is_served_on_database_errors(self):
+        content = self.client.get(reverse('home')).content
+        with mock.patch.object(views.PostListView, 'get_queryset', side_effect=DatabaseError):
+            res = self.client.get(reverse('home'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, content)
+
+    def test_invalidation_during_render_is_not_lost(self):
+        get_context_data = views.PostListView.get_context_data
+
+        def render_while_publishing(view, **kwargs):
+            context = get_context_data(view, **kwargs)
+            core_cache.invalidate_tags([caching.LIST_TAG])
+            return context
+
+        with mock.patch.object(views.PostListView, 'get_context_data', render_while_publishing):
+            self.client.get(reverse('home'))
+
+        self.assertGreater(self._num_queries(reverse('home')), 0)
+
+    def test_search_results_are_sliced_from_the_cache(self):
+        self.client.get(reverse('posts:search'), dict(search_terms='post'))
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(reverse('posts:search'), dict(search_terms='POST post', page=2))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertGreater(len(res.context_data.get('posts')), 0)
+        for query in queries:
+            self.assertNotIn('MATCH', query['sql'])
+
+    def test_search_pages_are_not_cached(self):
+        self.client.get(reverse('posts:search'), dict(search_terms='python'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('posts:search'), dict(search_terms='python'))
+
+        self.assertGreater(len(queries), 0)
+
+    def test_authenticated_users_bypass_cache(self):
+        User.objects.create_user(username='staff', password='password')
+        self.client.login(username='staff', password='password')
+        self.client.get(reverse('home'))
+
+        self.assertGreater(self._num_queries(reverse('home')), 0)
+
+    def test_editing_post_invalidates_its_pages(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+        self.client.get(reverse('home'))
+        self.client.get(url)
+        post = models.Post.objects.get(pk=self.published_post.pk)
+        post.content = 'New content'
+        post.save()
+
+        self.assertContains(self.client.get(url), 'New content')
+        self.assertGreater(self._num_queries(reverse('home')), 0)
+
+    def test_editing_post_keeps_unrelated_pages(self):
+        url = reverse('posts:list_by_category', kwargs=dict(slug=self.python_category.slug))
+        self.client.get(url)
+        post = models.Post.objects.get(slug='django-post')
+        post.content = 'New content'
+        post.save()
+
+        self.assertEqual(self._num_queries(url), 0)
+
+    def test_publishing_post_invalidates_lists(self):
+        url = reverse('posts:list_by_category', kwargs=dict(slug=self.python_category.slug))
+        self.client.get(url)
+        post = models.Post.objects.get(pk=self.draft_post.pk)
+        post.categories.add(self.python_category)
+        post.status_id = models.Post.STATUS_PUBLISHED
+        post.save()
+
+        self.assertContains(self.client.get(url), post.title)
+
+    def test_publishing_comment_invalidates_post_pages(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+        self.client.get(url)
+        self.pending_post_comments.update(status_id=models.Comment.STATUS_PUBLISHED)
+
+        self.assertContains(self.client.get(url), 'Pending comment')
+
+    def test_renaming_category_invalidates_every_page(self):
+        url = reverse('posts:detail', kwargs=dict(slug='draft-post'))
+        self.client.get(url)
+        category = models.Category.objects.get(pk=self.first_category.pk)
+        category.name = 'Renamed category'
+        category.save()
+
+        self.assertContains(self.client.get(url), 'Renamed category')
+
+    def test_renaming_tag_invalidates_its_posts(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+        self.client.get(url)
+        tag = models.Tag.objects.get(pk=self.python_tag.pk)
+        tag.term = 'renamed-tag'
+        tag.save()
+
+        self.assertContains(self.client.get(url), 'renamed-tag')
+
+    def test_tag_pages_are_cached(self):
+        url = reverse('posts:list_by_tag', kwargs=dict(pk=self.python_tag.pk))
+        self.client.get(url)
+
+        self.assertEqual(self._num_queries(url), 0)
+
+    def test_tagging_post_invalidates_tag_pages(self):
+        url = reverse('posts:list_by_tag', kwargs=dict(pk=self.miscellaneous_tag.pk))
+        self.client.get(url)
+        self.published_post.tags.add(self.miscellaneous_tag)
+
+        self.assertContains(self.client.get(url), self.published_post.title)
+
+    def test_renaming_tag_invalidates_its_page(self):
+        url = reverse('posts:list_by_tag', kwargs=dict(pk=self.python_tag.pk))
+        self.client.get(url)
+        tag = models.Tag.objects.get(pk=self.python_tag.pk)
+        tag.term = 'renamed-tag'
+        tag.save()
+
+        self.assertContains(self.client.get(url), 'renamed-tag')
+
+    def test_csrf_token_is_not_shared(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+        self.client.get(url)
+        client = test.Client()
+        res = client.get(url)
+        token = res.cookies[settings.CSRF_COOKIE_NAME].value
+
+        self.assertContains(res, "value='{}'".format(token))
+
+    def test_cache_is_keyed_on_language(self):
+        self.client.get(reverse('home'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'), HTTP_ACCEPT_LANGUAGE='es')
+
+        self.assertGreater(len(queries), 0)
+
+
+@test.override_settings(POSTS_FRAGMENT_CACHE_TIMEOUT=60)
+class TestPostFragmentCache(TestViewBase):
+    def setUp(self):
+        cache.clear()
+
+    def _fragment_key(self, post, variant):
+        post = models.Post.objects.get(pk=post.pk)
+
+        return make_template_fragment_key(
+            'post_detail',
+            [post.pk, post.modified.isoformat(), post.published_comment_count, 'en', variant])
+
+    def test_list_and_detail_fragments_are_cached(self):
+        self.client.get(reverse('home'))
+        self.client.get(reverse('posts:detail', kwargs=dict(slug=self.published_post.slug)))
+
+        self.assertIsNotNone(cache.get(self._fragment_key(self.published_post, 'list')))
+        self.assertIsNotNone(cache.get(self._fragment_key(self.published_post, 'detail')))
+
+    def test_category_rename_bumps_post_version(self):
+        self.client.get(reverse('home'))
+        category = models.Category.objects.get(pk=self.first_category.pk)
+        category.name = 'Renamed category'
+        category.save()
+
+        self.assertIsNone(cache.get(self._fragment_key(self.published_post, 'list')))
+        self.assertContains(self.client.get(reverse('home')), 'Renamed category')
+
+    def test_tag_edit_bumps_post_version(self):
+        self.client.get(reverse('home'))
+        tag = models.Tag.objects.get(pk=self.python_tag.pk)
+        tag.term = 'renamed-tag'
+        tag.save()
+
+        self.assertContains(self.client.get(reverse('home')), 'renamed-tag')
+
+    def test_comment_counter_is_part_of_the_version(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+        self.client.get(url)
+        self.pending_post_comments.update(status_id=models.Comment.STATUS_PUBLISHED)
+        num_comments = self.published_post.comments.all_published().count()
+        res = self.client.get(url)
+
+        self.assertEqual(res.context_data.get('post').published_comment_count, num_comments)
+        self.assertIsNotNone(cache.get(self._fragment_key(self.published_post, 'detail')))
+
+
+class TestConditionalGet(TestViewBase):
+    def setUp(self):
+        cache.clear()
+
+    def _urls(self):
+        return (
+            (reverse('home'), {}),
+            (reverse('posts:list_by_category', kwargs=dict(slug=self.python_category.slug)), {}),
+            (reverse('posts:search'), dict(search_terms='python')),
+            (reverse('posts:detail', kwargs=dict(slug=self.published_post.slug)), {}))
+
+    def test_pages_emit_etag(self):
+        for url, data in self._urls():
+            self.assertTrue(self.client.get(url, data).has_header('ETag'))
+
+    def test_matching_etag_is_not_modified(self):
+        for url, data in self._urls():
+            etag = self.client.get(url, data)['ETag']
+            res = self.client.get(url, data, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, 304)
+            self.assertEqual(res.content, b'')
+
+    def test_editing_post_changes_etag(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+        home_etag = self.client.get(reverse('home'))['ETag']
+        detail_etag = self.client.get(url)['ETag']
+        post = models.Post.objects.get(pk=self.published_post.pk)
+        post.content = 'New content'
+        post.save()
+
+        self.assertEqual(self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=home_etag).status_code, 200)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=detail_etag).status_code, 200)
+
+    def test_unpublishing_post_changes_list_etag(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        post = models.Post.objects.get(pk=self.published_post.pk)
+        post.status_id = models.Post.STATUS_DRAFT
+        post.save()
+
+        self.assertEqual(self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_publishing_comment_changes_etag(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+        etag = self.client.get(url)['ETag']
+        self.pending_post_comments.update(status_id=models.Comment.STATUS_PUBLISHED)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_renaming_category_changes_etag(self):
+        url = reverse('posts:detail', kwargs=dict(slug='draft-post'))
+        etag = self.client.get(url)['ETag']
+        category = models.Category.objects.get(pk=self.first_category.pk)
+        category.name = 'Renamed category'
+        category.save()
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_not_modified_runs_no_query(self):
+        for url, data in self._urls()[:3]:
+            etag = self.client.get(url, data)['ETag']
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(url, data, HTTP_IF_NONE_MATCH=etag)
+
+            self.assertEqual(res.status_code, 304)
+            self.assertEqual(len(queries), 0)
+
+    def test_new_search_results_change_etag(self):
+        data = dict(search_terms='python')
+        etag = self.client.get(reverse('posts:search'), data)['ETag']
+        search.bump_generation()
+
+        self.assertEqual(self.client.get(reverse('posts:search'), data, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_renaming_unrelated_category_is_modified_since(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+        category = factories.CategoryFactory()
+        if_modified_since = http_date()
+        category.name = 'Renamed category'
+        category.save()
+
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=if_modified_since).status_code, 200)
+
+    def test_not_modified_skips_the_queryset(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(len(queries), 1)
+
+    def test_missing_post_is_not_found(self):
+        url = reverse('posts:detail', kwargs=dict(slug='missing-post'))
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='*').status_code, 404)
+
+    @test.override_settings(PAGE_CACHE_ENABLED=True)
+    def test_page_cache_hit_is_not_modified_without_queries(self):
+        url = reverse('home')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(len(queries), 0)
+
+
+class TestNavigationCategories(TestViewBase):
+    def setUp(self):
+        cache.clear()
+
+    def _category_queries(self, url):
+        category_table = models.Category._meta.db_table
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+
+        return res, [query for query in queries if 'FROM "{}"'.format(category_table) in query['sql']]
+
+    def test_categories_are_loaded_once_per_request(self):
+        for url in (reverse('home'), reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))):
+            cache.clear()
+            res, queries = self._category_queries(url)
+
+            self.assertEqual(len(queries), 1)
+            self.assertContains(res, 'id="category{}_id"'.format(self.enabled_categories[0].pk))
+
+    def test_categories_are_served_from_the_cache(self):
+        self.client.get(reverse('home'))
+        res, queries = self._category_queries(reverse('posts:detail', kwargs=dict(slug=self.published_post.slug)))
+
+        self.assertEqual(queries, [])
+        self.assertEqual(list(res.context_data['categories']), list(self.enabled_categories))
+
+    def test_post_categories_are_the_loaded_categories(self):
+        res = self.client.get(reverse('posts:detail', kwargs=dict(slug=self.published_post.slug)))
+        categories = {category.pk: category for category in res.context_data['categories']}
+        post_categories = res.context_data['post'].categories.all()
+
+        self.assertEqual(list(post_categories), list(self.enabled_post_categories))
+        for category in post_categories:
+            self.assertIs(category, categories[category.pk])
+
+    def test_saving_category_reloads_categories(self):
+        self.client.get(reverse('home'))
+        category = models.Category.objects.get(pk=self.enabled_categories[0].pk)
+        category.name = 'Renamed category'
+        category.save()
+        res, queries = self._category_queries(reverse('home'))
+
+        self.assertEqual(len(queries), 1)
+        self.assertContains(res, 'Renamed category')
+
+
+# Tests run outside of a wrapping transaction, so changes are committed by the code under test
+@test.override_settings(PAGE_CACHE_ENABLED=True)
+class TestCacheAfterCommit(test.TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        data_fixtures.DataFixtures.load()
+
+        self.category = models.Category.objects.all_enabled().first()
+
+    def _rename_category(self, request):
+        self.category.name = 'Renamed category'
+        self.category.save()
+        # Another worker renders before the change is committed
+        loaders.get_navigation_categories(test.RequestFactory().get('/'))
+        self.client.get(reverse('home'))
+        return HttpResponse()
+
+    def test_values_cached_before_commit_are_not_served(self):
+        transactions.atomic_writes(self._rename_category)(test.RequestFactory().post('/'))
+
+        self.assertIsNone(core_cache.get_tagged(loaders.NAVIGATION_CATEGORIES_KEY))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+        self.assertNotEqual(len(queries), 0)
+
+
+class TestQueryBudgets(QueryBudgetMixin, TestViewBase):
+    def _add_posts(self, category, num_posts=5):
+        user = User.objects.get(username='user0')
+        for i in range(num_posts):
+            post = factories.PostFactory(
+                author=user,
+                title='Budget post {}'.format(i),
+                status_id=models.Post.STATUS_PUBLISHED,
+                categories=[category],
+                tags=self.tags)
+            factories.CommentFactory.create_batch(2, post=post, status_id=models.Comment.STATUS_PUBLISHED)
+
+    @query_budget(6)
+    def test_list_budget(self):
+        self.client.get(reverse('home'))
+
+    @query_budget(6)
+    def test_list_by_category_budget(self):
+        self.client.get(reverse('posts:list_by_category', kwargs=dict(slug=self.python_category.slug)))
+
+    @query_budget(6)
+    def test_search_budget(self):
+        self.client.get(reverse('posts:search'), dict(search_terms='post'))
+
+    @query_budget(6)
+    def test_detail_budget(self):
+        self.client.get(reverse('posts:detail', kwargs=dict(slug=self.published_post.slug)))
+
+    def test_list_queries_do_not_grow_with_posts(self):
+        url = reverse('home')
+
+        # The first page is already full, a larger one lists the new posts too
+        with mock.patch.object(views.PostListView, 'paginate_by', 100):
+            self.assertQueriesDoNotGrow(lambda: self.client.get(url), lambda: self._add_posts(self.python_category))
+
+    def test_list_by_category_queries_do_not_grow_with_posts(self):
+        url = reverse('posts:list_by_category', kwargs=dict(slug=self.python_category.slug))
+
+        self.assertQueriesDoNotGrow(lambda: self.client.get(url), lambda: self._add_posts(self.python_category))
+
+    def test_search_queries_do_not_grow_with_posts(self):
+        url = reverse('posts:search')
+
+        self.assertQueriesDoNotGrow(
+            lambda: self.client.get(url, dict(search_terms='budget python')),
+            lambda: self._add_posts(self.python_category))
+
+    def test_detail_queries_do_not_grow_with_comments(self):
+        url = reverse('posts:detail', kwargs=dict(slug=self.published_post.slug))
+
+        def grow():
+            factories.CommentFactory.create_batch(
+                5, post=self.published_post, status_id=models.Comment.STATUS_PUBLISHED)
+
+        self.assertQueriesDoNotGrow(lambda: self.client.get(url), grow)
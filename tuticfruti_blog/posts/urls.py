@@ -17,6 +17,12 @@ urlpatterns = [
     # ex: /posts/category/python/
     url(_(r'^category/(?P<slug>[-\w]+)/$'), views.PostListByCategoryView.as_view(), name='list_by_category'),
 
+    # ex: /posts/tag/1/
+    url(_(r'^tag/(?P<pk>[0-9]+)/$'), views.PostListByTagView.as_view(), name='list_by_tag'),
+
+    # ex: /posts/browse/?category=python&tag=django
+    url(_(r'^browse/$'), views.PostListByFacetsView.as_view(), name='browse'),
+
     # ex: /posts/search/
     url(_(r'^search/$'), views.PostListSearchView.as_view(), name='search'),
     # ex: /posts/category/python/search/
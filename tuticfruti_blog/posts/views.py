@@ -1,41 +1,126 @@
 # -*- coding: utf-8 -*-
+from django.conf import settings
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils.http import quote_etag, urlencode
+from django.utils.translation import ugettext as _
 from django.views import generic as generic_views
 from django.views.generic import edit as edit_mixins
-from django.db.models import Prefetch, Q
+from django.db.models import Case, IntegerField, Prefetch, Value, When
 from django.core.urlresolvers import reverse
 
+from tuticfruti_blog.core import cache
+from tuticfruti_blog.core import transactions
+from . import caching
+from . import facets
 from . import models
 from . import forms
+from . import loaders
+from . import pagination
+from . import search
+from . import tasks
 
+PAGE_POSTS_KEY_PREFIX = 'posts:page_posts:'
 
-class PostListView(generic_views.ListView):
+
+class PostListView(cache.PageCacheMixin, cache.ConditionalGetMixin, generic_views.ListView):
     model = models.Post
     context_object_name = 'posts'
     template_name = 'posts/list.html'
     paginate_by = models.Post.PAGINATE_BY
     paginate_orphans = models.Post.PAGINATE_ORPHANS
+    pagination_mode = None
+
+    def get_pagination_mode(self):
+        return self.pagination_mode or getattr(settings, 'POSTS_PAGINATION_MODE', pagination.MODE_PAGE)
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.get_pagination_mode() != pagination.MODE_CURSOR:
+            return super().paginate_queryset(queryset, page_size)
+
+        paginator = pagination.CursorPaginator(queryset, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.page_kwarg))
+        except pagination.InvalidCursor:
+            raise Http404(_('Invalid page.'))
+
+        return (paginator, page, page.object_list, page.has_other_pages())
 
     def get_queryset(self):
-        categories = models.Category.objects.all_enabled()
         tags = models.Tag.objects.all()
-        comments = models.Comment.objects.all_published()
 
         queryset = models.Post.objects \
             .all_published() \
-            .prefetch_related(
-                Prefetch('categories', queryset=categories),
-                Prefetch('tags', queryset=tags),
-                Prefetch('comments', queryset=comments)) \
-            .select_related('author')
+            .prefetch_related(Prefetch('tags', queryset=tags)) \
+            .select_related('author') \
+            .defer('content', 'body')
 
         return queryset
 
     def get_context_data(self, **kwargs):
+        versions = cache.get_tag_versions(self.get_list_tags())
         context = super().get_context_data(**kwargs)
-        context['categories'] = models.Category.objects.all_enabled()
+        context['categories'] = loaders.get_navigation_categories(self.request)
+        loaders.prefetch_categories(context['object_list'], context['categories'])
+        self.page_posts = context['object_list']
+        cache.set_tagged(self.get_page_posts_key(), [post.pk for post in self.page_posts], versions=versions)
 
         return context
 
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        etag = self.get_etag()
+        if etag:
+            response['ETag'] = quote_etag(etag)
+
+        return response
+
+    def get_list_tags(self):
+        """Dependency tags of which posts are listed, leaving out the content of each post."""
+        return [caching.LIST_TAG, caching.NAVIGATION_TAG]
+
+    def get_page_tags(self, post_pks):
+        return self.get_list_tags() + [caching.post_tag(pk) for pk in post_pks]
+
+    def get_cache_tags(self):
+        return self.get_page_tags([post.pk for post in self.page_posts])
+
+    def get_page_posts_key(self):
+        return PAGE_POSTS_KEY_PREFIX + self.get_page_cache_key()
+
+    def get_etag(self):
+        # The posts of a page are cached under the list tags once rendered, so validation runs no query
+        post_pks = cache.get_tagged(self.get_page_posts_key())
+        if post_pks is None:
+            return None
+
+        tags = self.get_page_tags(post_pks)
+        versions = cache.get_tag_versions(tags)
+
+        return cache.make_etag(getattr(self.request, 'LANGUAGE_CODE', ''), *[versions[tag] for tag in tags])
+
+
+class PostPksPaginationMixin:
+    """Pages are slices of the ordered ids of every listed post, given by get_post_pks, fetched by id."""
+
+    def get_pagination_mode(self):
+        return pagination.MODE_PAGE
+
+    def get_post_pks(self):
+        raise NotImplementedError
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page, post_pks, is_paginated = super().paginate_queryset(self.get_post_pks(), page_size)
+        if post_pks:
+            ordering = Case(
+                *[When(pk=pk, then=Value(position)) for position, pk in enumerate(post_pks)],
+                output_field=IntegerField())
+            page.object_list = queryset.filter(pk__in=post_pks).order_by(ordering)
+        else:
+            page.object_list = queryset.none()
+
+        return paginator, page, page.object_list, is_paginated
+
 
 class PostListByCategoryView(PostListView):
     def get_queryset(self):
@@ -52,20 +137,125 @@ class PostListByCategoryView(PostListView):
 
         return context
 
+    def get_list_tags(self):
+        category_slug = self.kwargs.get('slug')
+        if not category_slug:
+            return super().get_list_tags()
+
+        return [caching.category_tag(category_slug), caching.NAVIGATION_TAG]
+
+
+class PostListByTagView(PostListView):
+    """Tags are routed by pk, terms being free form."""
+
+    def get_tag(self):
+        if not hasattr(self, 'tag'):
+            self.tag = get_object_or_404(models.Tag, pk=self.kwargs.get('pk'))
+
+        return self.tag
 
-class PostListSearchView(PostListByCategoryView):
     def get_queryset(self):
-        queryset = super().get_queryset()
-        terms = self.request.GET.get('search_terms').split()
-        regex = r'({})'.format('|'.join(terms))
-        queryset = queryset \
-            .filter(
-                Q(title__iregex=regex) |
-                Q(categories__name__iregex=regex) |
-                Q(tags__term__iregex=regex)) \
-            .distinct()
+        return super().get_queryset().filter(tags=self.get_tag())
 
-        return queryset
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['current_tag'] = self.get_tag()
+
+        return context
+
+    def get_list_tags(self):
+        return [caching.LIST_TAG, caching.tag_tag(self.kwargs.get('pk')), caching.NAVIGATION_TAG]
+
+
+class PostListByFacetsView(PostPksPaginationMixin, PostListView):
+    """
+    Lists the published posts of every category and tag selected by slug and term in the query string,
+    along with how many of them belong to each category and tag. Pages are slices of the ids given by the
+    in-memory index. See: tuticfruti_blog.posts.facets
+    """
+    template_name = 'posts/browse.html'
+    page_cache_enabled = False
+
+    def get_selection(self):
+        if not hasattr(self, 'selected_categories'):
+            slugs = self.request.GET.getlist('category')
+            terms = self.request.GET.getlist('tag')
+            self.selected_categories = [
+                category for category in loaders.get_navigation_categories(self.request) if category.slug in slugs]
+            self.selected_tags = list(models.Tag.objects.filter(term__in=terms)) if terms else []
+
+        return self.selected_categories, self.selected_tags
+
+    def browse(self):
+        if not hasattr(self, '_browse'):
+            categories, tags = self.get_selection()
+            self._browse = facets.browse(
+                [(facets.CATEGORY, category.pk) for category in categories] + [(facets.TAG, tag.pk) for tag in tags])
+
+        return self._browse
+
+    def get_post_pks(self):
+        post_pks, counts = self.browse()
+
+        return post_pks
+
+    def get_etag(self):
+        etag = super().get_etag()
+
+        return etag and cache.make_etag(etag, facets.get_generation())
+
+    def get_facet_query(self, categories, tags):
+        return urlencode([('category', category.slug) for category in categories] + [('tag', tag.term) for tag in tags])
+
+    def toggle(self, objects, obj):
+        return [other for other in objects if other != obj] if obj in objects else objects + [obj]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        categories, tags = self.get_selection()
+        post_pks, counts = self.browse()
+        category_counts, tag_counts = counts[facets.CATEGORY], counts[facets.TAG]
+
+        tag_limit = getattr(settings, 'POSTS_FACETS_TAG_LIMIT', 20)
+        top_tag_pks = sorted(tag_counts, key=lambda pk: (-tag_counts[pk], pk))[:tag_limit]
+        facet_tags = set(tags) | set(models.Tag.objects.in_bulk(top_tag_pks).values())
+
+        context['category_facets'] = [
+            dict(
+                object=category,
+                count=category_counts.get(category.pk, 0),
+                selected=category in categories,
+                query=self.get_facet_query(self.toggle(categories, category), tags))
+            for category in context['categories'] if category in categories or category.pk in category_counts]
+        context['tag_facets'] = [
+            dict(
+                object=tag,
+                count=tag_counts.get(tag.pk, 0),
+                selected=tag in tags,
+                query=self.get_facet_query(categories, self.toggle(tags, tag)))
+            for tag in sorted(facet_tags, key=lambda tag: (-tag_counts.get(tag.pk, 0), tag.term))]
+        context['facet_query'] = self.get_facet_query(categories, tags)
+
+        return context
+
+
+class PostListSearchView(PostPksPaginationMixin, PostListByCategoryView):
+    """Pages are slices of the cached ids of every result, see search.get_result_pks."""
+    page_cache_enabled = False
+
+    def get_post_pks(self):
+        if not hasattr(self, '_result_pks'):
+            self._result_pks = search.get_result_pks(
+                self.get_queryset().prefetch_related(None),
+                self.request.GET.get('search_terms'),
+                scope=self.kwargs.get('slug') or '')
+
+        return self._result_pks
+
+    def get_etag(self):
+        etag = super().get_etag()
+
+        return etag and cache.make_etag(etag, search.get_generation())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -74,13 +264,36 @@ class PostListSearchView(PostListByCategoryView):
         return context
 
 
-class PostDetailView(edit_mixins.FormMixin, generic_views.DetailView):
+class PostDetailView(
+        transactions.AtomicWritesMixin, cache.PageCacheMixin, cache.ConditionalGetMixin, edit_mixins.FormMixin,
+        generic_views.DetailView):
     template_name = 'posts/detail.html'
     form_class = forms.CommentForm
     context_object_name = 'post'
 
+    def get_cache_tags(self):
+        return [caching.post_tag(self.object.pk), caching.NAVIGATION_TAG]
+
+    def get_version(self):
+        if not hasattr(self, '_version'):
+            self._version = models.Post.objects \
+                .filter(slug=self.kwargs.get('slug')) \
+                .values_list('pk', 'modified') \
+                .first()
+
+        return self._version
+
+    def get_etag(self):
+        version = self.get_version()
+        if version is None:
+            return None
+
+        navigation = cache.get_tag_versions([caching.NAVIGATION_TAG])[caching.NAVIGATION_TAG]
+        pk, modified = version
+
+        return cache.make_etag(getattr(self.request, 'LANGUAGE_CODE', ''), pk, modified.isoformat(), navigation)
+
     def get_queryset(self):
-        categories = models.Category.objects.all_enabled()
         tags = models.Tag.objects.all()
         comments = models.Comment.objects.all_published()
 
@@ -88,19 +301,20 @@ class PostDetailView(edit_mixins.FormMixin, generic_views.DetailView):
             .filter(slug=self.kwargs.get('slug')) \
             .prefetch_related(
                 Prefetch('comments', queryset=comments),
-                Prefetch('tags', queryset=tags),
-                Prefetch('categories', queryset=categories)) \
-            .select_related('author')
+                Prefetch('tags', queryset=tags)) \
+            .select_related('author') \
+            .defer('content', 'excerpt')
 
         return queryset
 
     def get_success_url(self):
-        return reverse('posts:detail', kwargs=dict(slug=self.get_object().slug))
+        return reverse('posts:detail', kwargs=dict(slug=self.object.slug))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['form'] = self.get_form()
-        context['categories'] = models.Category.objects.all_enabled()
+        context['categories'] = loaders.get_navigation_categories(self.request)
+        loaders.prefetch_categories([self.object], context['categories'])
 
         return context
 
@@ -114,10 +328,10 @@ class PostDetailView(edit_mixins.FormMixin, generic_views.DetailView):
             return self.form_invalid(form)
 
     def form_valid(self, form):
-        models.Comment.objects.create(
-            post=self.get_object(),
-            author=form['author'].value(),
-            email=form['email'].value(),
-            content=form['content'].value())
+        tasks.ingest_comment.delay(
+            post_pk=self.object.pk,
+            author=form.cleaned_data['author'],
+            email=form.cleaned_data['email'],
+            content=form.cleaned_data['content'])
 
         return super().form_valid(form)
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from django import forms
+from django.utils.encoding import force_text
+
+
+class AutocompleteMixin:
+    """
+    Renders the selected options only, any other is looked up on url as the user types.
+
+    Keeps the size of a form constant no matter how many rows the related table holds.
+    The url answers the term and page GET parameters with {"results": [{"id", "text"}], "more"}.
+    """
+
+    def __init__(self, url, attrs=None, choices=()):
+        super().__init__(attrs, choices)
+        self.url = url
+
+    def build_attrs(self, extra_attrs=None, **kwargs):
+        attrs = super().build_attrs(extra_attrs, **kwargs)
+        attrs['data-autocomplete-url'] = self.url
+        attrs['class'] = ' '.join(filter(None, [attrs.get('class'), 'autocomplete']))
+
+        return attrs
+
+    def render_options(self, choices, selected_choices):
+        selected_choices = set(force_text(value) for value in selected_choices if value not in (None, ''))
+        if not selected_choices:
+            return ''
+
+        queryset = self.choices.queryset.filter(pk__in=selected_choices)
+        label_from_instance = self.choices.field.label_from_instance
+
+        return '\n'.join(
+            self.render_option(selected_choices, obj.pk, label_from_instance(obj)) for obj in queryset)
+
+    class Media:
+        js = ('js/admin_autocomplete.js', )
+
+
+class AutocompleteSelect(AutocompleteMixin, forms.Select):
+    pass
+
+
+class AutocompleteSelectMultiple(AutocompleteMixin, forms.SelectMultiple):
+    pass
@@ -0,0 +1,85 @@
+/* Autocomplete of the admin select widgets marked with the autocomplete class. See: tuticfruti_blog.posts.widgets */
+(function ($) {
+  'use strict';
+
+  var DELAY = 250;
+
+  function Autocomplete(select) {
+    this.$select = $(select);
+    this.url = this.$select.data('autocomplete-url');
+    this.multiple = this.$select.prop('multiple');
+    this.$input = $('<input type="search" class="vTextField autocomplete-input">')
+      .attr('placeholder', gettext('Type to search'));
+    this.$results = $('<ul class="autocomplete-results"></ul>');
+    this.$select.before(this.$input).after(this.$results);
+
+    this.$input.on('input', $.proxy(this.schedule, this));
+    this.$results.on('click', 'a.autocomplete-result', $.proxy(this.choose, this));
+    this.$results.on('click', 'a.autocomplete-more', $.proxy(this.more, this));
+    // Double click drops a selected option
+    this.$select.on('dblclick', 'option', function () { $(this).remove(); });
+    // Unselected options of a multiple select would not be submitted
+    this.$select.closest('form').on('submit', $.proxy(function () {
+      if (this.multiple) {
+        this.$select.find('option').prop('selected', true);
+      }
+    }, this));
+  }
+
+  Autocomplete.prototype.schedule = function () {
+    window.clearTimeout(this.timeout);
+    this.timeout = window.setTimeout($.proxy(function () { this.search(1); }, this), DELAY);
+  };
+
+  Autocomplete.prototype.search = function (page) {
+    var term = this.$input.val();
+    this.page = page;
+    $.getJSON(this.url, {term: term, page: page}, $.proxy(function (data) {
+      if (term !== this.$input.val()) {
+        return;
+      }
+      if (page === 1) {
+        this.$results.empty();
+      }
+      this.$results.find('.autocomplete-more').parent().remove();
+      $.each(data.results, $.proxy(function (index, result) {
+        $('<a href="#" class="autocomplete-result"></a>')
+          .text(result.text)
+          .attr('data-id', result.id)
+          .appendTo($('<li></li>').appendTo(this.$results));
+      }, this));
+      if (data.more) {
+        $('<a href="#" class="autocomplete-more"></a>')
+          .text(gettext('More'))
+          .appendTo($('<li></li>').appendTo(this.$results));
+      }
+    }, this));
+  };
+
+  Autocomplete.prototype.more = function (event) {
+    event.preventDefault();
+    this.search(this.page + 1);
+  };
+
+  Autocomplete.prototype.choose = function (event) {
+    var $result = $(event.target);
+    var id = String($result.data('id'));
+    event.preventDefault();
+
+    if (!this.multiple) {
+      this.$select.empty();
+    }
+    if (!this.$select.find('option').filter(function () { return this.value === id; }).length) {
+      $('<option></option>').val(id).text($result.text()).appendTo(this.$select);
+    }
+    this.$select.find('option').filter(function () { return this.value === id; }).prop('selected', true);
+    this.$results.empty();
+    this.$input.val('');
+  };
+
+  $(function () {
+    $('select.autocomplete').each(function () {
+      return new Autocomplete(this);
+    });
+  });
+}(django.jQuery));
@@ -1,3 +1,29 @@
+# -*- coding: utf-8 -*-
+import os
 
-# Use this as a starting point for your project with celery.
-# If you are not using celery, you can remove this app
+from celery import Celery
+from celery.signals import task_postrun
+from django.apps import AppConfig
+from django.conf import settings
+
+if not settings.configured:
+    # set the default Django settings module for the 'celery' program.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.local')  # pragma: no cover
+
+
+app = Celery('tuticfruti_blog')
+
+
+class CeleryConfig(AppConfig):
+    name = 'tuticfruti_blog.taskapp'
+    verbose_name = 'Celery Config'
+
+    def ready(self):
+        # Using a string here means the worker will not have to
+        # pickle the object when using Windows.
+        app.config_from_object('django.conf:settings')
+        app.autodiscover_tasks(lambda: settings.INSTALLED_APPS, force=True)
+
+        # Tasks run outside of requests, so functions deferred by their transactions run once they finish
+        from tuticfruti_blog.core import transactions
+        task_postrun.connect(transactions.run_after_commit, dispatch_uid='tuticfruti_blog.core.transactions')
@@ -6,6 +6,7 @@ from django.views.generic import DetailView, ListView, RedirectView, UpdateView
 
 from braces.views import LoginRequiredMixin
 
+from tuticfruti_blog.core.transactions import AtomicWritesMixin
 from .models import User
 
 
@@ -24,7 +25,7 @@ class UserRedirectView(LoginRequiredMixin, RedirectView):
                        kwargs={"username": self.request.user.username})
 
 
-class UserUpdateView(LoginRequiredMixin, UpdateView):
+class UserUpdateView(LoginRequiredMixin, AtomicWritesMixin, UpdateView):
 
     fields = ['name', ]
 